@@ -2,11 +2,13 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 from .models import User
+from .tokens import revoke_tokens
 
 class CustomUserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'is_active')
     list_filter = ('is_staff', 'is_superuser', 'is_active')
     search_fields = ('username', 'first_name', 'last_name', 'email')
+    actions = ['revoke_sessions']
     
     fieldsets = (
         (None, {'fields': ('username', 'password')}),
@@ -28,6 +30,11 @@ class CustomUserAdmin(BaseUserAdmin):
         }),
     )
 
+    def revoke_sessions(self, request, queryset):
+        revoke_tokens(queryset)
+        self.message_user(request, f'Jetons révoqués pour {queryset.count()} utilisateur(s).')
+    revoke_sessions.short_description = 'Révoquer les jetons API (déconnexion immédiate)'
+
 # Enregistrer le modèle User avec la classe d'admin personnalisée
 if User in admin.site._registry:
     admin.site.unregister(User)
@@ -5,3 +5,7 @@ class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
     verbose_name = 'Authentification'
+
+    def ready(self):
+        from .signals import connect_signals
+        connect_signals()
@@ -0,0 +1,31 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from .tokens import TOKEN_VERSION_CLAIM, USER_CLAIMS, current_token_version, user_from_claims
+
+
+class RoleClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Authentification JWT sans lecture de l'utilisateur : le rôle et les
+    drapeaux viennent du jeton, seule la version des jetons est vérifiée
+    (cache partagé).
+    """
+
+    def get_user(self, validated_token):
+        if TOKEN_VERSION_CLAIM not in validated_token or any(claim not in validated_token for claim in USER_CLAIMS):
+            # Jeton émis avant l'ajout des revendications de rôle
+            return super().get_user(validated_token)
+
+        user = user_from_claims(validated_token)
+        version = current_token_version(user.pk)
+        if version is None:
+            raise AuthenticationFailed(_("User not found"), code='user_not_found')
+        if version != validated_token[TOKEN_VERSION_CLAIM]:
+            raise AuthenticationFailed(
+                "Session expirée suite à une modification du compte. Veuillez vous reconnecter.",
+                code='token_revoked',
+            )
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code='user_inactive')
+        return user
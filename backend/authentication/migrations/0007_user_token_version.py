@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0006_loginnotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Version des jetons'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:43
+
+import authentication.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0007_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', authentication.models.CustomUserManager()),
+            ],
+        ),
+    ]
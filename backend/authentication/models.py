@@ -1,8 +1,31 @@
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
+
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        `update()` groupé : si un champ embarqué dans les jetons (`User.TOKEN_FIELDS`)
+        est modifié, les jetons des utilisateurs concernés sont révoqués comme
+        par `User.save()` (par prudence, même si la valeur ne change pas).
+        """
+        if 'token_version' in kwargs or not set(kwargs) & set(User.TOKEN_FIELDS):
+            return super().update(**kwargs)
+        from .tokens import forget_token_version
+
+        with transaction.atomic(using=self.db):
+            user_ids = list(self.values_list('pk', flat=True))
+            updated = super().update(token_version=models.F('token_version') + 1, **kwargs)
+            forget_token_version(*user_ids)
+        return updated
+
+
+class CustomUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
+
 class User(AbstractUser):
     """
     Modèle utilisateur personnalisé pour le système hospitalier.
@@ -36,10 +59,51 @@ class User(AbstractUser):
         verbose_name=_("Service")
     )
     
+    # Incrémentée à chaque changement de rôle ou désactivation : révoque les jetons JWT émis
+    token_version = models.PositiveIntegerField(default=1, editable=False, verbose_name=_("Version des jetons"))
+    
+    # Champs embarqués dans les jetons d'accès (voir authentication.tokens) : les
+    # modifier, par `save()` ou par `QuerySet.update()` (UserQuerySet), révoque les jetons
+    TOKEN_FIELDS = ('role', 'is_active', 'is_staff', 'is_superuser')
+    
+    objects = CustomUserManager()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._token_state = instance._get_token_state()
+        return instance
+    
+    def _get_token_state(self):
+        deferred = self.get_deferred_fields()
+        return {name: getattr(self, name) for name in self.TOKEN_FIELDS if name not in deferred}
+    
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # Utilisateur construit depuis un jeton : le premier champ lu charge tous les champs différés
+        deferred = self.get_deferred_fields()
+        if fields and deferred and set(fields) <= deferred:
+            fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+    
     def save(self, *args, **kwargs):
         if self.is_superuser:
             self.role = 'superuser'
+        previous = getattr(self, '_token_state', None) or {}
+        update_fields = kwargs.get('update_fields')
+        revoke = any(
+            name in previous and previous[name] != value
+            and (update_fields is None or name in update_fields)
+            for name, value in self._get_token_state().items()
+        )
+        if revoke:
+            self.token_version += 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
         super().save(*args, **kwargs)
+        self._token_state = self._get_token_state()
+        if revoke:
+            from .tokens import publish_token_version
+            publish_token_version(self.pk, self.token_version)
 
     class Meta:
         verbose_name = _("utilisateur")
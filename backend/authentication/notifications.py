@@ -0,0 +1,154 @@
+"""
+Notifications de connexion.
+
+Les connexions sont mises en mémoire tampon dans chaque processus et
+écrites par `bulk_create` par un fil de vidage (toutes les
+`LOGIN_NOTIFICATION_FLUSH_INTERVAL` secondes, ou dès que
+`LOGIN_NOTIFICATION_BATCH_SIZE` connexions sont en attente) : la connexion
+n'attend plus d'INSERT.
+
+Limite assumée : le tampon est en mémoire. Un arrêt normal du worker le vide
+(`atexit`), mais un arrêt brutal (SIGKILL, manque de mémoire) perd les
+connexions des dernières `LOGIN_NOTIFICATION_FLUSH_INTERVAL` secondes au
+plus ; l'intervalle reste donc court (2 s par défaut). Passer l'intervalle
+à 0 rend l'écriture immédiate si aucune perte n'est acceptable.
+
+Le nombre de notifications non lues, une version et la date de dernière
+modification du flux sont tenus dans le cache partagé : l'interrogation
+périodique par les administrateurs se résout en lectures de cache et en
+réponses 304 tant que rien n'a changé. Le compteur expire après
+UNREAD_TIMEOUT et est alors recompté en base : un écart dû à des écritures
+concurrentes ne dure pas.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from core.cache import make_key
+
+from .models import LoginNotification
+
+logger = logging.getLogger(__name__)
+
+UNREAD_KEY = make_key('notifications', 'login', 'unread')
+VERSION_KEY = make_key('notifications', 'login', 'version')
+MODIFIED_KEY = make_key('notifications', 'login', 'modified')
+
+# Le compteur de non lues est recompté en base au moins toutes les 5 minutes
+UNREAD_TIMEOUT = 300
+
+
+def flush_interval():
+    return getattr(settings, 'LOGIN_NOTIFICATION_FLUSH_INTERVAL', 2)
+
+
+def batch_size():
+    return getattr(settings, 'LOGIN_NOTIFICATION_BATCH_SIZE', 100)
+
+
+# ---------------------------------------------------------------------------
+# État du flux (cache partagé)
+# ---------------------------------------------------------------------------
+
+def unread_count():
+    count = cache.get(UNREAD_KEY)
+    if count is None:
+        count = LoginNotification.objects.filter(is_read=False).count()
+        cache.add(UNREAD_KEY, count, timeout=UNREAD_TIMEOUT)
+    return count
+
+
+def adjust_unread(delta):
+    try:
+        if cache.incr(UNREAD_KEY, delta) < 0:
+            cache.delete(UNREAD_KEY)
+    except ValueError:
+        # Compteur absent : recalculé depuis la base à la prochaine lecture
+        pass
+
+
+def recount_unread():
+    """Recompte les non lues en base (une écriture groupée a pu suivre un `update()`)"""
+    count = LoginNotification.objects.filter(is_read=False).count()
+    cache.set(UNREAD_KEY, count, timeout=UNREAD_TIMEOUT)
+    return count
+
+
+def feed_state():
+    """(version, horodatage de dernière modification) du flux"""
+    state = cache.get_many([VERSION_KEY, MODIFIED_KEY])
+    if VERSION_KEY not in state or MODIFIED_KEY not in state:
+        # État perdu : nouvelle version, les clients rechargent une fois
+        touch_feed()
+        state = cache.get_many([VERSION_KEY, MODIFIED_KEY])
+    return state.get(VERSION_KEY, 0), state.get(MODIFIED_KEY, time.time())
+
+
+def touch_feed():
+    cache.set(MODIFIED_KEY, time.time(), timeout=None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, int(time.time() * 1000), timeout=None)
+
+
+# ---------------------------------------------------------------------------
+# Tampon d'écriture
+# ---------------------------------------------------------------------------
+
+class NotificationBuffer:
+    """Connexions en attente d'écriture groupée"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+
+    def add(self, notification):
+        with self._lock:
+            self._pending.append(notification)
+            flush_now = len(self._pending) >= batch_size() or flush_interval() <= 0
+            if not flush_now and self._timer is None:
+                self._timer = threading.Timer(flush_interval(), self._flush_in_thread)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+
+    def flush(self):
+        """Écrit les notifications en attente ; retourne leur nombre"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return 0
+        try:
+            LoginNotification.objects.bulk_create(pending, batch_size=500)
+        except Exception as e:
+            logger.warning("Écriture de %s notification(s) de connexion impossible: %s", len(pending), e)
+            return 0
+        adjust_unread(sum(1 for notification in pending if not notification.is_read))
+        touch_feed()
+        return len(pending)
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+
+buffer = NotificationBuffer()
+atexit.register(buffer.flush)
+
+
+def record_login(user, ip_address=None):
+    """Enregistre une connexion (écriture différée)"""
+    buffer.add(LoginNotification(user=user, ip_address=ip_address))
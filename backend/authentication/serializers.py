@@ -1,11 +1,15 @@
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
 from django.contrib.auth import get_user_model
 from .models import User
+from .tokens import RoleRefreshToken
 
 User = get_user_model()
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    # Rôle, drapeaux et version des jetons embarqués dans le jeton d'accès
+    token_class = RoleRefreshToken
+
     def validate(self, attrs):
         # Rendre le nom d'utilisateur insensible à la casse
         username = attrs.get('username', '')
@@ -21,19 +25,16 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         if not self.user.is_active:
             raise serializers.ValidationError("Ce compte est désactivé. Veuillez contacter l'administrateur.")
         
-        # Créer une notification de connexion (ne doit jamais bloquer le login)
+        # Créer une notification de connexion (ne doit jamais bloquer le login, écriture différée)
         # Pas de notification pour les superusers
         if not self.user.is_superuser:
             try:
-                from .models import LoginNotification
+                from .notifications import record_login
                 request = self.context.get('request')
                 ip_address = None
                 if request:
                     ip_address = request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0].strip() or request.META.get('REMOTE_ADDR')
-                LoginNotification.objects.create(
-                    user=self.user,
-                    ip_address=ip_address,
-                )
+                record_login(self.user, ip_address)
             except Exception:
                 pass
         
@@ -53,6 +54,11 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         
         return data
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    # Le nouveau jeton d'accès porte le rôle courant de l'utilisateur
+    token_class = RoleRefreshToken
+
+
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
     
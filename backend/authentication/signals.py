@@ -0,0 +1,15 @@
+"""
+Révocation des jetons JWT à la suppression d'un utilisateur (voir `authentication.tokens`).
+"""
+from django.db.models.signals import post_delete
+
+from .models import User
+from .tokens import forget_token_version
+
+
+def _revoke_deleted_user(sender, instance, **kwargs):
+    forget_token_version(instance.pk)
+
+
+def connect_signals():
+    post_delete.connect(_revoke_deleted_user, sender=User, dispatch_uid='authentication.revoke_deleted_user')
@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.test import TestCase
+from rest_framework.test import APIClient
+from . import notifications
+from .models import LoginNotification, User
+from .tokens import RoleRefreshToken, revoke_tokens
+
+
+class LoginNotificationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = get_user_model().objects.create_user(username='admin', password='x', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_mark_all_read_recounts_unread(self):
+        LoginNotification.objects.create(user=self.admin)
+        self.assertEqual(notifications.unread_count(), 1)
+
+        # Écriture groupée arrivée juste après le `update()` de « tout marquer comme lu »
+        update = QuerySet.update
+
+        def update_then_flush(queryset, **values):
+            updated = update(queryset, **values)
+            LoginNotification.objects.create(user=self.admin)
+            return updated
+
+        with mock.patch.object(QuerySet, 'update', update_then_flush):
+            response = self.client.post('/api/auth/notifications/read-all/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(notifications.unread_count(), 1)
+
+
+class RoleTokenTests(TestCase):
+    url = '/api/auth/cache-stats/'  # Réservée aux rôles admin / superuser
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='admin', password='x', role='admin')
+        self.refresh = RoleRefreshToken.for_user(self.user)
+
+    def get(self, access):
+        return APIClient(HTTP_AUTHORIZATION=f'Bearer {access}').get(self.url)
+
+    def test_role_read_from_claims_without_user_query(self):
+        access = self.refresh.access_token
+        self.assertEqual(access['role'], 'admin')
+        self.assertEqual(self.get(access).status_code, 200)
+        # Version des jetons en cache : plus aucune lecture de la table des utilisateurs
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(access).status_code, 200)
+
+    def refresh_token(self):
+        return APIClient().post('/api/auth/token/refresh/', {'refresh': str(self.refresh)}, format='json')
+
+    def test_role_change_revokes_access_and_refresh(self):
+        access = self.refresh.access_token
+        self.assertEqual(self.get(access).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = 'secretary'
+            self.user.save()
+        self.assertEqual(self.get(access).status_code, 401)
+        # Reconnexion nécessaire : le jeton de rafraîchissement porte l'ancienne version
+        self.assertEqual(self.refresh_token().status_code, 401)
+
+        login = APIClient().post('/api/auth/token/', {'username': 'admin', 'password': 'x'}, format='json')
+        self.assertEqual(login.status_code, 200)
+        self.assertEqual(self.get(login.data['access']).status_code, 403)
+
+    def test_refresh_rejected_after_revoke_tokens(self):
+        self.assertEqual(self.refresh_token().status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            revoke_tokens(User.objects.filter(pk=self.user.pk))
+        self.assertEqual(self.refresh_token().status_code, 401)
+
+    def test_queryset_update_revokes(self):
+        access = self.refresh.access_token
+        self.assertEqual(self.get(access).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get(access).status_code, 401)
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, self.user.token_version + 1)
+
+    def test_unrelated_update_keeps_tokens(self):
+        access = self.refresh.access_token
+        User.objects.filter(pk=self.user.pk).update(department='Radiologie')
+        self.assertEqual(self.get(access).status_code, 200)
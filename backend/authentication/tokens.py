@@ -0,0 +1,106 @@
+"""
+Jetons JWT porteurs du rôle.
+
+Le jeton d'accès embarque le rôle, les drapeaux actif/staff/superuser et la
+version des jetons de l'utilisateur (`User.token_version`) : le middleware
+de rôles et les permissions DRF n'ont plus besoin de lire la table des
+utilisateurs. `request.user` est une instance `User` partielle construite
+depuis le jeton ; les autres champs sont chargés (en une requête) au
+premier accès.
+
+Révocation : désactiver un utilisateur ou changer son rôle incrémente
+`token_version`, publiée dans le cache partagé ; tout jeton portant une
+version antérieure est refusé à la requête suivante, et ne peut plus être
+rafraîchi (reconnexion nécessaire). Cela vaut pour
+`User.save()` comme pour `User.objects.filter(...).update(role=...)`
+(voir `UserQuerySet`) ; seul le SQL écrit à la main y échappe.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.cache import make_key
+
+TOKEN_VERSION_CLAIM = 'token_version'
+USER_CLAIMS = ('username', 'role', 'is_active', 'is_staff', 'is_superuser')
+
+
+def _version_key(user_id):
+    return make_key('auth', 'token_version', user_id)
+
+
+def current_token_version(user_id):
+    """Version des jetons de l'utilisateur (cache, base de données en secours)"""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = get_user_model().objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is None:
+            return None
+        cache.add(key, version, timeout=None)
+    return version
+
+
+def publish_token_version(user_id, version):
+    """Publie la nouvelle version après validation de la transaction"""
+    transaction.on_commit(lambda: cache.set(_version_key(user_id), version, timeout=None))
+
+
+def forget_token_version(*user_ids):
+    """Retire les versions du cache : la base fait foi au prochain accès"""
+    transaction.on_commit(lambda: cache.delete_many([_version_key(pk) for pk in user_ids]))
+
+
+def revoke_tokens(queryset):
+    """Révoque les jetons d'un ensemble d'utilisateurs (mises à jour groupées)"""
+    user_ids = list(queryset.values_list('pk', flat=True))
+    get_user_model().objects.filter(pk__in=user_ids).update(token_version=F('token_version') + 1)
+    forget_token_version(*user_ids)
+
+
+def add_user_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+    return token
+
+
+def user_from_claims(token):
+    """
+    Utilisateur partiel construit depuis les revendications du jeton :
+    aucun accès à la base tant que la vue ne lit que ces champs.
+    """
+    User = get_user_model()
+    claims = {claim: token[claim] for claim in USER_CLAIMS}
+    claims[User._meta.pk.attname] = User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+    claims['token_version'] = token[TOKEN_VERSION_CLAIM]
+    # from_db attend les valeurs dans l'ordre des colonnes du modèle
+    field_names = [f.attname for f in User._meta.concrete_fields if f.attname in claims]
+    return User.from_db('default', field_names, [claims[name] for name in field_names])
+
+
+class RoleRefreshToken(RefreshToken):
+    """Jeton de rafraîchissement dont les jetons d'accès portent le rôle courant"""
+
+    @classmethod
+    def for_user(cls, user):
+        return add_user_claims(super().for_user(user), user)
+
+    @property
+    def access_token(self):
+        access = super().access_token
+        # Rôle et version relus en base : un jeton de rafraîchissement révoqué
+        # (rôle changé, compte désactivé, sessions révoquées) est refusé
+        user = get_user_model().objects.filter(pk=self.payload.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None:
+            return access
+        if TOKEN_VERSION_CLAIM in self.payload and self.payload[TOKEN_VERSION_CLAIM] != user.token_version:
+            raise AuthenticationFailed(
+                "Session expirée suite à une modification du compte. Veuillez vous reconnecter.",
+                code='token_revoked',
+            )
+        return add_user_claims(access, user)
@@ -6,6 +6,7 @@ from .views import (
     UserViewSet, 
     current_user,
     system_stats,
+    cache_stats,
     admin_stats,
     secretary_stats,
     accountant_stats,
@@ -29,6 +30,7 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('me/', current_user, name='current_user'),
     path('system-stats/', system_stats, name='system_stats'),
+    path('cache-stats/', cache_stats, name='cache_stats'),
     path('admin-stats/', AdminDashboardView.as_view(), name='admin_stats'),
     path('doctor-stats/', DoctorDashboardView.as_view(), name='doctor_stats'),
     path('secretary-stats/', SecretaryDashboardView.as_view(), name='secretary_stats'),
@@ -3,6 +3,9 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.utils.http import http_date, parse_http_date_safe
+from . import notifications
 from .models import User
 from .serializers import (
     CustomTokenObtainPairSerializer, 
@@ -113,6 +116,23 @@ def system_stats(request):
     }
     return Response(stats)
 
+@api_view(['GET', 'DELETE'])
+@permission_classes([permissions.IsAuthenticated])
+def cache_stats(request):
+    """Statistiques hits/misses du cache partagé (DELETE pour remettre à zéro)"""
+    if request.user.role not in ['superuser', 'admin']:
+        return Response({'detail': 'Accès refusé'}, status=403)
+    
+    from core.cache import metrics
+    
+    if request.method == 'DELETE':
+        metrics.reset()
+        return Response({'status': 'ok'})
+    return Response({
+        'backend': settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1],
+        'namespaces': metrics.snapshot(),
+    })
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def admin_stats(request):
@@ -120,7 +140,7 @@ def admin_stats(request):
     if not getattr(request.user, 'role', '') in ['superuser', 'admin']:
         return Response({'detail': 'Accès refusé'}, status=403)
     
-    from patients.models import Patient
+    from patients.models import Patient, access_key_generator, patient_id_generator
     from invoices.models import Invoice
     from django.db import models
     
@@ -131,6 +151,11 @@ def admin_stats(request):
             total=models.Sum('total_amount'))['total'] or 0,
         'pending_exams': 0,  # À implémenter avec le modèle Exam
         'active_users': User.objects.filter(is_active=True).count(),
+        # Saturation des identifiants aléatoires (statistiques du processus qui répond)
+        'identifiers': {
+            'patient_id': patient_id_generator.metrics(),
+            'access_key': access_key_generator.metrics(),
+        },
     }
     return Response(stats)
 
@@ -194,17 +219,44 @@ def accountant_stats(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def login_notifications(request):
-    """Liste des notifications de connexion pour admin/superuser"""
+    """
+    Liste des notifications de connexion pour admin/superuser.
+    Pagination par curseur (`?before=<id>&limit=50`) ; réponse 304 si le flux
+    n'a pas changé depuis `If-None-Match` / `If-Modified-Since`.
+    """
     if request.user.role not in ['superuser', 'admin']:
         return Response({'detail': 'Accès refusé'}, status=403)
     
-    notifications = LoginNotification.objects.select_related('user').all()[:50]
-    serializer = LoginNotificationSerializer(notifications, many=True)
-    unread_count = LoginNotification.objects.filter(is_read=False).count()
-    return Response({
-        'results': serializer.data,
-        'unread_count': unread_count,
-    })
+    version, modified = notifications.feed_state()
+    etag = f'"login-{version}"'
+    last_modified = int(modified)
+    if_none_match = request.headers.get('If-None-Match')
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+    if (if_none_match == etag) or (not if_none_match and if_modified_since and if_modified_since >= last_modified):
+        response = Response(status=304)
+    else:
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), 200)
+            before = request.query_params.get('before')
+            before = int(before) if before else None
+        except ValueError:
+            return Response({'detail': 'Paramètres de pagination invalides'}, status=400)
+        
+        queryset = LoginNotification.objects.select_related('user').order_by('-pk')
+        if before is not None:
+            queryset = queryset.filter(pk__lt=before)
+        page = list(queryset[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+        response = Response({
+            'results': LoginNotificationSerializer(page, many=True).data,
+            'unread_count': notifications.unread_count(),
+            'next_before': page[-1].pk if has_more else None,
+        })
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 @api_view(['POST'])
@@ -213,13 +265,12 @@ def mark_notification_read(request, pk):
     """Marquer une notification comme lue"""
     if request.user.role not in ['superuser', 'admin']:
         return Response({'detail': 'Accès refusé'}, status=403)
-    try:
-        notif = LoginNotification.objects.get(pk=pk)
-        notif.is_read = True
-        notif.save()
-        return Response({'status': 'ok'})
-    except LoginNotification.DoesNotExist:
+    if LoginNotification.objects.filter(pk=pk, is_read=False).update(is_read=True):
+        notifications.adjust_unread(-1)
+        notifications.touch_feed()
+    elif not LoginNotification.objects.filter(pk=pk).exists():
         return Response({'detail': 'Notification introuvable'}, status=404)
+    return Response({'status': 'ok'})
 
 
 @api_view(['POST'])
@@ -228,5 +279,7 @@ def mark_all_notifications_read(request):
     """Marquer toutes les notifications comme lues"""
     if request.user.role not in ['superuser', 'admin']:
         return Response({'detail': 'Accès refusé'}, status=403)
-    LoginNotification.objects.filter(is_read=False).update(is_read=True)
+    if LoginNotification.objects.filter(is_read=False).update(is_read=True):
+        notifications.touch_feed()
+    notifications.recount_unread()
     return Response({'status': 'ok'})
@@ -9,11 +9,14 @@ from patients.models import Patient, PatientAccess
 from invoices.models import Invoice, InvoiceItem
 from reports.models import PatientReport
 from django.contrib.auth import get_user_model
+from core.db_router import ReplicaReadMixin
 
 User = get_user_model()
 
-class BaseDashboardView(APIView):
+class BaseDashboardView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
+    # Agrégats lus sur la réplique (core.db_router)
+    replica_actions = ('get',)
 
     def get_user_stats(self, user):
         # Statistiques communes à tous les utilisateurs
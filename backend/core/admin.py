@@ -0,0 +1,21 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'priority', 'attempts', 'run_at', 'wait_ms', 'duration_ms', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'locked_by', 'locked_at', 'wait_ms', 'duration_ms', 'last_error')
+    date_hierarchy = 'created_at'
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status='running').update(
+            status='pending', attempts=0, run_at=timezone.now(), finished_at=None, last_error='',
+        )
+        self.message_user(request, f'{updated} tâche(s) remise(s) en attente.')
+    retry_jobs.short_description = 'Relancer les tâches sélectionnées'
@@ -1,10 +1,46 @@
-from django.contrib import admin
-from django.db.models import Q
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models import Count, Q, QuerySet
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.html import format_html
+from . import cache as cache_layer
+from .conditional import update_touching
+from .export import export_response
+from .search_query import SearchCompiler, SearchSyntaxError
+from .signals import invalidate_queryset
 
 
 class AdvancedSearchMixin:
-    """Mixin pour ajouter des fonctionnalités de recherche avancée à l'admin Django"""
+    """
+    Mixin pour ajouter des fonctionnalités de recherche avancée à l'admin Django.
+    
+    Les opérateurs (`champ:valeur`, plages, comparaisons, voir
+    `core.search_query`) ne portent que sur les colonnes indexées déclarées :
+    
+        search_operators = {'montant': 'total_amount', 'ref': ('reference_number', 'transaction_id')}
+        search_default_date = 'invoice_date'     # 2024-01-01, 2024-01-01:2024-12-31
+        search_default_amount = 'total_amount'   # >1000, <500, 1000-2000
+    """
+    search_operators = {}
+    search_default_date = None
+    search_default_amount = None
+    
+    def get_search_compiler(self):
+        return SearchCompiler(
+            self.model, self.search_operators,
+            default_date=self.search_default_date, default_amount=self.search_default_amount,
+        )
+    
+    def check(self, **kwargs):
+        errors = super().check(**kwargs)
+        errors.extend(self.get_search_compiler().check(obj=self.__class__))
+        return errors
     
     def get_search_results(self, request, queryset, search_term):
         """Améliore la recherche avec des opérateurs spéciaux"""
@@ -13,59 +49,64 @@ class AdvancedSearchMixin:
         
         # Recherche par ID exact si le terme est numérique
         if search_term.isdigit():
-            id_queryset = queryset.filter(id=int(search_term))
+            id_queryset = queryset.filter(pk=int(search_term))
             if id_queryset.exists():
                 return id_queryset, False
         
-        # Recherche par plage de dates (format: YYYY-MM-DD:YYYY-MM-DD)
-        if ':' in search_term and len(search_term.split(':')) == 2:
-            try:
-                start_date, end_date = search_term.split(':')
-                date_fields = [f.name for f in self.model._meta.fields if f.get_internal_type() in ['DateField', 'DateTimeField']]
-                if date_fields:
-                    date_filter = Q()
-                    for field in date_fields:
-                        date_filter |= Q(**{f'{field}__gte': start_date, f'{field}__lte': end_date})
-                    return queryset.filter(date_filter), False
-            except:
-                pass
-        
-        # Recherche par montant (format: >1000 ou <500 ou 1000-2000)
-        if search_term.startswith('>') or search_term.startswith('<'):
-            try:
-                operator = search_term[0]
-                amount = float(search_term[1:])
-                amount_fields = [f.name for f in self.model._meta.fields if f.get_internal_type() == 'DecimalField']
-                if amount_fields:
-                    amount_filter = Q()
-                    for field in amount_fields:
-                        if operator == '>':
-                            amount_filter |= Q(**{f'{field}__gte': amount})
-                        else:
-                            amount_filter |= Q(**{f'{field}__lte': amount})
-                    return queryset.filter(amount_filter), False
-            except:
-                pass
+        try:
+            queryset, remaining = self.get_search_compiler().apply(queryset, search_term)
+        except SearchSyntaxError as e:
+            self.message_user(request, f"Recherche avancée ignorée : {e}", level=messages.WARNING)
+            return super().get_search_results(request, queryset, search_term)
         
-        # Recherche par plage de montants (format: 1000-2000)
-        if '-' in search_term and search_term.replace('-', '').replace('.', '').isdigit():
-            try:
-                min_amount, max_amount = search_term.split('-')
-                min_amount, max_amount = float(min_amount), float(max_amount)
-                amount_fields = [f.name for f in self.model._meta.fields if f.get_internal_type() == 'DecimalField']
-                if amount_fields:
-                    amount_filter = Q()
-                    for field in amount_fields:
-                        amount_filter |= Q(**{f'{field}__gte': min_amount, f'{field}__lte': max_amount})
-                    return queryset.filter(amount_filter), False
-            except:
-                pass
-        
-        # Recherche normale
-        return super().get_search_results(request, queryset, search_term)
+        # Recherche normale sur les mots restants
+        if remaining:
+            return super().get_search_results(request, queryset, remaining)
+        return queryset, False
+    
+    def get_search_tips(self):
+        """Conseils de recherche d'après les opérateurs déclarés"""
+        tips = ["Recherche par ID : tapez simplement le numéro"]
+        if self.search_default_amount:
+            tips.append("Recherche par montant : >1000 ou <500 ou 1000-2000")
+        if self.search_default_date:
+            tips.append("Recherche par date : 2024-01-01 ou 2024-01-01:2024-12-31")
+        if self.search_operators:
+            aliases = ', '.join(f'{alias}:' for alias in self.search_operators)
+            tips.append(f"Recherche par champ : {aliases} (plages a..b, comparaisons >, >=, <, <=)")
+        tips.append("Recherche normale : nom, téléphone, email, etc.")
+        return tips
 
 
-class BulkActionsMixin:
+class ExportActionsMixin:
+    """Mixin ajoutant l'export CSV / Excel en flux (voir `core.export`)"""
+    
+    # [(en-tête, lookup), ...] ; tous les champs du modèle si non défini
+    export_fields = None
+    
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions['export_to_csv'] = (type(self).export_to_csv, 'export_to_csv', 'Exporter en CSV')
+        actions['export_to_xlsx'] = (type(self).export_to_xlsx, 'export_to_xlsx', 'Exporter en Excel')
+        return actions
+    
+    def get_export_columns(self, request):
+        return self.export_fields
+    
+    def export_to_csv(self, request, queryset):
+        """Exporte les éléments sélectionnés en CSV (en flux, mémoire constante)"""
+        return export_response(
+            queryset, self.get_export_columns(request), str(self.model._meta.verbose_name_plural), 'csv'
+        )
+    
+    def export_to_xlsx(self, request, queryset):
+        """Exporte les éléments sélectionnés en Excel (en flux, mémoire constante)"""
+        return export_response(
+            queryset, self.get_export_columns(request), str(self.model._meta.verbose_name_plural), 'xlsx'
+        )
+
+
+class BulkActionsMixin(ExportActionsMixin):
     """Mixin pour ajouter des actions en lot optimisées"""
     
     def get_actions(self, request):
@@ -73,74 +114,141 @@ class BulkActionsMixin:
         
         # Ajouter des actions de recherche rapide
         if hasattr(self, 'bulk_activate'):
-            actions['bulk_activate'] = (self.bulk_activate, 'bulk_activate', 'Activer en lot')
+            actions['bulk_activate'] = (type(self).bulk_activate, 'bulk_activate', 'Activer en lot')
         if hasattr(self, 'bulk_deactivate'):
-            actions['bulk_deactivate'] = (self.bulk_deactivate, 'bulk_deactivate', 'Désactiver en lot')
-        if hasattr(self, 'export_to_csv'):
-            actions['export_to_csv'] = (self.export_to_csv, 'export_to_csv', 'Exporter en CSV')
+            actions['bulk_deactivate'] = (type(self).bulk_deactivate, 'bulk_deactivate', 'Désactiver en lot')
         
         return actions
     
     def bulk_activate(self, request, queryset):
         """Active les éléments sélectionnés"""
-        updated = queryset.update(is_active=True)
+        updated = update_touching(queryset, is_active=True)
+        invalidate_queryset(queryset)
         self.message_user(request, f'{updated} éléments activés.')
     
     def bulk_deactivate(self, request, queryset):
         """Désactive les éléments sélectionnés"""
-        updated = queryset.update(is_active=False)
+        updated = update_touching(queryset, is_active=False)
+        invalidate_queryset(queryset)
         self.message_user(request, f'{updated} éléments désactivés.')
+
+
+def table_row_estimate(model, using='default'):
+    """
+    Nombre de lignes estimé d'après les statistiques de la base (sans COUNT(*)),
+    None si la base n'en fournit pas.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'mysql':
+        sql = "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+    elif connection.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)"
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    # PostgreSQL : -1 tant que la table n'a jamais été analysée
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def cached_row_estimate(model, using='default'):
+    return cache_layer.get_or_set(
+        'admin_stats', ['estimate', model._meta.label_lower, using],
+        lambda: table_row_estimate(model, using),
+        timeout=getattr(settings, 'ADMIN_STATS_CACHE_TIMEOUT', 300),
+    )
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginateur de l'admin : pour une liste non filtrée d'une grande table,
+    le total vient des statistiques de la base au lieu d'un COUNT(*) complet.
+    En dessous de ADMIN_ESTIMATED_COUNT_THRESHOLD lignes, le compte reste exact.
+
+    L'estimation peut être périmée : une page demandée vide (total surestimé)
+    ou au-delà de la dernière page estimée (total sous-estimé) est recalculée
+    sur le compte exact et ramenée à la dernière page réelle.
+    """
+    estimated = False
     
-    def export_to_csv(self, request, queryset):
-        """Exporte les éléments sélectionnés en CSV"""
-        import csv
-        from django.http import HttpResponse
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{self.model._meta.verbose_name_plural}.csv"'
-        
-        writer = csv.writer(response)
-        
-        # En-têtes
-        field_names = [field.verbose_name for field in self.model._meta.fields]
-        writer.writerow(field_names)
-        
-        # Données
-        for obj in queryset:
-            row = []
-            for field in self.model._meta.fields:
-                value = getattr(obj, field.name)
-                if hasattr(value, 'strftime'):
-                    value = value.strftime('%Y-%m-%d %H:%M:%S')
-                row.append(str(value) if value is not None else '')
-            writer.writerow(row)
-        
-        return response
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where and not queryset.query.distinct:
+            estimate = cached_row_estimate(queryset.model, queryset.db)
+            if estimate is not None and estimate >= getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000):
+                self.estimated = True
+                return estimate
+        return Paginator.count.func(self)
+
+    def page(self, number):
+        try:
+            page = super().page(number)
+        except EmptyPage:
+            if not self.estimated:
+                raise
+        else:
+            # len() évalue la page : l'admin réutilise ensuite ces lignes
+            if not self.estimated or len(page) or int(number) == 1:
+                return page
+        self.estimated = False
+        self.count = Paginator.count.func(self)
+        self.__dict__.pop('num_pages', None)
+        return super().page(min(int(number), self.num_pages))
+
+
+class EstimatedCountChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+        # Estimation corrigée par le paginateur : total et page affichés suivent le compte exact
+        if self.multi_page and not self.paginator.estimated:
+            self.result_count = self.paginator.count
+            self.page_num = min(self.page_num, self.paginator.num_pages)
+
+
+class EstimatedCountAdmin:
+    """
+    Mixin des listes volumineuses de l'admin : total estimé (voir
+    `EstimatedCountPaginator`) et pas de second COUNT(*) sur la table entière.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return EstimatedCountChangeList
 
 
 class SearchStatsAdmin:
     """Classe pour afficher des statistiques de recherche dans l'admin"""
     
+    def get_list_stats(self, request):
+        """Statistiques de la liste en une requête, en cache ADMIN_STATS_CACHE_TIMEOUT secondes"""
+        def compute():
+            # Statistiques par période (30 derniers jours)
+            last_30_days = timezone.now() - timedelta(days=30)
+            aggregates = {'total_count': Count('pk')}
+            if hasattr(self.model, 'is_active'):
+                aggregates['active_count'] = Count('pk', filter=Q(is_active=True))
+            if hasattr(self.model, 'created_at'):
+                aggregates['recent_count'] = Count('pk', filter=Q(created_at__gte=last_30_days))
+            stats = {'active_count': None, 'recent_count': None}
+            stats.update(self.get_queryset(request).aggregate(**aggregates))
+            return stats
+        
+        return cache_layer.get_or_set(
+            'admin_stats', ['changelist', self.model._meta.label_lower], compute,
+            timeout=getattr(settings, 'ADMIN_STATS_CACHE_TIMEOUT', 300),
+        )
+    
     def changelist_view(self, request, extra_context=None):
         """Ajoute des statistiques à la vue de liste"""
         extra_context = extra_context or {}
-        
-        # Statistiques de base
-        total_count = self.get_queryset(request).count()
-        active_count = self.get_queryset(request).filter(is_active=True).count() if hasattr(self.model, 'is_active') else None
-        
-        # Statistiques par période (30 derniers jours)
-        from datetime import datetime, timedelta
-        last_30_days = datetime.now() - timedelta(days=30)
-        recent_count = self.get_queryset(request).filter(created_at__gte=last_30_days).count() if hasattr(self.model, 'created_at') else None
-        
-        extra_context.update({
-            'total_count': total_count,
-            'active_count': active_count,
-            'recent_count': recent_count,
-            'search_tips': self.get_search_tips()
-        })
-        
+        extra_context.update(self.get_list_stats(request))
+        extra_context['search_tips'] = self.get_search_tips()
         return super().changelist_view(request, extra_context)
     
     def get_search_tips(self):
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+    verbose_name = 'Noyau'
+
+    def ready(self):
+        from django.apps import apps
+        from django.utils.module_loading import autodiscover_modules
+        from .signals import connect_signals
+        connect_signals(apps)
+        # Déclaration des tâches d'arrière-plan (`<app>/tasks.py`)
+        autodiscover_modules('tasks')
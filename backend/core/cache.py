@@ -0,0 +1,192 @@
+"""
+Couche de cache partagée entre les workers.
+
+- Clés préfixées par un espace de noms (`patients:detail:42`...).
+- Invalidation par tags : chaque tag possède un numéro de version stocké dans
+  le cache ; les entrées sont indexées par les versions de leurs tags, donc
+  incrémenter un tag rend obsolètes toutes les entrées qui en dépendent.
+- Les tags sont invalidés automatiquement à l'enregistrement/suppression des
+  modèles suivis (voir `core.signals`).
+- Compteurs hits/misses par espace de noms, agrégés entre processus.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = getattr(settings, 'CACHE_DEFAULT_TIMEOUT', 300)
+
+# Les compteurs locaux sont reportés dans le cache partagé tous les N événements
+METRICS_FLUSH_EVERY = 50
+
+_MISSING = object()
+
+
+def make_key(namespace, *parts):
+    """Construit une clé namespacée : `namespace:part1:part2`"""
+    return ':'.join([namespace, *(str(part) for part in parts)])
+
+
+# ---------------------------------------------------------------------------
+# Tags
+# ---------------------------------------------------------------------------
+
+def _tag_key(tag):
+    return make_key('tag', tag)
+
+
+def _new_version():
+    # Jamais une constante : un tag expulsé puis réinitialisé ne doit pas
+    # retrouver une version déjà utilisée par des entrées encore en cache
+    return time.time_ns()
+
+
+def tag_versions(tags):
+    """Retourne la version courante de chaque tag (initialisée à l'horloge en ns)"""
+    if not tags:
+        return {}
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, tag in keys.items():
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _new_version(), timeout=None)
+            version = cache.get(key)
+            if version is None:
+                version = _new_version()
+        versions[tag] = version
+    return versions
+
+
+def tag_version(tag):
+    return tag_versions([tag])[tag]
+
+
+def invalidate_tags(*tags):
+    """Invalide toutes les entrées dépendant d'un des tags"""
+    for tag in tags:
+        key = _tag_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Tag jamais lu ou expulsé du cache : nouvelle version, jamais utilisée
+            cache.set(key, _new_version(), timeout=None)
+    if tags:
+        logger.debug("Tags de cache invalidés: %s", ', '.join(tags))
+
+
+def _versioned_key(namespace, parts, tags):
+    versions = tag_versions(tags)
+    suffix = '.'.join(f'{tag}={versions[tag]}' for tag in sorted(versions))
+    return make_key(namespace, *parts, suffix) if suffix else make_key(namespace, *parts)
+
+
+# ---------------------------------------------------------------------------
+# Lecture / écriture
+# ---------------------------------------------------------------------------
+
+def get(namespace, parts, tags=(), default=None):
+    value = cache.get(_versioned_key(namespace, parts, tags), _MISSING)
+    if value is _MISSING:
+        metrics.record(namespace, hit=False)
+        return default
+    metrics.record(namespace, hit=True)
+    return value
+
+
+def set(namespace, parts, value, tags=(), timeout=DEFAULT_TIMEOUT):
+    cache.set(_versioned_key(namespace, parts, tags), value, timeout)
+
+
+def get_or_set(namespace, parts, compute, tags=(), timeout=DEFAULT_TIMEOUT):
+    """Retourne la valeur en cache ou la calcule et la stocke"""
+    key = _versioned_key(namespace, parts, tags)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        metrics.record(namespace, hit=True)
+        return value
+    metrics.record(namespace, hit=False)
+    value = compute()
+    cache.set(key, value, timeout)
+    return value
+
+
+def delete(namespace, parts, tags=()):
+    cache.delete(_versioned_key(namespace, parts, tags))
+
+
+# ---------------------------------------------------------------------------
+# Métriques
+# ---------------------------------------------------------------------------
+
+class CacheMetrics:
+    """Compteurs hits/misses par espace de noms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(lambda: {'hits': 0, 'misses': 0})
+        self._pending_events = 0
+
+    def record(self, namespace, hit):
+        with self._lock:
+            self._pending[namespace]['hits' if hit else 'misses'] += 1
+            self._pending_events += 1
+            if self._pending_events < METRICS_FLUSH_EVERY:
+                return
+            pending, self._pending = self._pending, defaultdict(lambda: {'hits': 0, 'misses': 0})
+            self._pending_events = 0
+        self._flush(pending)
+
+    def _flush(self, pending):
+        namespaces = cache.get(make_key('metrics', 'namespaces')) or []
+        for namespace, counters in pending.items():
+            for counter, value in counters.items():
+                if not value:
+                    continue
+                key = make_key('metrics', namespace, counter)
+                if not cache.add(key, value, timeout=None):
+                    try:
+                        cache.incr(key, value)
+                    except ValueError:
+                        cache.set(key, value, timeout=None)
+            if namespace not in namespaces:
+                namespaces.append(namespace)
+        cache.set(make_key('metrics', 'namespaces'), namespaces, timeout=None)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: {'hits': 0, 'misses': 0})
+            self._pending_events = 0
+        self._flush(pending)
+
+    def snapshot(self):
+        """Statistiques agrégées (tous processus) par espace de noms"""
+        self.flush()
+        namespaces = cache.get(make_key('metrics', 'namespaces')) or []
+        stats = {}
+        for namespace in namespaces:
+            hits = cache.get(make_key('metrics', namespace, 'hits'), 0)
+            misses = cache.get(make_key('metrics', namespace, 'misses'), 0)
+            total = hits + misses
+            stats[namespace] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / total, 4) if total else None,
+            }
+        return stats
+
+    def reset(self):
+        namespaces = cache.get(make_key('metrics', 'namespaces')) or []
+        cache.delete_many([
+            make_key('metrics', namespace, counter)
+            for namespace in namespaces for counter in ('hits', 'misses')
+        ] + [make_key('metrics', 'namespaces')])
+
+
+metrics = CacheMetrics()
@@ -0,0 +1,115 @@
+"""
+Requêtes GET conditionnelles (ETag / Last-Modified) pour les ViewSets.
+
+`ConditionalGetMixin` calcule des validateurs peu coûteux avant toute
+sérialisation :
+- liste : une agrégation (nombre de lignes et `Max` des champs de
+  `conditional_fields`) sur le queryset filtré ;
+- détail : les mêmes champs lus sur l'instance.
+
+L'ETag dépend aussi de l'URL complète (page, filtres, tri), du format de
+rendu et de l'utilisateur. Si le client le renvoie dans `If-None-Match`,
+la réponse est un 304 vide. `If-Modified-Since` n'est honoré que pour le
+détail : une suppression ne fait pas reculer le `Max` d'une liste.
+
+Les modifications par `QuerySet.update()` doivent mettre à jour
+`updated_at` elles aussi (`update_touching`) pour être vues.
+
+Les données servies depuis un autre cache (catalogue des examens...) ne
+changent aucune date de la liste : `conditional_tags` ajoute à l'ETag la
+version des tags de cache correspondants (`core.cache`).
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import cache as cache_layer
+
+
+def update_touching(queryset, **values):
+    """`queryset.update(**values)` qui met aussi à jour `updated_at` s'il existe"""
+    if any(field.name == 'updated_at' for field in queryset.model._meta.concrete_fields):
+        values.setdefault('updated_at', timezone.now())
+    return queryset.update(**values)
+
+
+def _resolve(instance, lookup):
+    for attr in lookup.split('__'):
+        if instance is None:
+            return None
+        instance = getattr(instance, attr)
+    return instance
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet : `list` et `retrieve` répondent 304 quand le client a déjà la
+    représentation. `conditional_fields` : dates de modification (lookups
+    ORM, relations comprises) dont dépend la représentation ;
+    `conditional_tags` : tags de cache des autres données représentées.
+    """
+    conditional_fields = ('updated_at',)
+    conditional_tags = ()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        aggregates = {f'max_{i}': Max(lookup) for i, lookup in enumerate(self.conditional_fields)}
+        # order_by() : pas de tri inutile dans l'agrégation
+        validators = queryset.order_by().aggregate(count=Count('pk'), **aggregates)
+        modified = [value for key, value in validators.items() if key != 'count' and value is not None]
+        etag = self.conditional_etag(request, validators['count'], *modified)
+        last_modified = max(modified) if modified else None
+
+        if self.etag_matches(request, etag):
+            return self.not_modified(etag, last_modified)
+        response = super().list(request, *args, **kwargs)
+        return self.with_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        modified = [value for value in (_resolve(instance, lookup) for lookup in self.conditional_fields) if value]
+        etag = self.conditional_etag(request, instance.pk, *modified)
+        last_modified = max(modified) if modified else None
+
+        # Un changement de tag ne fait pas avancer Last-Modified : ETag seul
+        if self.etag_matches(request, etag) or (
+            'If-None-Match' not in request.headers and not self.conditional_tags
+            and self.unmodified_since(request, last_modified)
+        ):
+            return self.not_modified(etag, last_modified)
+        serializer = self.get_serializer(instance)
+        return self.with_validators(Response(serializer.data), etag, last_modified)
+
+    def conditional_etag(self, request, *parts):
+        renderer = getattr(request, 'accepted_renderer', None)
+        versions = cache_layer.tag_versions(self.conditional_tags)
+        raw = '|'.join(str(part) for part in (
+            request.get_full_path(), getattr(renderer, 'format', ''), request.user.pk, *parts,
+            *(f'{tag}={versions[tag]}' for tag in sorted(versions)),
+        ))
+        return 'W/"%s-%s"' % (self.get_queryset().model._meta.model_name, hashlib.md5(raw.encode()).hexdigest()[:16])
+
+    def etag_matches(self, request, etag):
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        return etag in etags or '*' in etags
+
+    def unmodified_since(self, request, last_modified):
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+        return bool(last_modified and if_modified_since and if_modified_since >= int(last_modified.timestamp()))
+
+    def not_modified(self, etag, last_modified):
+        return self.with_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+
+    def with_validators(self, response, etag, last_modified):
+        if response.status_code not in (200, 304):
+            return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Le navigateur revalide à chaque fois (données médicales : jamais en cache partagé)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
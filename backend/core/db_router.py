@@ -0,0 +1,237 @@
+"""
+Réplique MySQL en lecture pour les tableaux de bord, statistiques et listes.
+
+Les lectures ne partent vers la réplique (`DB_REPLICA_ALIAS`, déclarée par
+`DB_REPLICA_HOST`) qu'à l'intérieur d'un bloc `replica_reads()` : vues DRF
+avec `ReplicaReadMixin` (actions de `replica_actions`) ou fonctions décorées
+par `use_replica`. Tout le reste, écritures comprises, reste sur `default`.
+
+Repli sur `default` :
+- si le retard de réplication dépasse `DB_REPLICA_MAX_LAG` secondes ou si la
+  réplique ne répond pas (vérifié au plus toutes les
+  `DB_REPLICA_CHECK_INTERVAL` secondes par processus) ;
+- pendant `DB_REPLICA_PIN_SECONDS` après une requête d'écriture (POST, PUT,
+  PATCH, DELETE) du même utilisateur, pour qu'il relise ce qu'il vient
+  d'enregistrer (`ReplicaPinMiddleware`).
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+from .cache import make_key
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Alias utilisé pour les lectures du bloc en cours (None : default)
+_read_alias = ContextVar('replica_read_alias', default=None)
+
+_lag_lock = threading.Lock()
+_lag_state = {'checked_at': 0.0, 'lag': 0.0}
+
+
+def replica_alias():
+    """Alias de la réplique, None si aucune réplique n'est configurée"""
+    alias = getattr(settings, 'DB_REPLICA_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def max_lag():
+    return getattr(settings, 'DB_REPLICA_MAX_LAG', 5)
+
+
+def check_interval():
+    return getattr(settings, 'DB_REPLICA_CHECK_INTERVAL', 5)
+
+
+def pin_seconds():
+    return getattr(settings, 'DB_REPLICA_PIN_SECONDS', 10)
+
+
+# ---------------------------------------------------------------------------
+# Retard de réplication
+# ---------------------------------------------------------------------------
+
+def measure_lag(alias):
+    """Retard de la réplique en secondes (inf si la réplication est arrêtée ou injoignable)"""
+    connection = connections[alias]
+    if connection.vendor != 'mysql':
+        # SQLite (tests locaux) : pas de réplication
+        return 0.0
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute('SHOW REPLICA STATUS')
+        except DatabaseError:
+            # MySQL < 8.0.22
+            cursor.execute('SHOW SLAVE STATUS')
+        row = cursor.fetchone()
+        if row is None:
+            # Pas une réplique (ex. même serveur que default) : toujours à jour
+            return 0.0
+        status = dict(zip([column[0] for column in cursor.description], row))
+    lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+    return float('inf') if lag is None else float(lag)
+
+
+def replica_lag(alias):
+    """Retard mesuré, mis en cache dans le processus pendant DB_REPLICA_CHECK_INTERVAL"""
+    now = time.monotonic()
+    with _lag_lock:
+        if now - _lag_state['checked_at'] < check_interval():
+            return _lag_state['lag']
+        # Les autres fils gardent la dernière mesure pendant la vérification
+        _lag_state['checked_at'] = now
+    try:
+        lag = measure_lag(alias)
+    except DatabaseError as e:
+        logger.warning("Réplique %s injoignable, lectures sur %s: %s", alias, DEFAULT_DB_ALIAS, e)
+        lag = float('inf')
+    if lag > max_lag() and _lag_state['lag'] <= max_lag():
+        logger.warning("Réplique %s en retard (%ss), lectures sur %s", alias, lag, DEFAULT_DB_ALIAS)
+    _lag_state['lag'] = lag
+    return lag
+
+
+# ---------------------------------------------------------------------------
+# Lecture de ses propres écritures
+# ---------------------------------------------------------------------------
+
+def _pin_key(user_id):
+    return make_key('replica', 'pin', user_id)
+
+
+def pin_user(user_id):
+    """Lectures de cet utilisateur sur default pendant DB_REPLICA_PIN_SECONDS"""
+    cache.set(_pin_key(user_id), True, timeout=pin_seconds())
+
+
+def is_pinned(user_id):
+    return bool(cache.get(_pin_key(user_id)))
+
+
+def read_alias_for(user=None):
+    """Alias à utiliser pour les lectures de `user` (None : default)"""
+    alias = replica_alias()
+    if alias is None:
+        return None
+    if user is not None and user.is_authenticated and is_pinned(user.pk):
+        return None
+    if replica_lag(alias) > max_lag():
+        return None
+    return alias
+
+
+@contextmanager
+def replica_reads(user=None):
+    """Bloc dont les lectures sont servies par la réplique quand c'est possible"""
+    token = _read_alias.set(read_alias_for(user))
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def use_replica(view_func):
+    """Décorateur de vue fonction (sous @api_view) : lectures sur la réplique"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return view_func(request, *args, **kwargs)
+        with replica_reads(request.user):
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """
+    Vues DRF : les actions listées dans `replica_actions` (nom de l'action
+    d'un ViewSet, ou méthode HTTP en minuscules pour une APIView) lisent sur
+    la réplique.
+    """
+    replica_actions = ('list',)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        action = getattr(self, 'action', None) or request.method.lower()
+        if request.method in SAFE_METHODS and action in self.replica_actions:
+            self._replica_token = _read_alias.set(read_alias_for(request.user))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        alias = _read_alias.get()
+        # Fixé sur la requête : un export en flux est lu après la fin de la vue
+        return queryset.using(alias) if alias else queryset
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaPinMiddleware:
+    """Épingle sur default les lectures d'un utilisateur qui vient d'écrire"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self.should_pin(request, response):
+            self.pin(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.should_pin(request, response):
+            await sync_to_async(self.pin)(request)
+        return response
+
+    def should_pin(self, request, response):
+        return request.method not in SAFE_METHODS and response.status_code < 400 and replica_alias() is not None
+
+    def pin(self, request):
+        # request.user : utilisateur JWT positionné par DRF, ou session de l'admin
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_user(user.pk)
+
+
+class ReplicaRouter:
+    """Lectures sur la réplique dans les blocs `replica_reads`, écritures sur default"""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Explicite : une instance lue sur la réplique est enregistrée sur default
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mêmes données des deux côtés
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplique reçoit le schéma par réplication
+        if db == replica_alias():
+            return False
+        return None
@@ -0,0 +1,401 @@
+"""
+Export en flux (CSV / XLSX) des listes de l'admin et de l'API.
+
+- Colonnes déclaratives : `(en-tête, lookup)` ou `(en-tête, lookup, formateur)`,
+  le lookup pouvant traverser les relations (`patient__last_name`). Les champs
+  à choix sont exportés avec leur libellé.
+- Les lignes sont lues par `values_list()` par lots de `chunk_size` : aucune
+  instance de modèle n'est créée et la mémoire reste constante.
+- La réponse est une `StreamingHttpResponse` : le premier octet part avant
+  la fin de la requête SQL pour les gros exports.
+- Le XLSX est écrit directement en flux (zip sans seek, chaînes en ligne),
+  sans dépendance supplémentaire.
+
+Côté API, `ExportMixin` ajoute `?format=csv` / `?format=xlsx` sur `list`.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.db import connections
+from django.db.models import F, OrderBy, Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from rest_framework import renderers
+from rest_framework.settings import api_settings
+
+DEFAULT_CHUNK_SIZE = 2000
+
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+
+# ---------------------------------------------------------------------------
+# Colonnes
+# ---------------------------------------------------------------------------
+
+class Column:
+    """Colonne exportée : en-tête, lookup ORM et formateur optionnel"""
+
+    def __init__(self, header, lookup, formatter=None):
+        self.header = str(header)
+        self.lookup = lookup
+        self.formatter = formatter
+
+    def format(self, value):
+        if self.formatter is not None:
+            return self.formatter(value)
+        return value
+
+
+def _resolve_field(model, lookup):
+    """Champ final d'un lookup (`invoice__patient__gender`), None si inconnu"""
+    field = None
+    for part in lookup.split('__'):
+        try:
+            field = model._meta.get_field(part)
+        except Exception:
+            return None
+        if field.is_relation and field.related_model is not None:
+            model = field.related_model
+    return field
+
+
+def build_columns(model, specs):
+    """Normalise les spécifications en `Column` (libellés des choix inclus)"""
+    columns = []
+    for spec in specs:
+        if isinstance(spec, Column):
+            columns.append(spec)
+            continue
+        header, lookup, *formatter = spec
+        formatter = formatter[0] if formatter else None
+        if formatter is None:
+            field = _resolve_field(model, lookup)
+            if field is not None and getattr(field, 'choices', None):
+                labels = {key: str(label) for key, label in field.flatchoices}
+                formatter = lambda value, labels=labels: labels.get(value, value)
+        columns.append(Column(header, lookup, formatter))
+    return columns
+
+
+def model_columns(model):
+    """Colonnes par défaut : champs concrets du modèle (clé étrangère = identifiant)"""
+    return build_columns(model, [
+        (field.verbose_name, field.attname if field.is_relation else field.name)
+        for field in model._meta.concrete_fields
+    ])
+
+
+# ---------------------------------------------------------------------------
+# Lecture par lots
+# ---------------------------------------------------------------------------
+
+def _keyset_ordering(queryset):
+    """
+    Tri du queryset sous forme [(lookup, décroissant)] terminé par la clé
+    primaire (départage unique), ou None si le tri ne se prête pas à la
+    pagination par clé (aléatoire, expression).
+    """
+    ordering = []
+    pk_name = queryset.model._meta.pk.name
+    for item in queryset.query.order_by or queryset.model._meta.ordering or []:
+        if isinstance(item, OrderBy) and isinstance(item.expression, F):
+            lookup, descending = item.expression.name, item.descending
+        elif isinstance(item, str) and item != '?':
+            lookup, descending = item.lstrip('-'), item.startswith('-')
+        else:
+            return None
+        if lookup in (pk_name, 'pk'):
+            return ordering + [('pk', descending)]
+        if lookup not in [existing for existing, _ in ordering]:
+            ordering.append((lookup, descending))
+    return ordering + [('pk', False)]
+
+
+def _after(ordering, last):
+    """Condition « strictement après la ligne `last` » dans l'ordre `ordering` (NULL en premier)"""
+    condition = Q(pk__in=[])
+    equal = Q()
+    for (lookup, descending), value in zip(ordering, last):
+        if value is None:
+            after = None if descending else ~Q(**{f'{lookup}__isnull': True})
+            same = Q(**{f'{lookup}__isnull': True})
+        else:
+            after = Q(**{f'{lookup}__lt' if descending else f'{lookup}__gt': value})
+            if descending:
+                after |= Q(**{f'{lookup}__isnull': True})
+            same = Q(**{lookup: value})
+        if after is not None:
+            condition |= equal & after
+        equal &= same
+    return condition
+
+
+def _iter_keyset(queryset, lookups, chunk_size):
+    """
+    Pagination par clé sur (colonnes de tri..., clé primaire) : chaque lot est
+    une requête LIMIT distincte, dans l'ordre demandé (`?ordering=` ou tri par
+    défaut du modèle). Utilisée quand le pilote charge tout le résultat en
+    mémoire (mysqlclient).
+    """
+    ordering = _keyset_ordering(queryset)
+    if ordering is None:
+        return queryset.values_list(*lookups).iterator(chunk_size=chunk_size)
+    return _iter_keyset_batches(queryset, lookups, chunk_size, ordering)
+
+
+def _iter_keyset_batches(queryset, lookups, chunk_size, ordering):
+    # NULL en tête en ordre croissant, en fin en décroissant (comportement de MySQL)
+    queryset = queryset.order_by(*[
+        F(lookup).desc(nulls_last=True) if descending else F(lookup).asc(nulls_first=True)
+        for lookup, descending in ordering
+    ])
+    keys = len(ordering)
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(_after(ordering, last))
+        rows = list(batch.values_list(*[lookup for lookup, _ in ordering], *lookups)[:chunk_size])
+        if not rows:
+            return
+        for row in rows:
+            yield row[keys:]
+        last = rows[-1][:keys]
+
+
+def iter_values(queryset, lookups, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Tuples de valeurs en mémoire constante quel que soit le volume"""
+    # Les prefetch ne s'appliquent pas à values_list
+    queryset = queryset.prefetch_related(None)
+    if connections[queryset.db].vendor == 'mysql':
+        return _iter_keyset(queryset, lookups, chunk_size)
+    # PostgreSQL / SQLite : curseur côté serveur ou lecture par fetchmany
+    return queryset.values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def iter_rows(queryset, columns, chunk_size=DEFAULT_CHUNK_SIZE):
+    lookups = [column.lookup for column in columns]
+    for values in iter_values(queryset, lookups, chunk_size):
+        yield [column.format(value) for column, value in zip(columns, values)]
+
+
+def cell_text(value):
+    """Représentation texte d'une valeur (CSV et cellules XLSX non numériques)"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, bool):
+        return 'Oui' if value else 'Non'
+    return str(value)
+
+
+# ---------------------------------------------------------------------------
+# CSV
+# ---------------------------------------------------------------------------
+
+class _Echo:
+    """Pseudo-fichier : `csv.writer` retourne directement la ligne écrite"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows, headers):
+    writer = csv.writer(_Echo())
+    # BOM : Excel détecte l'UTF-8 (accents des noms)
+    yield '\ufeff' + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([cell_text(value) for value in row])
+
+
+# ---------------------------------------------------------------------------
+# XLSX
+# ---------------------------------------------------------------------------
+
+class _ZipStream:
+    """Sortie non positionnable pour zipfile, vidée à chaque bloc envoyé"""
+
+    def __init__(self):
+        self._parts = []
+        self._offset = 0
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Export" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = _XML_ILLEGAL.sub('', cell_text(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return ('<row>' + ''.join(_xlsx_cell(value) for value in values) + '</row>').encode('utf-8')
+
+
+def stream_xlsx(rows, headers, flush_every=500):
+    output = _ZipStream()
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(headers))
+            for count, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row))
+                if count % flush_every == 0:
+                    yield output.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield output.drain()
+
+
+# ---------------------------------------------------------------------------
+# Réponses
+# ---------------------------------------------------------------------------
+
+def export_response(queryset, specs=None, filename='export', fmt='csv', chunk_size=DEFAULT_CHUNK_SIZE):
+    """StreamingHttpResponse CSV ou XLSX d'un queryset"""
+    columns = build_columns(queryset.model, specs) if specs else model_columns(queryset.model)
+    headers = [column.header for column in columns]
+    rows = iter_rows(queryset, columns, chunk_size)
+
+    if fmt == 'xlsx':
+        response = StreamingHttpResponse(stream_xlsx(rows, headers), content_type=XLSX_CONTENT_TYPE)
+    else:
+        fmt = 'csv'
+        response = StreamingHttpResponse(stream_csv(rows, headers), content_type=CSV_CONTENT_TYPE)
+    response['Content-Disposition'] = content_disposition_header(True, f'{filename}.{fmt}')
+    # Pas de mise en tampon par nginx : les lignes arrivent au fil de l'eau
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """
+    Déclare `?format=csv` auprès de DRF. Les listes sont exportées en flux
+    par `ExportMixin` ; ce rendu ne sert qu'aux autres réponses.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        rows = [row if isinstance(row, dict) else {'value': row} for row in rows]
+        headers = list(rows[0]) if rows else []
+        lines = stream_csv(([row.get(header) for header in headers] for row in rows), headers)
+        return ''.join(lines).encode('utf-8')
+
+
+class XLSXRenderer(renderers.BaseRenderer):
+    """Déclare `?format=xlsx` auprès de DRF (voir `CSVRenderer`)"""
+    media_type = XLSX_CONTENT_TYPE
+    format = 'xlsx'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        rows = [row if isinstance(row, dict) else {'value': row} for row in rows]
+        headers = list(rows[0]) if rows else []
+        return b''.join(stream_xlsx(([row.get(header) for header in headers] for row in rows), headers))
+
+
+class ExportMixin:
+    """
+    Ajoute l'export en flux à `list` d'un ViewSet : `?format=csv` ou
+    `?format=xlsx`, avec les mêmes filtres, recherche et tri que la liste
+    (sans pagination).
+
+    `export_columns` : [(en-tête, lookup[, formateur]), ...]
+    """
+    export_columns = None
+    export_filename = None
+    export_chunk_size = DEFAULT_CHUNK_SIZE
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CSVRenderer, XLSXRenderer]
+
+    def get_export_columns(self):
+        return self.export_columns
+
+    def get_export_filename(self):
+        return self.export_filename or str(self.get_queryset().model._meta.verbose_name_plural)
+
+    def list(self, request, *args, **kwargs):
+        fmt = getattr(request.accepted_renderer, 'format', None)
+        if fmt in EXPORT_FORMATS:
+            queryset = self.filter_queryset(self.get_queryset())
+            return export_response(
+                queryset, self.get_export_columns(), self.get_export_filename(), fmt, self.export_chunk_size
+            )
+        return super().list(request, *args, **kwargs)
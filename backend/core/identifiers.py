@@ -0,0 +1,153 @@
+"""
+Génération d'identifiants aléatoires uniques (ID patient, clé d'accès...).
+
+Les candidats sont tirés par lots et vérifiés avec une seule requête `IN`,
+puis les identifiants libres sont conservés dans un petit pool par processus.
+Un identifiant du pool peut avoir été pris entre-temps par un autre
+processus : `save_new` attrape l'erreur d'unicité, vide le pool et
+réessaie avec un nouvel identifiant.
+Les statistiques de collision (`metrics`, exposées par `admin-stats`)
+permettent de surveiller la saturation de l'espace des identifiants
+(notamment les ID patients sur 6 caractères).
+"""
+import logging
+import math
+import secrets
+import string
+import threading
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+
+logger = logging.getLogger(__name__)
+
+ALPHANUMERIC_UPPER = string.ascii_uppercase + string.digits
+
+# Au-delà de ce taux de collision, l'espace des identifiants est considéré saturé
+COLLISION_WARNING_RATE = 0.05
+
+# Tentatives d'insertion quand l'identifiant a été pris par un autre processus
+INSERT_ATTEMPTS = 3
+
+
+class IdentifierGenerator:
+    """Générateur d'identifiants uniques pour un champ de modèle donné"""
+
+    def __init__(self, model_label, field_name, length, alphabet=ALPHANUMERIC_UPPER,
+                 pool_size=8, max_rounds=10):
+        self.model_label = model_label
+        self.field_name = field_name
+        self.length = length
+        self.alphabet = alphabet
+        self.pool_size = pool_size
+        self.max_rounds = max_rounds
+        self._pool = []
+        self._lock = threading.Lock()
+        self._stats = {
+            'generated': 0,
+            'candidates': 0,
+            'collisions': 0,
+            'queries': 0,
+            'pool_hits': 0,
+            'insert_conflicts': 0,
+        }
+
+    @property
+    def model(self):
+        # Résolution paresseuse pour éviter les imports circulaires entre apps
+        return apps.get_model(self.model_label)
+
+    @property
+    def collision_rate(self):
+        if not self._stats['candidates']:
+            return 0.0
+        return self._stats['collisions'] / self._stats['candidates']
+
+    def _draw(self, count):
+        """Tire `count` candidats distincts"""
+        candidates = set()
+        while len(candidates) < count:
+            candidates.add(''.join(secrets.choice(self.alphabet) for _ in range(self.length)))
+        return candidates
+
+    def _batch_size(self):
+        """Taille du lot ajustée au taux de collision observé"""
+        free_ratio = max(1.0 - self.collision_rate, 0.05)
+        return math.ceil(self.pool_size / free_ratio)
+
+    def _refill(self):
+        """Remplit le pool avec des identifiants vérifiés en une seule requête"""
+        for _ in range(self.max_rounds):
+            candidates = self._draw(self._batch_size())
+            taken = set(
+                self.model.objects.filter(**{f'{self.field_name}__in': candidates})
+                .values_list(self.field_name, flat=True)
+            )
+            self._stats['queries'] += 1
+            self._stats['candidates'] += len(candidates)
+            self._stats['collisions'] += len(taken)
+
+            free = candidates - taken
+            if free:
+                self._pool.extend(free)
+                break
+        else:
+            raise RuntimeError(
+                f"Impossible de générer un identifiant unique pour {self.model_label}.{self.field_name}"
+            )
+
+        if self.collision_rate > COLLISION_WARNING_RATE:
+            logger.warning(
+                "Taux de collision élevé pour %s.%s: %.1f%% (%d/%d)",
+                self.model_label, self.field_name, self.collision_rate * 100,
+                self._stats['collisions'], self._stats['candidates'],
+            )
+
+    def generate(self):
+        """Retourne un identifiant libre"""
+        with self._lock:
+            if self._pool:
+                self._stats['pool_hits'] += 1
+            else:
+                self._refill()
+            self._stats['generated'] += 1
+            return self._pool.pop()
+
+    def _drop_pool(self):
+        with self._lock:
+            self._stats['insert_conflicts'] += 1
+            self._pool.clear()
+
+    def save_new(self, instance, save):
+        """
+        Attribue un identifiant libre à `instance` puis appelle `save()`. Si
+        l'insertion échoue parce que l'identifiant vient d'être pris, le pool
+        (vérifié plus tôt, donc périmé) est vidé et un autre est tiré.
+        """
+        for _ in range(INSERT_ATTEMPTS):
+            identifier = self.generate()
+            setattr(instance, self.field_name, identifier)
+            try:
+                # Point de sauvegarde : la transaction appelante reste utilisable
+                with transaction.atomic():
+                    save()
+                return
+            except IntegrityError:
+                if not self.model.objects.filter(**{self.field_name: identifier}).exists():
+                    raise  # Autre contrainte d'unicité
+                logger.warning("Identifiant %s.%s déjà pris à l'insertion, pool vidé",
+                               self.model_label, self.field_name)
+                self._drop_pool()
+        setattr(instance, self.field_name, None)
+        raise RuntimeError(
+            f"Impossible d'insérer un identifiant unique pour {self.model_label}.{self.field_name}"
+        )
+
+    def metrics(self):
+        """Statistiques de génération pour ce processus"""
+        with self._lock:
+            return {
+                **self._stats,
+                'pool_size': len(self._pool),
+                'collision_rate': round(self.collision_rate, 4),
+            }
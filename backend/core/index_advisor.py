@@ -0,0 +1,191 @@
+"""
+Conseiller d'index à partir des requêtes lentes capturées (`core.query_log`).
+
+Pour chaque empreinte, l'exemple le plus lent est passé à EXPLAIN ; les
+tables lues intégralement (MySQL `type=ALL`, PostgreSQL `Seq Scan`, SQLite
+`SCAN` sans index) reçoivent une proposition d'index composite construite
+à partir des prédicats de la requête : colonnes d'égalité d'abord, puis une
+seule colonne de plage, ou à défaut les colonnes du ORDER BY.
+"""
+import re
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.db import connections, models
+
+# Au-delà, un index composite coûte plus en écriture qu'il ne rapporte
+MAX_INDEX_COLUMNS = 3
+
+_IDENT = r'[`"]?(\w+)[`"]?'
+_PREDICATE_RE = re.compile(
+    rf'{_IDENT}\.{_IDENT}\s*(=|<>|!=|<=|>=|<|>|\bIN\b|\bIS\b|\bBETWEEN\b|\bLIKE\b)',
+    re.IGNORECASE,
+)
+_ORDER_COLUMN_RE = re.compile(rf'{_IDENT}\.{_IDENT}')
+_CLAUSE_END_RE = re.compile(r'\b(GROUP BY|ORDER BY|LIMIT|HAVING)\b', re.IGNORECASE)
+_PG_SCAN_RE = re.compile(r'Seq Scan on (\w+)')
+_SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+EQUALITY_OPERATORS = {'=', 'IN', 'IS'}
+RANGE_OPERATORS = {'<', '>', '<=', '>=', 'BETWEEN'}
+
+
+@dataclass
+class Proposal:
+    model: type
+    fields: tuple
+    covered_by: str = ''
+
+    @property
+    def label(self):
+        return self.model._meta.label
+
+    def index(self):
+        index = models.Index(fields=list(self.fields))
+        index.set_name_with_model(self.model)
+        return index
+
+
+@dataclass
+class Advice:
+    entry: dict
+    plan: list = field(default_factory=list)
+    full_scans: list = field(default_factory=list)
+    proposals: list = field(default_factory=list)
+    error: str = ''
+
+
+def model_for_table(table):
+    for model in apps.get_models():
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+# TEXT/BLOB : non indexables sans longueur de préfixe sous MySQL
+UNINDEXABLE_FIELDS = (models.TextField, models.JSONField, models.BinaryField)
+
+
+def _field_for_column(model, column):
+    """Champ indexable correspondant à une colonne, sinon None"""
+    for model_field in model._meta.concrete_fields:
+        if model_field.column == column:
+            if model_field.primary_key or isinstance(model_field, UNINDEXABLE_FIELDS):
+                return None
+            return model_field
+    return None
+
+
+def _split_clauses(sql):
+    """(clause WHERE, clause ORDER BY) de la requête principale"""
+    upper = sql.upper()
+    where = order = ''
+    position = upper.find(' WHERE ')
+    if position != -1:
+        rest = sql[position + 7:]
+        end = _CLAUSE_END_RE.search(rest)
+        where = rest[:end.start()] if end else rest
+    position = upper.rfind(' ORDER BY ')
+    if position != -1:
+        rest = sql[position + 10:]
+        end = re.search(r'\bLIMIT\b', rest, re.IGNORECASE)
+        order = rest[:end.start()] if end else rest
+    return where, order
+
+
+def explain(alias, sql, params):
+    """Lignes brutes du plan d'exécution"""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        # MySQL : format tabulaire (colonnes `table`, `type`) plutôt que TREE
+        prefix = connection.ops.explain_query_prefix('TEXT' if connection.vendor == 'mysql' else None)
+        cursor.execute(f'{prefix} {sql}', params)
+        columns = [column[0] for column in cursor.description or []]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def full_scans(vendor, plan):
+    """Tables lues intégralement d'après le plan"""
+    tables = []
+    for row in plan:
+        if vendor == 'mysql':
+            if str(row.get('type', '')).upper() == 'ALL' and row.get('table'):
+                tables.append(row['table'])
+        elif vendor == 'postgresql':
+            tables.extend(_PG_SCAN_RE.findall(' '.join(str(value) for value in row.values())))
+        elif vendor == 'sqlite':
+            match = _SQLITE_SCAN_RE.match(str(row.get('detail', '')))
+            if match:
+                tables.append(match.group(1))
+    return list(dict.fromkeys(tables))
+
+
+def propose(model, sql):
+    """Index composite pour les prédicats de la requête portant sur `model`"""
+    table = model._meta.db_table
+    where, order = _split_clauses(sql)
+    equality, ranges = [], []
+    for predicate_table, column, operator in _PREDICATE_RE.findall(where):
+        if predicate_table != table:
+            continue
+        model_field = _field_for_column(model, column)
+        if model_field is None:
+            continue
+        operator = operator.upper()
+        # LIKE '%…%' (icontains) n'est pas indexable par un B-tree
+        if operator in EQUALITY_OPERATORS:
+            equality.append(model_field.name)
+        elif operator in RANGE_OPERATORS:
+            ranges.append(model_field.name)
+
+    columns = list(dict.fromkeys(equality))
+    if ranges:
+        columns.append(ranges[0])
+    else:
+        for order_table, column in _ORDER_COLUMN_RE.findall(order):
+            model_field = _field_for_column(model, column) if order_table == table else None
+            if model_field is not None:
+                columns.append(model_field.name)
+    columns = list(dict.fromkeys(columns))[:MAX_INDEX_COLUMNS]
+    if not columns:
+        return None
+    return Proposal(model, tuple(columns), covered_by=existing_index(model, columns))
+
+
+def existing_index(model, columns):
+    """Nom d'un index existant dont les premières colonnes sont `columns`"""
+    for index in model._meta.indexes:
+        fields = [name.lstrip('-') for name in index.fields]
+        if fields[:len(columns)] == list(columns):
+            return index.name
+    for fields in model._meta.unique_together:
+        if list(fields[:len(columns)]) == list(columns):
+            return 'unique_together'
+    if len(columns) == 1:
+        model_field = model._meta.get_field(columns[0])
+        if model_field.db_index or model_field.unique:
+            return f'{model_field.name} (db_index)'
+    return ''
+
+
+def advise(entry):
+    """EXPLAIN d'une empreinte capturée et propositions d'index"""
+    advice = Advice(entry)
+    sql = entry.get('sample', '')
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return advice
+    alias = entry.get('alias', 'default')
+    try:
+        advice.plan = explain(alias, sql, entry.get('params', ()))
+    except Exception as e:
+        advice.error = str(e)
+        return advice
+    advice.full_scans = full_scans(connections[alias].vendor, advice.plan)
+    for table in advice.full_scans:
+        model = model_for_table(table)
+        if model is None:
+            continue
+        proposal = propose(model, sql)
+        if proposal is not None:
+            advice.proposals.append(proposal)
+    return advice
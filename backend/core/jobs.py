@@ -0,0 +1,260 @@
+"""
+File de tâches d'arrière-plan en base de données, sans broker externe.
+
+Déclaration (dans `<app>/tasks.py`, chargé au démarrage) :
+
+    @task('reports.notify_patient', priority=10)
+    def notify_patient(report_id):
+        ...
+
+    notify_patient.delay(report_id=report.pk)
+
+`delay` insère une ligne `Job` dans la transaction courante : la tâche
+n'est visible des workers qu'après validation. `manage.py run_jobs`
+réclame les tâches par `SELECT … FOR UPDATE SKIP LOCKED` (priorité
+décroissante puis date prévue), les exécute, mesure attente et durée et
+replanifie les échecs avec un délai exponentiel jusqu'à `max_attempts`.
+Pendant l'exécution, le worker rafraîchit `locked_at` (`heartbeat`) : seule
+une tâche dont le worker s'est arrêté est reprise par `requeue_stale`, et un
+worker dont la tâche a quand même été reprise n'écrase pas son état.
+
+Avec `JOBS_EAGER` (développement sans worker), les tâches s'exécutent
+directement après la validation de la transaction.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Délai avant nouvelle tentative : BASE * 2^(tentative-1), plafonné
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 6 * 3600
+
+_registry = {}
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def is_eager():
+    return getattr(settings, 'JOBS_EAGER', False)
+
+
+def lock_timeout():
+    """Au-delà, une tâche « en cours » est considérée abandonnée (worker arrêté)"""
+    return getattr(settings, 'JOBS_LOCK_TIMEOUT', 600)
+
+
+def heartbeat_interval():
+    return max(lock_timeout() / 3, 1)
+
+
+class Task:
+    def __init__(self, func, name, priority=0, max_attempts=5):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, priority=None, run_at=None, **payload):
+        return enqueue(self.name, payload, priority=priority, run_at=run_at)
+
+
+def task(name, priority=0, max_attempts=5):
+    """Enregistre une fonction comme tâche d'arrière-plan"""
+    def decorator(func):
+        registered = Task(func, name, priority, max_attempts)
+        _registry[name] = registered
+        return registered
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise UnknownTask(f"Tâche inconnue: {name}")
+
+
+def enqueue(name, payload=None, priority=None, run_at=None):
+    """Crée la tâche (paramètres sérialisables en JSON)"""
+    registered = get_task(name)
+    if is_eager():
+        payload = payload or {}
+        # robust : une erreur est journalisée sans remonter dans la requête
+        transaction.on_commit(lambda: registered(**payload), robust=True)
+        return None
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        priority=registered.priority if priority is None else priority,
+        max_attempts=registered.max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def retry_delay(attempts):
+    delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+    # Léger aléa pour ne pas relancer ensemble les tâches échouées ensemble
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def claim(worker, names=None):
+    """Réclame la prochaine tâche exécutable, ou None"""
+    now = timezone.now()
+    candidates = Job.objects.filter(status='pending', run_at__lte=now)
+    if names:
+        candidates = candidates.filter(name__in=names)
+    with transaction.atomic():
+        job = (
+            candidates.order_by('-priority', 'run_at', 'pk')
+            .select_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            return None
+        # Mise à jour conditionnelle : garantie sur les bases sans SKIP LOCKED (SQLite)
+        claimed = Job.objects.filter(pk=job.pk, status='pending').update(
+            status='running', locked_by=worker, locked_at=now, started_at=now,
+            attempts=job.attempts + 1,
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def heartbeat(job):
+    """Prolonge le verrou d'une tâche en cours ; False si un autre worker l'a reprise"""
+    return bool(
+        Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by)
+        .update(locked_at=timezone.now())
+    )
+
+
+class Heartbeat(threading.Thread):
+    """Appelle `heartbeat` toutes les `heartbeat_interval()` secondes pendant l'exécution"""
+
+    def __init__(self, job):
+        super().__init__(name=f'job-heartbeat-{job.pk}', daemon=True)
+        self.job = job
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(heartbeat_interval()):
+                if not heartbeat(self.job):
+                    break
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def _finish(job, **values):
+    """Enregistre le résultat si le worker détient toujours la tâche"""
+    updated = Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by).update(**values)
+    if not updated:
+        logger.warning("Tâche %s #%s reprise par un autre worker : résultat ignoré", job.name, job.pk)
+
+
+def execute(job):
+    """Exécute une tâche réclamée et enregistre son résultat"""
+    start = time.perf_counter()
+    wait_ms = (job.started_at - job.run_at).total_seconds() * 1000
+    beat = Heartbeat(job)
+    beat.start()
+    try:
+        try:
+            get_task(job.name)(**job.payload)
+        finally:
+            beat.stop()
+    except Exception as e:
+        duration_ms = (time.perf_counter() - start) * 1000
+        error = ''.join(traceback.format_exception(e))[-5000:]
+        final = job.attempts >= job.max_attempts or isinstance(e, UnknownTask)
+        _finish(
+            job,
+            status='failed' if final else 'pending',
+            run_at=job.run_at if final else timezone.now() + retry_delay(job.attempts),
+            finished_at=timezone.now() if final else None,
+            locked_by='', locked_at=None,
+            last_error=error, wait_ms=wait_ms, duration_ms=duration_ms,
+        )
+        logger.warning("Tâche %s #%s en échec (tentative %s/%s): %s",
+                       job.name, job.pk, job.attempts, job.max_attempts, e)
+        return False
+    duration_ms = (time.perf_counter() - start) * 1000
+    _finish(
+        job, status='done', finished_at=timezone.now(), locked_by='', locked_at=None,
+        wait_ms=wait_ms, duration_ms=duration_ms,
+    )
+    return True
+
+
+def requeue_stale():
+    """
+    Remet en attente les tâches d'un worker arrêté en cours d'exécution :
+    verrou non rafraîchi (`heartbeat`) depuis `lock_timeout()` secondes.
+    """
+    cutoff = timezone.now() - timedelta(seconds=lock_timeout())
+    return Job.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='pending', locked_by='', locked_at=None, run_at=timezone.now(),
+    )
+
+
+def run_worker(stop, names=None, poll_interval=1.0, once=False):
+    """Boucle d'un fil de travail ; retourne le nombre de tâches exécutées"""
+    worker = worker_name()
+    executed = 0
+    try:
+        while not stop.is_set():
+            job = claim(worker, names)
+            if job is None:
+                if once:
+                    break
+                stop.wait(poll_interval)
+                continue
+            execute(job)
+            executed += 1
+    finally:
+        connection.close()
+    return executed
+
+
+def stats():
+    """Compteurs et temps moyens par tâche"""
+    return list(
+        Job.objects.values('name').annotate(
+            pending=Count('pk', filter=Q(status='pending')),
+            running=Count('pk', filter=Q(status='running')),
+            done=Count('pk', filter=Q(status='done')),
+            failed=Count('pk', filter=Q(status='failed')),
+            avg_wait_ms=Avg('wait_ms', filter=Q(status='done')),
+            avg_duration_ms=Avg('duration_ms', filter=Q(status='done')),
+        ).order_by('name')
+    )
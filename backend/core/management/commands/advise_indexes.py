@@ -0,0 +1,96 @@
+import os
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import migrations
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+from core import index_advisor, query_log
+
+
+class Command(BaseCommand):
+    help = "Analyse (EXPLAIN) les requêtes lentes capturées et propose des index composites"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Nombre d\'empreintes analysées (temps total décroissant)')
+        parser.add_argument('--min-count', type=int, default=1, help='Nombre minimum d\'exécutions lentes')
+        parser.add_argument('--emit-migration', action='store_true',
+                            help='Écrit une migration AddIndex par application pour les index proposés')
+        parser.add_argument('--reset', action='store_true', help='Efface les requêtes capturées puis quitte')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            query_log.reset()
+            self.stdout.write("✓ Requêtes lentes capturées effacées")
+            return
+
+        entries = query_log.top(options['top'], options['min_count'])
+        if not entries:
+            self.stdout.write(
+                "Aucune requête lente capturée (SLOW_QUERY_CAPTURE et SLOW_QUERY_THRESHOLD_MS dans .env)"
+            )
+            return
+
+        proposals = {}
+        for rank, entry in enumerate(entries, 1):
+            advice = index_advisor.advise(entry)
+            average = entry['total_ms'] / entry['count']
+            self.stdout.write(
+                f"\n#{rank} [{entry['fingerprint']}] {entry['count']} exécution(s), "
+                f"total {entry['total_ms']:.0f} ms, moyenne {average:.0f} ms, max {entry['max_ms']:.0f} ms"
+                + (f" — {entry['path']}" if entry.get('path') else '')
+            )
+            self.stdout.write(f"  {entry['sql'][:300]}")
+            if advice.error:
+                self.stdout.write(f"  ⚠ EXPLAIN impossible: {advice.error}")
+            for table in advice.full_scans:
+                self.stdout.write(self.style.WARNING(f"  ✗ Lecture complète de {table}"))
+            for proposal in advice.proposals:
+                fields = ', '.join(proposal.fields)
+                if proposal.covered_by:
+                    self.stdout.write(
+                        f"  • {proposal.label}({fields}) : index existant {proposal.covered_by} "
+                        "ignoré par le planificateur (table trop petite ou statistiques à jour ?)"
+                    )
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"  → Index proposé sur {proposal.label}({fields})"))
+                    proposals.setdefault((proposal.label, proposal.fields), proposal)
+
+        if not proposals:
+            self.stdout.write("\nAucun index à proposer.")
+            return
+
+        self.stdout.write("\nIndex proposés (à ajouter dans Meta.indexes) :")
+        for proposal in proposals.values():
+            self.stdout.write(
+                f"  {proposal.label}: models.Index(fields={list(proposal.fields)!r}, name={proposal.index().name!r})"
+            )
+
+        if options['emit_migration']:
+            self.write_migrations(proposals.values())
+
+    def write_migrations(self, proposals):
+        """Une migration AddIndex par application, à la suite de sa dernière migration"""
+        by_app = defaultdict(list)
+        for proposal in proposals:
+            by_app[proposal.model._meta.app_label].append(proposal)
+
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        for app_label, app_proposals in by_app.items():
+            leaves = loader.graph.leaf_nodes(app_label)
+            number = max((int(name.split('_', 1)[0]) for _, name in leaves if name[:4].isdigit()), default=0) + 1
+            migration = migrations.Migration(f'{number:04d}_advised_indexes', app_label)
+            migration.dependencies = leaves
+            migration.operations = [
+                migrations.AddIndex(model_name=proposal.model._meta.model_name, index=proposal.index())
+                for proposal in app_proposals
+            ]
+            writer = MigrationWriter(migration)
+            os.makedirs(os.path.dirname(writer.path), exist_ok=True)
+            with open(writer.path, 'w', encoding='utf-8') as f:
+                f.write(writer.as_string())
+            self.stdout.write(self.style.SUCCESS(f"✓ Migration écrite: {writer.path}"))
+        self.stdout.write(
+            "Reporter les mêmes index dans Meta.indexes des modèles pour que makemigrations reste cohérent."
+        )
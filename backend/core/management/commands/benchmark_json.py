@@ -0,0 +1,85 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+
+from authentication.tokens import RoleRefreshToken
+from core.renderers import ORJSONRenderer, orjson
+from patients.models import Patient
+from patients.serializers import PatientSerializer
+
+PAGE_SIZE = 100
+
+LIST_URLS = ['/api/patients/', '/api/invoices/', '/api/payments/']
+
+
+def measure(func, count):
+    func()  # Échauffement
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.mean(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+class Command(BaseCommand):
+    help = "Compare sérialisation, rendu et lecture JSON (DRF / orjson) sur des pages de 100 lignes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Répétitions par mesure')
+        parser.add_argument('--username', help='Compte utilisé (défaut: premier superutilisateur)')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson n'est pas installé : rien à comparer")
+        User = get_user_model()
+        users = User.objects.filter(username=options['username']) if options['username'] else \
+            User.objects.filter(is_superuser=True, is_active=True)
+        user = users.first()
+        if user is None:
+            raise CommandError("Aucun utilisateur pour la mesure (--username)")
+        count = options['iterations']
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {RoleRefreshToken.for_user(user).access_token}')
+
+        self.stdout.write(f"Pages de {PAGE_SIZE} lignes, {count} répétitions (moyenne / p95 en ms)\n")
+        self.line('', 'DRF', 'orjson')
+        for url in LIST_URLS:
+            response = client.get(url, {'page_size': PAGE_SIZE})
+            if response.status_code != 200:
+                raise CommandError(f"{url} a répondu {response.status_code}")
+            data = response.data
+            rows = len(data['results'])
+            if rows < PAGE_SIZE:
+                self.stdout.write(self.style.WARNING(f"{url}: {rows} ligne(s) seulement"))
+            body = JSONRenderer().render(data)
+            if ORJSONRenderer().render(data) != body:
+                self.stdout.write(self.style.WARNING(f"{url}: rendu orjson différent de DRF"))
+            self.line(f"rendu {url}",
+                      measure(lambda: JSONRenderer().render(data), count),
+                      measure(lambda: ORJSONRenderer().render(data), count))
+            self.line(f"lecture {url}",
+                      measure(lambda: json.loads(body), count),
+                      measure(lambda: orjson.loads(body), count))
+
+        queryset = Patient.objects.order_by('-created_at')
+        values = PatientSerializer(many=True).values_queryset(queryset)
+        self.stdout.write('')
+        self.line('', 'instances', 'values()')
+        self.line("sérialisation patients (requête comprise)",
+                  measure(lambda: PatientSerializer(list(queryset[:PAGE_SIZE]), many=True).data, count),
+                  measure(lambda: PatientSerializer(list(values[:PAGE_SIZE]), many=True).data, count))
+
+    def line(self, label, before, after):
+        if isinstance(before, str):
+            self.stdout.write(f"{label:45} {before:>17} {after:>17}")
+            return
+        self.stdout.write(
+            f"{label:45} {before[0]:7.3f} / {before[1]:7.3f} {after[0]:7.3f} / {after[1]:7.3f}"
+            f"   x{before[0] / after[0]:.1f}"
+        )
@@ -0,0 +1,82 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+SESSION_MIDDLEWARE = 'django.contrib.sessions.middleware.SessionMiddleware'
+SLIDING_MIDDLEWARE = 'core.sessions.SlidingSessionMiddleware'
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+class Command(BaseCommand):
+    help = "Mesure la latence d'une page d'admin avec l'ancienne gestion des sessions et la configuration actuelle"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/admin/', help="Page d'admin mesurée (défaut: /admin/)")
+        parser.add_argument('--requests', type=int, default=200, help='Nombre de requêtes par scénario')
+        parser.add_argument('--username', help='Compte utilisé (défaut: premier superutilisateur)')
+        parser.add_argument('--modes', default=None,
+                            help='Modes comparés à la référence, séparés par des virgules (défaut: SESSION_MODE)')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(username=options['username']) if options['username'] else \
+            User.objects.filter(is_superuser=True, is_active=True)
+        user = users.first()
+        if user is None:
+            raise CommandError("Aucun utilisateur pour la mesure (--username)")
+
+        scenarios = [('avant: db, écriture à chaque requête', {
+            'SESSION_ENGINE': ENGINES['db'],
+            'SESSION_SAVE_EVERY_REQUEST': True,
+            'MIDDLEWARE': [SESSION_MIDDLEWARE if m == SLIDING_MIDDLEWARE else m for m in settings.MIDDLEWARE],
+        })]
+        modes = (options['modes'] or settings.SESSION_MODE).split(',')
+        for mode in modes:
+            if mode not in ENGINES:
+                raise CommandError(f"Mode inconnu: {mode} ({', '.join(ENGINES)})")
+            scenarios.append((f'après: {mode}, prolongation regroupée', {
+                'SESSION_ENGINE': ENGINES[mode],
+                'SESSION_SAVE_EVERY_REQUEST': False,
+            }))
+
+        self.stdout.write(f"{options['requests']} requêtes GET {options['url']} en tant que {user.username}\n")
+        for label, overrides in scenarios:
+            with override_settings(**overrides):
+                timings, session_writes = self.measure(user, options['url'], options['requests'])
+            timings.sort()
+            self.stdout.write(
+                f"{label:45} moyenne {statistics.mean(timings):6.1f} ms  "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:6.1f} ms  "
+                f"écritures de session {session_writes}"
+            )
+
+    def measure(self, user, url, count):
+        client = Client()
+        client.force_login(user)
+        client.get(url)  # Échauffement (chargement des modèles, caches)
+        timings = []
+        session_writes = 0
+        for _ in range(count):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f"{url} a répondu {response.status_code}")
+            session_writes += sum(
+                1 for query in queries.captured_queries
+                if 'django_session' in query['sql'] and query['sql'].lstrip().upper().startswith(('UPDATE', 'INSERT'))
+            )
+        return timings, session_writes
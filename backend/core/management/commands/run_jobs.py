@@ -0,0 +1,81 @@
+import signal
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+
+class Command(BaseCommand):
+    help = "Exécute les tâches d'arrière-plan (SMS, e-mails, import groupé...)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'JOBS_CONCURRENCY', 2),
+                            help='Nombre de tâches exécutées en parallèle (défaut: JOBS_CONCURRENCY)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Attente (secondes) quand la file est vide')
+        parser.add_argument('--names', default='', help='Limiter aux tâches listées (séparées par des virgules)')
+        parser.add_argument('--once', action='store_true', help='Vide la file puis quitte')
+        parser.add_argument('--stats', action='store_true', help='Affiche les compteurs et temps moyens puis quitte')
+        parser.add_argument('--purge-days', type=int, default=None,
+                            help='Supprime les tâches terminées depuis plus de N jours puis quitte')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            return self.show_stats()
+        if options['purge_days'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['purge_days'])
+            deleted, _ = Job.objects.filter(status='done', finished_at__lt=cutoff).delete()
+            self.stdout.write(f"✓ {deleted} tâche(s) terminée(s) supprimée(s)")
+            return
+
+        names = [name.strip() for name in options['names'].split(',') if name.strip()]
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *args: stop.set())
+
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(f"{requeued} tâche(s) abandonnée(s) remise(s) en attente")
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(jobs.run_worker(stop, names, options['poll_interval'], options['once'])),
+                name=f'run_jobs-{i}',
+            )
+            for i in range(max(options['concurrency'], 1))
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Worker démarré ({len(threads)} fil(s))")
+
+        # Surveillance des tâches abandonnées par un autre worker
+        last_check = time.monotonic()
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+            if time.monotonic() - last_check >= 60:
+                jobs.requeue_stale()
+                last_check = time.monotonic()
+        for thread in threads:
+            thread.join()
+        self.stdout.write(f"✓ {sum(results)} tâche(s) exécutée(s)")
+
+    def show_stats(self):
+        rows = jobs.stats()
+        if not rows:
+            self.stdout.write("Aucune tâche")
+            return
+        for row in rows:
+            wait = f"{row['avg_wait_ms']:.0f} ms" if row['avg_wait_ms'] is not None else '-'
+            duration = f"{row['avg_duration_ms']:.0f} ms" if row['avg_duration_ms'] is not None else '-'
+            self.stdout.write(
+                f"{row['name']:35} en attente {row['pending']:5}  en cours {row['running']:3}  "
+                f"terminées {row['done']:6}  échouées {row['failed']:4}  attente moy. {wait:>8}  durée moy. {duration:>8}"
+            )
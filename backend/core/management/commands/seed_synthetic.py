@@ -0,0 +1,60 @@
+import os
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import synthetic
+
+
+class Command(BaseCommand):
+    help = "Remplit la base avec des données synthétiques réalistes (tests de charge reproductibles)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1, help='Graine : mêmes paramètres, mêmes données')
+        parser.add_argument('--patients', type=int, default=10_000, help='Patients (un accès chacun)')
+        parser.add_argument('--invoices', type=int, default=30_000, help='Factures (1 à 3 lignes chacune)')
+        parser.add_argument('--payments', type=int, default=40_000, help='Paiements (nombre approché)')
+        parser.add_argument('--reports', type=int, default=5_000, help='Comptes rendus (sans fichier)')
+        parser.add_argument('--days', type=int, default=3 * 365, help="Période couverte, en jours")
+        parser.add_argument('--end-date', help="Dernier jour de la période, AAAA-MM-JJ (défaut: aujourd'hui)")
+        parser.add_argument('--processes', type=int, default=min(os.cpu_count() or 1, 8),
+                            help="Processus d'insertion (1 avec SQLite)")
+        parser.add_argument('--batch-size', type=int, default=1000, help='Lignes par INSERT')
+        parser.add_argument('--force', action='store_true', help='Autorise la génération avec DEBUG=False')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("DEBUG=False : base de production ? Relancer avec --force sur une base de test.")
+        if options['invoices'] and not options['patients']:
+            raise CommandError("Des factures sans patients : --patients doit être positif")
+        if options['reports'] and not options['invoices']:
+            raise CommandError("Les comptes rendus sont rattachés aux patients facturés : --invoices doit être positif")
+        if min(options['patients'], options['invoices'], options['payments'], options['reports']) < 0:
+            raise CommandError("Les volumes doivent être positifs")
+
+        end = None
+        if options['end_date']:
+            try:
+                day = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--end-date attendu au format AAAA-MM-JJ")
+            end = timezone.make_aware(datetime.combine(day, time(23, 59)))
+
+        plan = synthetic.make_plan(
+            seed=options['seed'], patients=options['patients'], invoices=options['invoices'],
+            payments=options['payments'], reports=options['reports'], days=options['days'],
+            end=end, batch_size=options['batch_size'],
+        )
+        self.stdout.write(
+            f"Graine {plan.seed}, période de {plan.days} jours jusqu'au {timezone.localtime(plan.end):%Y-%m-%d}, "
+            f"{options['processes']} processus"
+        )
+        totals = synthetic.run(plan, processes=options['processes'], progress=self.progress)
+        for table, rows in totals.items():
+            self.stdout.write(f"✓ {rows} {table}")
+
+    def progress(self, phase, done, total, elapsed):
+        self.stdout.write(f"  {phase}: lot {done}/{total} ({elapsed:.0f} s)", ending='\r' if done < total else '\n')
+        self.stdout.flush()
@@ -1,13 +1,20 @@
 from django.http import JsonResponse
 import re
 import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 class RoleBasedAccessMiddleware:
+    # Compatible ASGI : les chemins publics (portail patient) sont servis sans passer par un fil
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
         # Liste des chemins qui ne nécessitent pas d'authentification
         self.public_paths = [
             r'^/$',  # Root URL
@@ -79,6 +86,27 @@ class RoleBasedAccessMiddleware:
         }
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        preflight = self.preflight_response(request)
+        if preflight is not None:
+            return preflight
+        response = self.get_response(request)
+        if self.is_public(request.path):
+            return self.with_cors(response)
+        return self.check_access(request, response)
+
+    async def __acall__(self, request):
+        preflight = self.preflight_response(request)
+        if preflight is not None:
+            return preflight
+        response = await self.get_response(request)
+        if self.is_public(request.path):
+            return self.with_cors(response)
+        # request.user peut nécessiter une lecture en base
+        return await sync_to_async(self.check_access)(request, response)
+
+    def preflight_response(self, request):
         # Handle OPTIONS requests for CORS preflight
         if request.method == 'OPTIONS':
             response = JsonResponse({}, status=200)
@@ -87,17 +115,18 @@ class RoleBasedAccessMiddleware:
             response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-CSRFToken'
             response['Access-Control-Allow-Credentials'] = 'true'
             return response
-            
-        # Vérifier si le chemin est public
-        if any(re.match(path, request.path) for path in self.public_paths):
-            response = self.get_response(request)
-            response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
-            response['Access-Control-Allow-Credentials'] = 'true'
-            return response
-            
-        # Traiter la requête d'abord pour permettre l'authentification JWT
-        response = self.get_response(request)
-        
+        return None
+
+    def is_public(self, path):
+        return any(re.match(pattern, path) for pattern in self.public_paths)
+
+    def with_cors(self, response):
+        response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
+        response['Access-Control-Allow-Credentials'] = 'true'
+        return response
+
+    def check_access(self, request, response):
+        """Contrôle d'accès par rôle, après traitement de la requête (authentification JWT)"""
         # Si la réponse est déjà une erreur 401, la retourner directement
         if hasattr(response, 'status_code') and response.status_code == 401:
             response['Access-Control-Allow-Origin'] = 'http://localhost:5173'
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Tâche')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Paramètres')),
+                ('priority', models.SmallIntegerField(default=0, verbose_name='Priorité')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('done', 'Terminée'), ('failed', 'Échouée')], default='pending', max_length=10, verbose_name='Statut')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=5, verbose_name='Tentatives maximum')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Exécution prévue')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Prise en charge')),
+                ('last_error', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créée le')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Démarrée le')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Terminée le')),
+                ('wait_ms', models.FloatField(blank=True, null=True, verbose_name='Attente (ms)')),
+                ('duration_ms', models.FloatField(blank=True, null=True, verbose_name='Durée (ms)')),
+            ],
+            options={
+                'verbose_name': "Tâche d'arrière-plan",
+                'verbose_name_plural': "Tâches d'arrière-plan",
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', '-priority', 'run_at'], name='core_job_status_c00792_idx'), models.Index(fields=['name', 'status'], name='core_job_name_81883d_idx'), models.Index(fields=['finished_at'], name='core_job_finishe_b7ddc2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Tâche d'arrière-plan exécutée par `manage.py run_jobs` (voir core.jobs)"""
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminée'),
+        ('failed', 'Échouée'),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name="Tâche")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Paramètres")
+    priority = models.SmallIntegerField(default=0, verbose_name="Priorité")  # Plus élevée = traitée d'abord
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Tentatives")
+    max_attempts = models.PositiveSmallIntegerField(default=5, verbose_name="Tentatives maximum")
+    run_at = models.DateTimeField(default=timezone.now, verbose_name="Exécution prévue")
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name="Worker")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Prise en charge")
+    last_error = models.TextField(blank=True, verbose_name="Dernière erreur")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créée le")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Démarrée le")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Terminée le")
+    wait_ms = models.FloatField(null=True, blank=True, verbose_name="Attente (ms)")
+    duration_ms = models.FloatField(null=True, blank=True, verbose_name="Durée (ms)")
+
+    class Meta:
+        verbose_name = "Tâche d'arrière-plan"
+        verbose_name_plural = "Tâches d'arrière-plan"
+        ordering = ['-created_at']
+        indexes = [
+            # Sélection des tâches à exécuter
+            models.Index(fields=['status', '-priority', 'run_at']),
+            models.Index(fields=['name', 'status']),
+            models.Index(fields=['finished_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
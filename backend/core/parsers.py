@@ -0,0 +1,19 @@
+"""Lecture des corps JSON par orjson (repli sur le JSONParser de DRF sans orjson)"""
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+try:
+    import orjson
+except ImportError:  # orjson facultatif
+    orjson = None
+
+
+class ORJSONParser(parsers.JSONParser):
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,185 @@
+"""
+Capture des requêtes SQL lentes.
+
+`SlowQueryMiddleware` installe un `execute_wrapper` sur chaque connexion le
+temps de la requête HTTP : toute requête SQL plus longue que
+`SLOW_QUERY_THRESHOLD_MS` est normalisée en empreinte (littéraux et listes
+IN remplacés par `?`) puis agrégée dans le cache partagé : nombre
+d'exécutions, temps total et maximum, dernier chemin HTTP et un exemple
+complet (SQL + paramètres) pour l'EXPLAIN de `manage.py advise_indexes`.
+
+Les agrégats sont approximatifs (mise à jour lecture/écriture non atomique
+entre workers) : ils servent à classer les requêtes, pas à les compter.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .cache import make_key
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximum d'empreintes conservées (les moins coûteuses sont évincées)
+MAX_FINGERPRINTS = 500
+STATS_TIMEOUT = 7 * 24 * 3600
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_RE = re.compile(r'(?<![\w.`"])-?\d+(?:\.\d+)?(?![\w`"])')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_RE = re.compile(r'\bVALUES\s*\(.*\)', re.IGNORECASE | re.DOTALL)
+_SPACES_RE = re.compile(r'\s+')
+
+_local = threading.local()
+
+
+def threshold_ms():
+    return getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200)
+
+
+def is_enabled():
+    return getattr(settings, 'SLOW_QUERY_CAPTURE', False)
+
+
+def normalize(sql):
+    """SQL sans valeurs : deux requêtes de même forme ont la même empreinte"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _VALUES_RE.sub('VALUES (...)', sql)
+    return _SPACES_RE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    normalized = normalize(sql)
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16], normalized
+
+
+def _index_key():
+    return make_key('slowquery', 'index')
+
+
+def _entry_key(digest):
+    return make_key('slowquery', digest)
+
+
+def _cache():
+    from django.core.cache import cache
+    return cache
+
+
+def record(alias, sql, params, duration_ms, path=''):
+    """Ajoute une exécution lente aux agrégats partagés"""
+    digest, normalized = fingerprint(sql)
+    cache = _cache()
+    key = _entry_key(digest)
+    entry = cache.get(key) or {
+        'fingerprint': digest,
+        'sql': normalized,
+        'alias': alias,
+        'count': 0,
+        'total_ms': 0.0,
+        'max_ms': 0.0,
+    }
+    entry['count'] += 1
+    entry['total_ms'] += duration_ms
+    if duration_ms >= entry['max_ms']:
+        # L'exemple conservé est l'exécution la plus lente
+        entry['max_ms'] = duration_ms
+        entry['sample'] = sql
+        entry['params'] = tuple(params or ())
+    entry['path'] = path
+    entry['last_seen'] = timezone.now()
+    cache.set(key, entry, timeout=STATS_TIMEOUT)
+
+    index = cache.get(_index_key()) or []
+    if digest not in index:
+        index.append(digest)
+        if len(index) > MAX_FINGERPRINTS:
+            entries = cache.get_many([_entry_key(d) for d in index])
+            index.sort(key=lambda d: entries.get(_entry_key(d), {}).get('total_ms', 0), reverse=True)
+            cache.delete_many([_entry_key(d) for d in index[MAX_FINGERPRINTS:]])
+            index = index[:MAX_FINGERPRINTS]
+        cache.set(_index_key(), index, timeout=STATS_TIMEOUT)
+
+
+def top(limit=20, min_count=1):
+    """Empreintes les plus coûteuses (temps total décroissant)"""
+    cache = _cache()
+    index = cache.get(_index_key()) or []
+    entries = [
+        entry for entry in cache.get_many([_entry_key(d) for d in index]).values()
+        if entry['count'] >= min_count
+    ]
+    entries.sort(key=lambda entry: entry['total_ms'], reverse=True)
+    return entries[:limit]
+
+
+def reset():
+    cache = _cache()
+    index = cache.get(_index_key()) or []
+    cache.delete_many([_entry_key(d) for d in index] + [_index_key()])
+
+
+class SlowQueryRecorder:
+    """`execute_wrapper` qui chronomètre chaque requête SQL"""
+
+    def __init__(self, alias, path='', threshold=None):
+        self.alias = alias
+        self.path = path
+        self.threshold = threshold_ms() if threshold is None else threshold
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            # executemany : temps cumulé de plusieurs requêtes, ignoré
+            if not many and duration_ms >= self.threshold and not getattr(_local, 'recording', False):
+                _local.recording = True
+                try:
+                    record(self.alias, sql, params, duration_ms, self.path)
+                except Exception as e:
+                    logger.warning("Capture de requête lente impossible: %s", e)
+                finally:
+                    _local.recording = False
+
+
+def capture(path=''):
+    """Contexte qui capture les requêtes lentes sur toutes les connexions"""
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(SlowQueryRecorder(connection.alias, path)))
+    return stack
+
+
+class SlowQueryMiddleware:
+    """Active la capture des requêtes lentes pendant chaque requête HTTP"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            # ASGI : les requêtes SQL s'exécutent dans des fils de travail dont
+            # les connexions ne portent pas ce wrapper ; capture limitée à WSGI
+            return self.get_response(request)
+        if not is_enabled():
+            return self.get_response(request)
+        with capture(request.path):
+            return self.get_response(request)
@@ -0,0 +1,39 @@
+"""
+Rendu JSON de l'API par orjson.
+
+orjson sérialise nativement dict, list, str, nombres et UUID (plusieurs
+fois plus rapide que `json`). Les autres types, dates comprises, passent
+par l'encodeur de DRF : le JSON produit est identique à celui du
+JSONRenderer par défaut (dates-heures UTC en `Z` à la milliseconde,
+Decimal bruts en nombres, DecimalField des serializers en chaînes). Sans orjson (paquet facultatif), repli sur le JSONRenderer de DRF.
+"""
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # orjson facultatif
+    orjson = None
+
+_encoder = JSONEncoder()
+
+if orjson is not None:
+    # Dates confiées à DRF (microsecondes tronquées) ; clés non chaînes acceptées comme par `json`
+    OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(data, indent=False):
+    """JSON (bytes) de `data`, types non natifs convertis par l'encodeur de DRF"""
+    option = OPTIONS | orjson.OPT_INDENT_2 if indent else OPTIONS
+    return orjson.dumps(data, default=_encoder.default, option=option)
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer de DRF, sérialisation par orjson"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return dumps(data, indent=bool(self.get_indent(accepted_media_type, renderer_context or {})))
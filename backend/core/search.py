@@ -2,6 +2,7 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.db.models import Q
+from core.db_router import use_replica
 from patients.models import Patient, PatientAccess
 from invoices.models import Invoice
 from payments.models import Payment
@@ -10,6 +11,7 @@ from exams.models import ExamType
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@use_replica
 def global_search(request):
     """Recherche globale dans toutes les entités"""
     query = request.GET.get('q', '').strip()
@@ -135,6 +137,7 @@ def quick_search_patients(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@use_replica
 def search_statistics(request):
     """Statistiques de recherche et utilisation"""
     from django.db.models import Count
@@ -145,9 +148,10 @@ def search_statistics(request):
         'total_payments': Payment.objects.count(),
         'total_exam_types': ExamType.objects.count(),
         'active_patient_accesses': PatientAccess.objects.filter(is_active=True).count(),
-        'patients_by_gender': Patient.objects.values('gender').annotate(count=Count('id')),
-        'invoices_by_status': Invoice.objects.values('status').annotate(count=Count('id')),
-        'payments_by_method': Payment.objects.values('payment_method').annotate(count=Count('id'))
+        # Évalués ici (et non au rendu) pour être lus sur la réplique
+        'patients_by_gender': list(Patient.objects.values('gender').annotate(count=Count('id'))),
+        'invoices_by_status': list(Invoice.objects.values('status').annotate(count=Count('id'))),
+        'payments_by_method': list(Payment.objects.values('payment_method').annotate(count=Count('id')))
     }
     
     return Response(stats)
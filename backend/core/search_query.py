@@ -0,0 +1,262 @@
+"""
+Compilateur des recherches avancées de l'admin.
+
+Grammaire (termes séparés par des espaces, guillemets acceptés) :
+
+    champ:valeur          égalité (préfixe avec `valeur*` sur les textes)
+    champ:a..b            plage inclusive
+    champ:>v  champ:<=v   comparaisons (>, >=, <, <=)
+    >1000  <500  1000-2000           montant par défaut du modèle
+    2024-01-01  2024-01-01:2024-12-31  date par défaut du modèle
+
+Chaque alias désigne une ou plusieurs colonnes indexées du modèle
+(`operators`). Un terme sur une seule colonne produit un simple filtre
+(plan mono-index) ; un terme sur plusieurs colonnes produit une UNION de
+sous-requêtes, une par index, au lieu d'un OR qui empêche leur usage.
+Les bornes de dates sur un DateTimeField sont converties en intervalle
+semi-ouvert (`>= début, < lendemain`) plutôt qu'en `__date`, qui n'utilise
+pas l'index. Les termes non reconnus sont rendus à la recherche texte.
+"""
+import re
+import shlex
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core import checks
+from django.db import connections, models
+from django.db.models import Q
+from django.utils import timezone
+
+COMPARISONS = {'>': 'gt', '>=': 'gte', '<': 'lt', '<=': 'lte', '=': 'exact'}
+TRUE_VALUES = {'1', 'true', 'oui', 'vrai', 'yes'}
+FALSE_VALUES = {'0', 'false', 'non', 'faux', 'no'}
+
+# Au-delà, une UNION matérialisée (MySQL) retombe sur un simple OR
+UNION_MAX_IDS = 5000
+
+_COMPARISON_RE = re.compile(r'^(>=|<=|>|<|=)(.+)$')
+_DATE_RE = r'\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4}'
+_LEGACY_DATE_RANGE_RE = re.compile(rf'^({_DATE_RE}):({_DATE_RE})$')
+_NUMBER_RANGE_RE = re.compile(r'^(\d+(?:[.,]\d+)?)-(\d+(?:[.,]\d+)?)$')
+_ALIAS_RE = re.compile(r'^([a-zA-Z_][\w]*):(.+)$')
+
+
+class SearchSyntaxError(ValueError):
+    pass
+
+
+class Term:
+    """Terme analysé : alias (`@date` / `@amount` = colonne par défaut), opérateur et valeurs"""
+
+    def __init__(self, alias, op, values, raw):
+        self.alias = alias
+        self.op = op  # 'exact', 'gt', 'gte', 'lt', 'lte', 'range'
+        self.values = values
+        self.raw = raw
+
+    def __repr__(self):
+        return f'Term({self.alias!r}, {self.op!r}, {self.values!r})'
+
+
+def _split(query):
+    try:
+        return shlex.split(query)
+    except ValueError:
+        # Guillemet non fermé : découpage simple
+        return query.split()
+
+
+def _parse_expression(alias, expression, raw):
+    if '..' in expression:
+        low, _, high = expression.partition('..')
+        if not low or not high:
+            raise SearchSyntaxError(f"Plage incomplète: {raw}")
+        return Term(alias, 'range', [low, high], raw)
+    match = _COMPARISON_RE.match(expression)
+    if match:
+        return Term(alias, COMPARISONS[match.group(1)], [match.group(2)], raw)
+    return Term(alias, 'exact', [expression], raw)
+
+
+def parse(query):
+    """Retourne (termes structurés, mots de recherche texte)"""
+    terms, text = [], []
+    for token in _split(query):
+        legacy_dates = _LEGACY_DATE_RANGE_RE.match(token)
+        alias = _ALIAS_RE.match(token)
+        if legacy_dates:
+            terms.append(Term('@date', 'range', list(legacy_dates.groups()), token))
+        elif alias:
+            terms.append(_parse_expression(alias.group(1).lower(), alias.group(2), token))
+        elif _COMPARISON_RE.match(token):
+            terms.append(_parse_expression('@amount', token, token))
+        elif _NUMBER_RANGE_RE.match(token):
+            terms.append(Term('@amount', 'range', list(_NUMBER_RANGE_RE.match(token).groups()), token))
+        elif re.fullmatch(_DATE_RE, token):
+            terms.append(Term('@date', 'exact', [token], token))
+        else:
+            text.append(token)
+    return terms, text
+
+
+def parse_date(value):
+    for fmt in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise SearchSyntaxError(f"Date invalide: {value} (AAAA-MM-JJ ou JJ/MM/AAAA)")
+
+
+def _day_start(day):
+    """Début de journée dans le fuseau courant"""
+    value = datetime.combine(day, time.min)
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def index_columns(model):
+    """Colonnes utilisables comme première colonne d'un index"""
+    columns = set()
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.unique or field.db_index:
+            columns.add(field.name)
+    for index in model._meta.indexes:
+        if index.fields:
+            columns.add(index.fields[0].lstrip('-'))
+    for fields in model._meta.unique_together:
+        columns.add(fields[0])
+    return columns
+
+
+class SearchCompiler:
+    """
+    Compile une recherche avancée pour un modèle.
+
+    `operators` : {alias: champ ou tuple de champs}. `default_date` et
+    `default_amount` reçoivent les termes sans alias (dates, montants).
+    """
+
+    def __init__(self, model, operators=None, default_date=None, default_amount=None):
+        self.model = model
+        self.operators = {alias.lower(): fields for alias, fields in (operators or {}).items()}
+        if default_date:
+            self.operators['@date'] = default_date
+        if default_amount:
+            self.operators['@amount'] = default_amount
+
+    def columns(self, alias):
+        fields = self.operators.get(alias)
+        if fields is None:
+            return None
+        return (fields,) if isinstance(fields, str) else tuple(fields)
+
+    def check(self, obj=None):
+        """Avertit si un alias désigne une colonne sans index"""
+        indexed = index_columns(self.model)
+        warnings = []
+        for alias, fields in self.operators.items():
+            for name in ((fields,) if isinstance(fields, str) else fields):
+                if name not in indexed:
+                    warnings.append(checks.Warning(
+                        f"La recherche '{alias}' porte sur {self.model.__name__}.{name}, qui n'est pas indexé.",
+                        hint="Ajouter un index sur ce champ ou retirer l'alias.",
+                        obj=obj,
+                        id='core.W001',
+                    ))
+        return warnings
+
+    # -----------------------------------------------------------------
+    # Conversion des valeurs
+    # -----------------------------------------------------------------
+
+    def _convert(self, field, value):
+        if isinstance(field, (models.DateTimeField, models.DateField)):
+            return parse_date(value)
+        if isinstance(field, models.BooleanField):
+            lowered = value.lower()
+            if lowered in TRUE_VALUES:
+                return True
+            if lowered in FALSE_VALUES:
+                return False
+            raise SearchSyntaxError(f"Valeur oui/non attendue: {value}")
+        if isinstance(field, (models.DecimalField, models.FloatField)):
+            try:
+                return Decimal(value.replace(',', '.'))
+            except InvalidOperation:
+                raise SearchSyntaxError(f"Nombre invalide: {value}")
+        if isinstance(field, models.IntegerField):
+            try:
+                return int(value)
+            except ValueError:
+                raise SearchSyntaxError(f"Entier invalide: {value}")
+        if field.choices:
+            # Libellé ou valeur stockée
+            for key, label in field.flatchoices:
+                if value.lower() in (str(key).lower(), str(label).lower()):
+                    return key
+        return value
+
+    def _lookups(self, name, op, values):
+        """Filtres indexables sur une colonne"""
+        field = self.model._meta.get_field(name)
+        converted = [self._convert(field, value) for value in values]
+
+        if isinstance(field, models.DateTimeField):
+            # Intervalle semi-ouvert : l'index sur la colonne reste utilisable
+            if op == 'exact':
+                return {f'{name}__gte': _day_start(converted[0]), f'{name}__lt': _day_start(converted[0] + timedelta(days=1))}
+            if op == 'range':
+                return {f'{name}__gte': _day_start(converted[0]), f'{name}__lt': _day_start(converted[1] + timedelta(days=1))}
+            if op in ('gt', 'lte'):
+                return {f'{name}__{"gte" if op == "gt" else "lt"}': _day_start(converted[0] + timedelta(days=1))}
+            return {f'{name}__{op}': _day_start(converted[0])}
+
+        if op == 'range':
+            low, high = converted
+            return {f'{name}__gte': low, f'{name}__lte': high}
+        if op == 'exact' and isinstance(converted[0], str) and converted[0].endswith('*'):
+            # Préfixe : LIKE 'abc%' reste indexable
+            return {f'{name}__startswith': converted[0].rstrip('*')}
+        return {f'{name}__{op}': converted[0]}
+
+    # -----------------------------------------------------------------
+    # Plans
+    # -----------------------------------------------------------------
+
+    def _union_filter(self, queryset, branches):
+        """`pk IN (SELECT … UNION SELECT …)`, une branche par index"""
+        parts = [self.model._default_manager.filter(**lookups).order_by().values('pk') for lookups in branches]
+        union = parts[0].union(*parts[1:])
+        if connections[queryset.db].vendor == 'mysql':
+            # MySQL évalue une UNION en sous-requête ligne par ligne : identifiants matérialisés
+            ids = list(union[:UNION_MAX_IDS + 1].values_list('pk', flat=True))
+            if len(ids) > UNION_MAX_IDS:
+                condition = Q()
+                for lookups in branches:
+                    condition |= Q(**lookups)
+                return queryset.filter(condition)
+            return queryset.filter(pk__in=ids)
+        return queryset.filter(pk__in=union)
+
+    def apply(self, queryset, query):
+        """
+        Applique les termes reconnus et retourne (queryset, texte restant)
+        pour la recherche standard de l'admin.
+        """
+        terms, text = parse(query)
+        for term in terms:
+            columns = self.columns(term.alias)
+            if columns is None:
+                text.append(term.raw)
+                continue
+            branches = [self._lookups(name, term.op, term.values) for name in columns]
+            if len(branches) == 1:
+                queryset = queryset.filter(**branches[0])
+            else:
+                queryset = self._union_filter(queryset, branches)
+        return queryset, ' '.join(text)
+
+    def explain(self, queryset, query):
+        """Plan d'exécution de la recherche (diagnostic)"""
+        return self.apply(queryset, query)[0].explain()
@@ -0,0 +1,114 @@
+"""
+Listes rapides : lignes `values()` au lieu d'instances de modèle.
+
+Avec `list_serializer_class = ValuesListSerializer` dans le Meta d'un
+ModelSerializer, et `ValuesListMixin` sur le ViewSet, l'action `list` lit
+les colonnes du serializer par `values()` et ne convertit que celles dont la
+valeur en base diffère de la représentation JSON (dates-heures, décimaux,
+durées) : pas d'instance de modèle ni d'appel à `to_representation` par
+champ et par ligne. Le JSON produit est identique à celui du serializer.
+
+Les champs calculés sont déclarés par des expressions ORM :
+
+    class Meta:
+        list_serializer_class = ValuesListSerializer
+        values_expressions = {'full_name': Concat('first_name', Value(' '), 'last_name')}
+
+Un serializer avec des champs imbriqués ou des méthodes sans expression
+garde le chemin habituel.
+"""
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import F
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Champs dont la valeur lue en base n'est pas déjà la représentation JSON
+CONVERTED_FIELDS = (
+    serializers.DateTimeField,
+    serializers.DecimalField,
+    serializers.TimeField,
+    serializers.DurationField,
+)
+
+
+def _none_safe(convert):
+    return lambda value: None if value is None else convert(value)
+
+
+class ValuesListSerializer(serializers.ListSerializer):
+    """ListSerializer qui représente directement des lignes `values()`"""
+
+    _specs = {}
+
+    def values_spec(self):
+        """[(nom, lookup ou expression, conversion)] des champs du serializer enfant"""
+        child_class = type(self.child)
+        if child_class not in self._specs:
+            self._specs[child_class] = self._build_spec()
+        return self._specs[child_class]
+
+    def _build_spec(self):
+        model = self.child.Meta.model
+        expressions = getattr(self.child.Meta, 'values_expressions', {})
+        spec = []
+        for name, field in self.child.fields.items():
+            if field.write_only:
+                continue
+            convert = _none_safe(field.to_representation) if isinstance(field, CONVERTED_FIELDS) else None
+            if name in expressions:
+                spec.append((name, expressions[name], convert))
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField)) or '.' in field.source:
+                raise ImproperlyConfigured(
+                    f"{type(self.child).__name__}.{name} : champ calculé sans entrée dans Meta.values_expressions"
+                )
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"{type(self.child).__name__}.{name} : '{field.source}' n'est pas un champ de {model.__name__}"
+                )
+            if model_field.many_to_many or model_field.one_to_many:
+                raise ImproperlyConfigured(f"{type(self.child).__name__}.{name} : relation multiple non prise en charge")
+            spec.append((name, model_field.name, convert))
+        return spec
+
+    def values_queryset(self, queryset):
+        """QuerySet de dictionnaires portant exactement les clés du serializer"""
+        plain, annotated = [], {}
+        for name, lookup, convert in self.values_spec():
+            if lookup == name:
+                plain.append(name)
+            else:
+                # values(x=F('x')) est refusé quand x est un champ du modèle
+                annotated[name] = F(lookup) if isinstance(lookup, str) else lookup
+        return queryset.prefetch_related(None).values(*plain, **annotated)
+
+    def to_representation(self, data):
+        rows = data.all() if hasattr(data, 'all') else data
+        rows = list(rows)
+        if not rows or not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+        conversions = [(name, convert) for name, lookup, convert in self.values_spec() if convert is not None]
+        for row in rows:
+            for name, convert in conversions:
+                row[name] = convert(row[name])
+        return rows
+
+
+class ValuesListMixin:
+    """
+    ViewSet : `list` servi par `values()` quand le serializer déclare
+    `ValuesListSerializer` (filtres, recherche, tri et pagination inchangés).
+    """
+
+    def list(self, request, *args, **kwargs):
+        list_serializer = self.get_serializer(many=True)
+        if not isinstance(list_serializer, ValuesListSerializer):
+            return super().list(request, *args, **kwargs)
+
+        queryset = list_serializer.values_queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
@@ -0,0 +1,46 @@
+"""
+Sessions à expiration glissante sans écriture à chaque requête.
+
+Avec `SESSION_SAVE_EVERY_REQUEST`, chaque requête authentifiée par session
+(admin) réécrivait la session (UPDATE django_session). Ici la session
+n'est réenregistrée que si elle a été modifiée ou si sa dernière
+prolongation date de plus de `SESSION_REFRESH_INTERVAL` secondes : la
+durée d'inactivité tolérée reste `SESSION_COOKIE_AGE`, à l'intervalle près.
+
+Le stockage est choisi par `SESSION_MODE` (voir settings) : base de
+données, cache partagé ou cookie signé.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+
+# Horodatage de la dernière prolongation, stocké dans la session
+REFRESHED_AT_KEY = '_refreshed_at'
+
+
+def refresh_interval():
+    return getattr(settings, 'SESSION_REFRESH_INTERVAL', 300)
+
+
+class SlidingSessionMiddleware(SessionMiddleware):
+    """SessionMiddleware qui regroupe les prolongations d'expiration"""
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if session is not None and not settings.SESSION_SAVE_EVERY_REQUEST:
+            self.refresh_expiry(session)
+        return super().process_response(request, response)
+
+    def refresh_expiry(self, session):
+        accessed = session.accessed
+        # Lecture de la session (clé inconnue ou expirée => session vide)
+        if session.get_expire_at_browser_close() or session.is_empty():
+            session.accessed = accessed
+            return
+        now = int(time.time())
+        if session.modified or now - session.get(REFRESHED_AT_KEY, 0) >= refresh_interval():
+            # Marque la session modifiée : enregistrée et cookie prolongé par SessionMiddleware
+            session[REFRESHED_AT_KEY] = now
+        else:
+            session.accessed = accessed
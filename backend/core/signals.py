@@ -0,0 +1,73 @@
+"""
+Invalidation automatique des tags de cache (voir `core.cache`).
+
+Chaque modèle suivi déclare les tags qu'une modification doit invalider :
+un tag global par modèle et des tags par objet pour les caches ciblés.
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from . import cache as cache_layer
+
+
+def _patient_tags(instance):
+    return ['patients', f'patient:{instance.pk}']
+
+
+def _patient_access_tags(instance):
+    return ['patient_accesses', f'patient_access:{instance.pk}']
+
+
+def _invoice_tags(instance):
+    return ['invoices', f'invoice:{instance.pk}', f'patient:{instance.patient_id}']
+
+
+def _payment_tags(instance):
+    return ['payments', f'invoice:{instance.invoice_id}']
+
+
+def _exam_type_tags(instance):
+    return ['exams']
+
+
+def _patient_report_tags(instance):
+    return ['reports', f'patient_access:{instance.patient_access_id}']
+
+
+TRACKED_MODELS = {
+    'patients.Patient': _patient_tags,
+    'patients.PatientAccess': _patient_access_tags,
+    'invoices.Invoice': _invoice_tags,
+    'payments.Payment': _payment_tags,
+    'exams.ExamType': _exam_type_tags,
+    'reports.PatientReport': _patient_report_tags,
+}
+
+
+def invalidate_instance(sender, instance, **kwargs):
+    """Invalide les tags de l'objet une fois la transaction validée"""
+    tags = TRACKED_MODELS[sender._meta.label](instance)
+    transaction.on_commit(lambda: cache_layer.invalidate_tags(*tags))
+
+
+def invalidate_queryset(queryset):
+    """
+    Invalide les tags des objets d'un queryset.
+    
+    À appeler autour des `update()` / `bulk_create()` qui ne déclenchent
+    pas les signaux post_save.
+    """
+    tags_for = TRACKED_MODELS.get(queryset.model._meta.label)
+    if tags_for is None:
+        return
+    tags = set()
+    for instance in queryset:
+        tags.update(tags_for(instance))
+    transaction.on_commit(lambda: cache_layer.invalidate_tags(*sorted(tags)))
+
+
+def connect_signals(apps):
+    for label in TRACKED_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(invalidate_instance, sender=model, dispatch_uid=f'cache-tags-save-{label}')
+        post_delete.connect(invalidate_instance, sender=model, dispatch_uid=f'cache-tags-delete-{label}')
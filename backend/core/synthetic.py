@@ -0,0 +1,577 @@
+"""
+Données synthétiques réalistes pour les tests de charge (`manage.py seed_synthetic`).
+
+Volumes configurables (patients avec leur accès, factures avec leurs lignes
+et paiements, comptes rendus), insérés par `bulk_create` par lots de
+`CHUNK_SIZE` lignes, répartis entre plusieurs processus.
+
+Reproductible : chaque lot tire ses valeurs d'un générateur initialisé par
+(graine, phase, numéro de lot), et les clés primaires des patients, accès et
+factures sont attribuées explicitement à partir du maximum existant. Le
+résultat ne dépend donc ni du nombre de processus ni de l'ordre d'exécution
+des lots : même base de départ, même graine et même `end` donnent les mêmes
+données.
+
+Distributions :
+- noms et prénoms sénégalais, quartiers de Dakar et villes, numéros
+  +221 7X (Orange, Free, Expresso, Promobile) sous plusieurs écritures ;
+- activité croissante dans le temps (plus de patients et factures récents),
+  heures d'ouverture du centre ;
+- factures de 1 à 3 examens du catalogue, TVA incluse ;
+- statuts de facture cohérents avec les paiements (payée, partiellement
+  payée, envoyée, brouillon, annulée), paiements fractionnés, modes de
+  paiement dominés par les espèces et le mobile money (Wave, Orange Money) ;
+- comptes rendus « stubs » : enregistrements sans fichier sur disque
+  (`reports/synthetic/…`), suffisants pour les listes et statistiques.
+"""
+import bisect
+import math
+import multiprocessing
+import random
+import time
+import unicodedata
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from exams.models import ExamType
+from invoices.models import Invoice, InvoiceItem
+from patients.models import Patient, PatientAccess
+from payments.models import Payment
+from reports.models import PatientReport
+
+from . import cache as cache_layer
+from .identifiers import ALPHANUMERIC_UPPER
+
+# Taille d'un lot (une transaction) : fixe pour que le découpage ne change pas les données
+CHUNK_SIZE = 10_000
+
+PHASES = ('patients', 'invoices', 'reports')
+
+MALE_FIRST_NAMES = [
+    'Mamadou', 'Moussa', 'Ibrahima', 'Cheikh', 'Abdoulaye', 'Ousmane', 'Modou', 'Amadou',
+    'Babacar', 'Mouhamed', 'Serigne', 'Aliou', 'Pape', 'Alioune', 'Lamine', 'Souleymane',
+    'Malick', 'Omar', 'Idrissa', 'Samba', 'Assane', 'El Hadji', 'Daouda', 'Ismaïla',
+]
+FEMALE_FIRST_NAMES = [
+    'Aminata', 'Fatou', 'Awa', 'Mariama', 'Khady', 'Aïssatou', 'Ndeye', 'Coumba',
+    'Adja', 'Astou', 'Rokhaya', 'Sokhna', 'Bineta', 'Fatoumata', 'Dieynaba', 'Maïmouna',
+    'Seynabou', 'Yacine', 'Marème', 'Oumou', 'Nafissatou', 'Penda', 'Aby', 'Anta',
+]
+LAST_NAMES = [
+    'Diop', 'Ndiaye', 'Fall', 'Sow', 'Ba', 'Gueye', 'Diallo', 'Faye', 'Sarr', 'Diouf',
+    'Cissé', 'Mbaye', 'Niang', 'Thiam', 'Sy', 'Kane', 'Seck', 'Ndour', 'Camara', 'Touré',
+    'Dieng', 'Sall', 'Mbengue', 'Wade', 'Diagne', 'Ka', 'Lo', 'Tall', 'Badji', 'Sène',
+]
+# (quartier ou ville, poids)
+LOCALITIES = [
+    ('Médina, Dakar', 6), ('Parcelles Assainies, Dakar', 10), ('Grand Yoff, Dakar', 7),
+    ('Sicap Liberté, Dakar', 5), ('Ouakam, Dakar', 4), ('Yoff, Dakar', 4), ('HLM, Dakar', 4),
+    ('Point E, Dakar', 2), ('Pikine', 12), ('Guédiawaye', 10), ('Keur Massar', 8),
+    ('Rufisque', 7), ('Thiès', 6), ('Mbour', 5), ('Touba', 3), ('Saint-Louis', 3), ('Kaolack', 3),
+]
+EMAIL_DOMAINS = ['gmail.com', 'yahoo.fr', 'hotmail.com', 'orange.sn', 'outlook.fr']
+# Préfixes mobiles : Orange (77, 78), Free (76), Expresso (70), Promobile (75)
+PHONE_PREFIXES = [('77', 45), ('78', 20), ('76', 22), ('70', 10), ('75', 3)]
+# Tranches d'âge (min, max, poids)
+AGE_BANDS = [(0, 4, 6), (5, 17, 10), (18, 34, 30), (35, 54, 30), (55, 74, 19), (75, 95, 5)]
+
+# (nom, prix FCFA, durée en minutes, poids dans les prescriptions)
+EXAM_CATALOG = [
+    ('Radiographie thoracique', 15000, 15, 18),
+    ('Radiographie du bassin', 15000, 15, 5),
+    ('Radiographie du genou', 12000, 15, 6),
+    ('Radiographie du rachis lombaire', 18000, 20, 5),
+    ('Échographie abdominale', 25000, 30, 14),
+    ('Échographie pelvienne', 25000, 30, 8),
+    ('Échographie obstétricale', 20000, 30, 10),
+    ('Échographie thyroïdienne', 20000, 20, 3),
+    ('Mammographie', 35000, 20, 4),
+    ('Doppler veineux des membres inférieurs', 35000, 30, 3),
+    ('Panoramique dentaire', 15000, 15, 3),
+    ('Scanner cérébral', 60000, 20, 7),
+    ('Scanner thoracique', 75000, 20, 4),
+    ('Scanner abdomino-pelvien', 90000, 30, 4),
+    ('IRM cérébrale', 150000, 45, 3),
+    ('IRM lombaire', 150000, 45, 2),
+    ('IRM du genou', 130000, 40, 1),
+]
+
+# (mode, poids) ; les modes mobile money ont un numéro et une référence opérateur
+PAYMENT_METHODS = [
+    ('cash', 35), ('wave', 25), ('orange_money', 20), ('free_money', 5), ('mobile_money', 3),
+    ('bank_transfer', 5), ('check', 4), ('credit_card', 3),
+]
+MOBILE_METHODS = {'wave': 'WAV', 'orange_money': 'OM', 'free_money': 'FM', 'mobile_money': 'MM'}
+PAYMENT_STATUSES = [('completed', 920), ('failed', 30), ('pending', 20), ('cancelled', 15), ('refunded', 15)]
+UNPAID_INVOICE_STATUSES = [('sent', 70), ('draft', 15), ('cancelled', 15)]
+COVERAGES = ['IPM Sonatel', 'IPRES', 'AXA Assurances Sénégal', 'ASKIA Assurances', 'Mutuelle de santé']
+
+# Part des factures sans aucun paiement (envoyées, brouillons, annulées)
+UNPAID_RATE = 0.15
+# Part des factures payées restant partiellement payées
+PARTIAL_RATE = 0.12
+# Part des patients revenant pour une nouvelle facture (sinon nouveau patient)
+RETURNING_RATE = 0.6
+
+# Permutation affine des numéros de ligne vers les identifiants (inversible : pas de doublon)
+_MULTIPLIER = 2654435761
+_MASK64 = (1 << 64) - 1
+# Flux indépendants du hachage
+_STREAM_INVOICE_TIME, _STREAM_INVOICE_PATIENT, _STREAM_RETURNING, _STREAM_REPORT = range(1, 5)
+
+
+def _mix(value):
+    """splitmix64 : entier 64 bits pseudo-aléatoire dérivé de `value`"""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+def _weighted(pairs):
+    values = [value for value, weight in pairs]
+    cumulative, total = [], 0
+    for _, weight in pairs:
+        total += weight
+        cumulative.append(total)
+    return values, cumulative
+
+
+def _encode(number, length):
+    chars = []
+    for _ in range(length):
+        number, digit = divmod(number, len(ALPHANUMERIC_UPPER))
+        chars.append(ALPHANUMERIC_UPPER[digit])
+    return ''.join(reversed(chars))
+
+
+def _ascii(text):
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower().replace(' ', '')
+
+
+@contextmanager
+def historical_timestamps():
+    """Désactive auto_now / auto_now_add : les dates générées sont conservées"""
+    patched = []
+    for model in (Patient, PatientAccess, Invoice, Payment, PatientReport):
+        for field in model._meta.concrete_fields:
+            for attr in ('auto_now', 'auto_now_add'):
+                if getattr(field, attr, False):
+                    setattr(field, attr, False)
+                    patched.append((field, attr))
+    try:
+        yield
+    finally:
+        for field, attr in patched:
+            setattr(field, attr, True)
+
+
+class Plan:
+    """Paramètres d'une génération, transmis à chaque processus"""
+
+    def __init__(self, seed, patients, invoices, payments, reports, days, end, batch_size,
+                 bases, exams, secretaries, cashiers):
+        self.seed = seed
+        self.counts = {'patients': patients, 'invoices': invoices, 'reports': reports}
+        # Moyenne par facture ayant au moins un paiement, pour approcher le total demandé
+        self.payments_per_paid_invoice = payments / (invoices * (1 - UNPAID_RATE)) if invoices else 0
+        self.days = days
+        self.end = end
+        self.batch_size = batch_size
+        self.bases = bases
+        self.exams = exams
+        self.secretaries = secretaries
+        self.cashiers = cashiers
+        self.exam_choice = _weighted([(exam, exam[3]) for exam in exams])
+        self.locality_choice = _weighted(LOCALITIES)
+        self.prefix_choice = _weighted(PHONE_PREFIXES)
+        self.age_choice = _weighted([((low, high), weight) for low, high, weight in AGE_BANDS])
+        self.method_choice = _weighted(PAYMENT_METHODS)
+        self.payment_status_choice = _weighted(PAYMENT_STATUSES)
+        self.unpaid_status_choice = _weighted(UNPAID_INVOICE_STATUSES)
+
+    def chunks(self, phase):
+        return math.ceil(self.counts[phase] / CHUNK_SIZE)
+
+    def unit(self, stream, index):
+        """Réel dans [0, 1) déterminé par (graine, flux, index)"""
+        return _mix(_mix(self.seed * 8 + stream) ^ index) / 2 ** 64
+
+    def moment(self, fraction):
+        """Instant de la période générée (0 : début, 1 : fin)"""
+        return self.end - timedelta(days=self.days * (1 - fraction))
+
+    # Clés primaires attribuées : base + numéro de ligne
+    def patient_pk(self, i):
+        return self.bases['patient'] + i
+
+    def access_pk(self, i):
+        return self.bases['access'] + i
+
+    def invoice_pk(self, k):
+        return self.bases['invoice'] + k
+
+    def patient_fraction(self, i):
+        # Activité croissante : la densité de nouveaux patients augmente avec le temps
+        return math.sqrt((i + 0.5) / self.counts['patients'])
+
+    def invoice_fraction(self, k):
+        return math.sqrt(self.unit(_STREAM_INVOICE_TIME, k))
+
+    def invoice_patient(self, k):
+        """Patient facturé : un patient déjà connu à cette date, souvent récent"""
+        known = max(1, min(self.counts['patients'], int(self.counts['patients'] * self.invoice_fraction(k) ** 2)))
+        u = self.unit(_STREAM_INVOICE_PATIENT, k)
+        if self.unit(_STREAM_RETURNING, k) < RETURNING_RATE:
+            return int(u * known)
+        # Nouveau patient : parmi les derniers inscrits
+        recent = max(1, known // 100)
+        return known - 1 - int(u * recent)
+
+
+def _pick(rng, choice):
+    values, cumulative = choice
+    return values[bisect.bisect_right(cumulative, rng.random() * cumulative[-1])]
+
+
+def _phone(plan, rng):
+    number = _pick(rng, plan.prefix_choice) + ''.join(rng.choice('0123456789') for _ in range(7))
+    style = rng.random()
+    if style < 0.5:
+        return f'+221{number}'
+    if style < 0.9:
+        return number
+    return f'00221{number}'
+
+
+def _business_hours(plan, rng, moment):
+    """Même jour, entre 8 h et 18 h (heure locale)"""
+    opening = timezone.localtime(moment).replace(hour=8, minute=0, second=0, microsecond=0)
+    return min(opening + timedelta(seconds=rng.randrange(10 * 3600)), plan.end)
+
+
+# ---------------------------------------------------------------------------
+# Phases (exécutées dans les processus de travail)
+# ---------------------------------------------------------------------------
+
+def _free_codes(plan, model, field, length, salt, start, stop):
+    """
+    Identifiant de `length` caractères pour chaque ligne de [start, stop),
+    sans doublon entre lignes (permutation) ni avec la base existante.
+    """
+    space = len(ALPHANUMERIC_UPPER) ** length
+    offset = _mix(plan.seed * 8 + salt) % space
+    pending = list(range(start, stop))
+    codes = {}
+    attempt = 0
+    while pending:
+        # Collision avec la base : numéro suivant hors de la plage des lignes générées
+        candidates = {
+            i: _encode((_MULTIPLIER * (i + attempt * plan.counts['patients']) + offset) % space, length)
+            for i in pending
+        }
+        values = list(candidates.values())
+        taken = set()
+        for begin in range(0, len(values), plan.batch_size):
+            taken.update(model.objects.filter(**{f'{field}__in': values[begin:begin + plan.batch_size]})
+                         .values_list(field, flat=True))
+        codes.update((i, code) for i, code in candidates.items() if code not in taken)
+        pending = [i for i in pending if candidates[i] in taken]
+        attempt += 1
+    return codes
+
+
+def build_patients(plan, rng, start, stop):
+    patient_ids = _free_codes(plan, Patient, 'patient_id', 6, 1, start, stop)
+    access_keys = _free_codes(plan, PatientAccess, 'access_key', 12, 2, start, stop)
+    patients, accesses = [], []
+    for i in range(start, stop):
+        female = rng.random() < 0.52
+        first_name = rng.choice(FEMALE_FIRST_NAMES if female else MALE_FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        low, high = _pick(rng, plan.age_choice)
+        created_at = _business_hours(plan, rng, plan.moment(plan.patient_fraction(i)))
+        has_email = rng.random() < 0.25
+        email = f'{_ascii(first_name)}.{_ascii(last_name)}{rng.randrange(1, 999)}@{rng.choice(EMAIL_DOMAINS)}' \
+            if has_email else ''
+        patients.append(Patient(
+            id=plan.patient_pk(i),
+            patient_id=patient_ids[i],
+            first_name=first_name,
+            last_name=last_name,
+            age=rng.randint(low, high),
+            gender='F' if female else 'M',
+            phone_number=_phone(plan, rng) if rng.random() < 0.96 else None,
+            address=f'Villa N° {rng.randint(1, 999)}, {_pick(rng, plan.locality_choice)}',
+            email=email,
+            created_at=created_at,
+            updated_at=created_at,
+        ))
+        access_count = int(rng.expovariate(0.3)) if rng.random() < 0.7 else 0
+        last_accessed = min(created_at + timedelta(days=rng.randint(0, 60), hours=rng.randint(0, 12)), plan.end) \
+            if access_count else None
+        accesses.append(PatientAccess(
+            id=plan.access_pk(i),
+            patient_id=plan.patient_pk(i),
+            access_key=access_keys[i],
+            password=''.join(rng.choice(ALPHANUMERIC_UPPER + 'abcdefghijklmnopqrstuvwxyz') for _ in range(8)),
+            is_active=rng.random() < 0.97,
+            access_count=access_count,
+            last_accessed=last_accessed,
+            created_by_id=rng.choice(plan.secretaries),
+            created_at=created_at,
+            updated_at=last_accessed or created_at,
+            sent_via_sms=rng.random() < 0.7,
+            sent_via_email=has_email and rng.random() < 0.5,
+        ))
+    Patient.objects.bulk_create(patients, batch_size=plan.batch_size)
+    PatientAccess.objects.bulk_create(accesses, batch_size=plan.batch_size)
+    return {'patients': len(patients), 'accès patients': len(accesses)}
+
+
+def _split(total, parts, rng):
+    """Répartit `total` en `parts` versements arrondis à 500 FCFA"""
+    amounts = []
+    remaining = total
+    for left in range(parts, 1, -1):
+        share = remaining * Decimal(rng.uniform(0.4, 0.7) if left == parts else 1 / left)
+        amount = max(Decimal(500), (share / 500).quantize(Decimal(1)) * 500)
+        amount = min(amount, remaining - left + 1)
+        amounts.append(amount)
+        remaining -= amount
+    amounts.append(remaining)
+    return amounts
+
+
+def _payment(plan, rng, invoice, phone, amount, status, paid_at, number):
+    method = _pick(rng, plan.method_choice)
+    payment = Payment(
+        invoice_id=invoice.id,
+        amount=amount,
+        payment_method=method,
+        payment_date=paid_at,
+        status=status,
+        receipt_number=f'REC-SYN-{invoice.id:09d}-{number}',
+        recorded_by_id=rng.choice(plan.cashiers),
+        created_at=paid_at,
+        updated_at=paid_at,
+    )
+    if method in MOBILE_METHODS:
+        payment.phone_number = phone or _phone(plan, rng)
+        payment.transaction_id = f'{MOBILE_METHODS[method]}{paid_at:%y%m%d}.{rng.randrange(16 ** 8):08X}'
+        payment.operator_reference = f'{rng.randrange(10 ** 10):010d}'
+    elif method == 'check':
+        payment.reference_number = f'CHQ {rng.randrange(10 ** 7):07d}'
+    elif method == 'bank_transfer':
+        payment.reference_number = f'VIR-{paid_at:%Y%m%d}-{rng.randrange(10 ** 6):06d}'
+    elif method == 'credit_card':
+        payment.transaction_id = f'CB{rng.randrange(16 ** 12):012X}'
+    if rng.random() < 0.15:
+        payment.coverage_percentage = Decimal(rng.choice([50, 70, 80, 100]))
+        payment.coverage_name = rng.choice(COVERAGES)
+    return payment
+
+
+def build_invoices(plan, rng, start, stop):
+    invoices, items, payments = [], [], []
+    whole, extra = divmod(plan.payments_per_paid_invoice, 1)
+    for k in range(start, stop):
+        i = plan.invoice_patient(k)
+        created_at = _business_hours(plan, rng, plan.moment(plan.invoice_fraction(k)))
+        invoice = Invoice(
+            id=plan.invoice_pk(k),
+            invoice_number=f"FAC-{plan.bases['invoice_number'] + k + 1:06d}",
+            patient_id=plan.patient_pk(i),
+            created_by_id=rng.choice(plan.secretaries),
+            invoice_date=created_at.date(),
+            due_date=created_at.date() + timedelta(days=30),
+            tax_rate=Decimal('18.00'),
+            created_at=created_at,
+            updated_at=created_at,
+        )
+        total = Decimal(0)
+        for _ in range(rng.choices((1, 2, 3), weights=(70, 22, 8))[0]):
+            exam_id, name, price, weight = _pick(rng, plan.exam_choice)
+            quantity = 1 if rng.random() < 0.95 else 2
+            items.append(InvoiceItem(
+                invoice_id=invoice.id, exam_type_id=exam_id, description=name,
+                quantity=quantity, unit_price=price, total_price=price * quantity,
+            ))
+            total += price * quantity
+        invoice.total_amount = total
+        invoice.subtotal = round(total / (1 + invoice.tax_rate / Decimal('100')))
+        invoice.tax_amount = total - invoice.subtotal
+
+        count = 0 if rng.random() < UNPAID_RATE else int(whole) + (rng.random() < extra)
+        statuses = [_pick(rng, plan.payment_status_choice) for _ in range(count)]
+        completed = statuses.count('completed')
+        paid = total
+        if completed and rng.random() < PARTIAL_RATE:
+            paid = max(Decimal(500), (total * Decimal(rng.uniform(0.3, 0.9)) / 500).quantize(Decimal(1)) * 500)
+            paid = min(paid, total - 1)
+        amounts = iter(_split(paid, completed, rng)) if completed else iter(())
+        phone = _phone(plan, rng)
+        paid_at = created_at
+        for number, status in enumerate(statuses, start=1):
+            # La plupart des patients paient le jour même, les autres au fil des semaines
+            if number > 1 or rng.random() > 0.7:
+                paid_at = min(paid_at + timedelta(days=rng.randint(1, 30), minutes=rng.randint(0, 600)), plan.end)
+            amount = next(amounts) if status == 'completed' else (total - paid or total)
+            payments.append(_payment(plan, rng, invoice, phone, amount, status, paid_at, number))
+        if completed:
+            invoice.status = 'paid' if paid >= total else 'partially_paid'
+            invoice.updated_at = paid_at
+        else:
+            invoice.status = _pick(rng, plan.unpaid_status_choice)
+        # Comme Invoice.save : accès patient rattaché dès l'envoi
+        if invoice.status not in ('draft', 'cancelled'):
+            invoice.patient_access_id = plan.access_pk(i)
+        invoices.append(invoice)
+    Invoice.objects.bulk_create(invoices, batch_size=plan.batch_size)
+    InvoiceItem.objects.bulk_create(items, batch_size=plan.batch_size)
+    Payment.objects.bulk_create(payments, batch_size=plan.batch_size)
+    return {'factures': len(invoices), 'lignes de facture': len(items), 'paiements': len(payments)}
+
+
+def build_reports(plan, rng, start, stop):
+    reports = []
+    for r in range(start, stop):
+        k = int(plan.unit(_STREAM_REPORT, r) * plan.counts['invoices'])
+        created_at = min(plan.moment(plan.invoice_fraction(k)) + timedelta(days=rng.randint(0, 5), hours=rng.randint(1, 8)),
+                         plan.end)
+        download_count = int(rng.expovariate(0.5)) if rng.random() < 0.8 else 0
+        reports.append(PatientReport(
+            patient_access_id=plan.access_pk(plan.invoice_patient(k)),
+            report_file=f'reports/synthetic/{plan.seed}/{r:08d}.pdf',
+            original_filename=f'compte_rendu_{r:08d}.pdf',
+            created_at=created_at,
+            is_active=True,
+            download_count=download_count,
+            last_downloaded_at=min(created_at + timedelta(days=rng.randint(0, 20)), plan.end) if download_count else None,
+            ingestion_status='not_dicom',
+        ))
+    PatientReport.objects.bulk_create(reports, batch_size=plan.batch_size)
+    return {'comptes rendus': len(reports)}
+
+
+BUILDERS = {'patients': build_patients, 'invoices': build_invoices, 'reports': build_reports}
+
+
+def run_chunk(task):
+    """Génère et insère un lot (une transaction) ; retourne (phase, compteurs)"""
+    plan, phase, index = task
+    start = index * CHUNK_SIZE
+    stop = min(start + CHUNK_SIZE, plan.counts[phase])
+    rng = random.Random(f'{plan.seed}:{phase}:{index}')
+    try:
+        with historical_timestamps(), transaction.atomic():
+            return phase, BUILDERS[phase](plan, rng, start, stop)
+    finally:
+        if multiprocessing.parent_process() is not None:
+            connection.close()
+
+
+# ---------------------------------------------------------------------------
+# Préparation et exécution (processus principal)
+# ---------------------------------------------------------------------------
+
+def staff_users(role, count):
+    """Comptes fictifs (sans mot de passe utilisable) créant factures et paiements"""
+    User = get_user_model()
+    pks = []
+    for n in range(1, count + 1):
+        user, created = User.objects.get_or_create(
+            username=f'synthetic_{role}_{n}',
+            defaults={'role': role, 'first_name': 'Synthétique', 'last_name': f'{role.capitalize()} {n}'},
+        )
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        pks.append(user.pk)
+    return pks
+
+
+def exam_catalog():
+    """Types d'examens du catalogue synthétique : [(pk, nom, prix, poids)]"""
+    exams = []
+    for name, price, duration, weight in EXAM_CATALOG:
+        exam_type, _ = ExamType.objects.get_or_create(
+            name=name, defaults={'price': Decimal(price), 'duration_minutes': duration},
+        )
+        exams.append((exam_type.pk, exam_type.name, exam_type.price, weight))
+    return exams
+
+
+def _next_pk(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def make_plan(seed, patients, invoices, payments, reports, days=3 * 365, end=None, batch_size=1000):
+    """Plan de génération : catalogue, comptes et clés primaires de départ"""
+    last_invoice = Invoice.objects.order_by('-id').values_list('invoice_number', flat=True).first()
+    try:
+        invoice_number = int(last_invoice.split('-')[-1]) if last_invoice else 0
+    except ValueError:
+        invoice_number = _next_pk(Invoice)
+    bases = {
+        'patient': _next_pk(Patient),
+        'access': _next_pk(PatientAccess),
+        'invoice': _next_pk(Invoice),
+        'invoice_number': invoice_number,
+    }
+    return Plan(
+        seed=seed, patients=patients, invoices=invoices, payments=payments, reports=reports,
+        days=days, end=end or timezone.now(), batch_size=batch_size, bases=bases,
+        exams=exam_catalog(),
+        secretaries=staff_users('secretary', 5),
+        cashiers=staff_users('accountant', 3),
+    )
+
+
+def run(plan, processes=1, progress=None):
+    """Exécute les phases dans l'ordre ; retourne les lignes insérées par table"""
+    if connection.vendor == 'sqlite':
+        # Un seul écrivain à la fois
+        processes = 1
+    totals = {}
+    for phase in PHASES:
+        tasks = [(plan, phase, index) for index in range(plan.chunks(phase))]
+        if not tasks:
+            continue
+        start = time.perf_counter()
+        if processes > 1:
+            # Connexions fermées avant fork : chaque processus ouvre la sienne
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(processes) as pool:
+                results = list(_tracked(pool.imap_unordered(run_chunk, tasks), phase, len(tasks), start, progress))
+        else:
+            results = list(_tracked(map(run_chunk, tasks), phase, len(tasks), start, progress))
+        for _, counts in results:
+            for table, rows in counts.items():
+                totals[table] = totals.get(table, 0) + rows
+    _reset_sequences()
+    cache_layer.invalidate_tags('patients', 'patient_accesses', 'invoices', 'payments', 'reports')
+    return totals
+
+
+def _tracked(results, phase, total, start, progress):
+    for done, result in enumerate(results, start=1):
+        if progress:
+            progress(phase, done, total, time.perf_counter() - start)
+        yield result
+
+
+def _reset_sequences():
+    # Clés primaires explicites : séquences PostgreSQL à recaler (MySQL et SQLite suivent le maximum)
+    statements = connection.ops.sequence_reset_sql(no_style(), [Patient, PatientAccess, Invoice])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
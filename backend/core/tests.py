@@ -0,0 +1,542 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q, Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from invoices.models import Invoice
+from patients.models import Patient, PatientAccess, patient_id_generator
+from patients.serializers import PatientSerializer
+from payments.models import Payment
+
+from . import admin_search
+from . import cache as cache_layer
+from . import db_router, export, index_advisor, jobs, query_log, sessions, synthetic
+from .identifiers import IdentifierGenerator
+from .models import Job
+from .parsers import ORJSONParser
+from .renderers import ORJSONRenderer
+from .search_query import SearchCompiler, SearchSyntaxError, parse
+
+
+def index_name(model, *fields):
+    """Nom de l'index déclaré dans Meta.indexes pour ces colonnes"""
+    for index in model._meta.indexes:
+        if tuple(index.fields) == fields:
+            return index.name
+    raise AssertionError(f"Aucun index sur {model.__name__}{fields}")
+
+
+class SearchGrammarTests(TestCase):
+
+    def test_aliases_ranges_and_comparisons(self):
+        terms, text = parse('numero:FAC-000123 montant:1000..2000 date:>=2024-01-01 dupont')
+        self.assertEqual(
+            [(t.alias, t.op, t.values) for t in terms],
+            [
+                ('numero', 'exact', ['FAC-000123']),
+                ('montant', 'range', ['1000', '2000']),
+                ('date', 'gte', ['2024-01-01']),
+            ],
+        )
+        self.assertEqual(text, ['dupont'])
+
+    def test_bare_terms_use_model_defaults(self):
+        terms, text = parse('>1000 1000-2000 2024-01-01 01/01/2024:31/01/2024')
+        self.assertEqual(
+            [(t.alias, t.op) for t in terms],
+            [('@amount', 'gt'), ('@amount', 'range'), ('@date', 'exact'), ('@date', 'range')],
+        )
+        self.assertEqual(text, [])
+
+    def test_unknown_alias_falls_back_to_text(self):
+        compiler = SearchCompiler(Invoice, {'numero': 'invoice_number'})
+        queryset, text = compiler.apply(Invoice.objects.all(), 'inconnu:abc numero:FAC-1')
+        self.assertEqual(text, 'inconnu:abc')
+        self.assertIn('invoice_number', str(queryset.query))
+
+    def test_invalid_values(self):
+        compiler = SearchCompiler(Invoice, default_date='invoice_date', default_amount='total_amount')
+        with self.assertRaises(SearchSyntaxError):
+            compiler.apply(Invoice.objects.all(), '32/13/2024')
+        with self.assertRaises(SearchSyntaxError):
+            compiler.apply(Invoice.objects.all(), 'date:2024-01-01..')
+
+    def test_unindexed_alias_is_reported(self):
+        compiler = SearchCompiler(Patient, {'adresse': 'address', 'tel': 'phone_number'})
+        self.assertEqual([w.id for w in compiler.check()], ['core.W001'])
+
+
+class SearchIndexUsageTests(TestCase):
+    """Le plan d'exécution de chaque recherche doit passer par l'index attendu"""
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Tables de test minuscules : forcer le planificateur à considérer les index
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, *names):
+        plan = queryset.explain()
+        for name in names:
+            self.assertIn(name, plan, f"Index {name} absent du plan:\n{plan}")
+
+    def test_amount_range_uses_single_index(self):
+        compiler = SearchCompiler(Invoice, default_amount='total_amount')
+        queryset, _ = compiler.apply(Invoice.objects.order_by(), '1000-2000')
+        self.assertNotIn(' OR ', str(queryset.query))
+        self.assertUsesIndex(queryset, index_name(Invoice, 'total_amount'))
+
+    def test_date_range_uses_date_index(self):
+        compiler = SearchCompiler(Invoice, default_date='invoice_date')
+        queryset, _ = compiler.apply(Invoice.objects.order_by(), '2024-01-01:2024-12-31')
+        self.assertUsesIndex(queryset, index_name(Invoice, 'invoice_date'))
+
+    def test_datetime_day_is_half_open_range(self):
+        compiler = SearchCompiler(PatientAccess, {'cree': 'created_at'})
+        queryset, _ = compiler.apply(PatientAccess.objects.order_by(), 'cree:2024-03-01')
+        where = str(queryset.query).split('WHERE', 1)[1]
+        self.assertNotIn('DATE(', where.upper())
+        self.assertUsesIndex(queryset, index_name(PatientAccess, 'created_at'))
+
+    def test_multi_column_alias_uses_union(self):
+        compiler = SearchCompiler(Payment, {'ref': ('reference_number', 'transaction_id')})
+        queryset, _ = compiler.apply(Payment.objects.order_by(), 'ref:TX-42')
+        if connection.vendor == 'mysql':
+            # Identifiants matérialisés : le plan porte sur la clé primaire
+            self.assertNotIn(' OR ', str(queryset.query))
+            return
+        self.assertIn('UNION', str(queryset.query))
+        self.assertUsesIndex(
+            queryset,
+            index_name(Payment, 'reference_number'),
+            index_name(Payment, 'transaction_id'),
+        )
+
+    def test_amount_search_matches_rows(self):
+        from django.contrib.auth import get_user_model
+
+        user = get_user_model().objects.create_user(username='recherche', password='x', role='admin')
+        patient = Patient.objects.create(first_name='Awa', last_name='Diop', gender='F', phone_number='+221770000000')
+        today = datetime.date.today()
+        for amount in ('500', '1500', '2500'):
+            Invoice.objects.create(
+                patient=patient, created_by=user, invoice_date=today, due_date=today,
+                total_amount=Decimal(amount),
+            )
+        compiler = SearchCompiler(Invoice, default_amount='total_amount')
+        queryset, _ = compiler.apply(Invoice.objects.all(), '1000-2000')
+        self.assertEqual(list(queryset.values_list('total_amount', flat=True)), [Decimal('1500')])
+
+
+class IndexAdvisorTests(TestCase):
+
+    def test_fingerprint_ignores_values(self):
+        first = query_log.fingerprint("SELECT * FROM t WHERE a = 'x' AND b IN (%s, %s, %s) LIMIT 21")
+        second = query_log.fingerprint("SELECT * FROM t WHERE a = 'yz' AND b IN (%s) LIMIT 5")
+        self.assertEqual(first, second)
+        self.assertEqual(first[1], 'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?')
+
+    def test_composite_proposal_orders_equality_before_range(self):
+        sql, _ = Invoice.objects.filter(
+            status='paid', due_date__gte=datetime.date(2024, 1, 1)
+        ).order_by().query.sql_with_params()
+        proposal = index_advisor.propose(Invoice, sql)
+        self.assertEqual(proposal.fields, ('status', 'due_date'))
+        self.assertEqual(proposal.covered_by, '')
+
+        sql, _ = Invoice.objects.filter(status='paid').order_by().query.sql_with_params()
+        self.assertEqual(index_advisor.propose(Invoice, sql).covered_by, index_name(Invoice, 'status'))
+
+    def test_full_scan_is_detected(self):
+        sql, params = Invoice.objects.filter(due_date=datetime.date(2024, 1, 1)).order_by().query.sql_with_params()
+        advice = index_advisor.advise({'sample': sql, 'params': params})
+        self.assertEqual(advice.error, '')
+        self.assertIn(Invoice._meta.db_table, advice.full_scans)
+        self.assertEqual([p.fields for p in advice.proposals], [('due_date',)])
+
+
+calls = []
+
+
+@jobs.task('tests.record', priority=1)
+def record(value):
+    calls.append(value)
+
+
+@jobs.task('tests.fail', max_attempts=2)
+def fail():
+    raise ValueError('échec')
+
+
+@jobs.task('tests.requeued')
+def requeued():
+    # Tâche jugée abandonnée et reprise par un autre worker pendant son exécution
+    Job.objects.filter(name='tests.requeued').update(locked_by='autre', locked_at=timezone.now())
+
+
+@override_settings(JOBS_EAGER=False)
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_by_priority_then_schedule(self):
+        record.delay(value='bas')
+        record.delay(value='haut', priority=10)
+        record.delay(value='plus tard', priority=20, run_at=timezone.now() + datetime.timedelta(hours=1))
+
+        job = jobs.claim('test')
+        self.assertEqual(job.payload, {'value': 'haut'})
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('running', 1, 'test'))
+        self.assertTrue(jobs.execute(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertIsNotNone(job.duration_ms)
+        self.assertEqual(calls, ['haut'])
+
+    def test_failure_is_retried_with_backoff_then_failed(self):
+        fail.delay()
+        job = jobs.claim('test')
+        self.assertFalse(jobs.execute(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('ValueError', job.last_error)
+        self.assertIsNone(jobs.claim('test'))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertFalse(jobs.execute(jobs.claim('test')))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_stale_job_is_requeued(self):
+        job = record.delay(value='x')
+        jobs.claim('arrêté')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.claim('test').pk, job.pk)
+
+    def test_heartbeat_keeps_long_job_locked(self):
+        record.delay(value='x')
+        job = jobs.claim('test')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertTrue(jobs.heartbeat(job))
+        self.assertEqual(jobs.requeue_stale(), 0)
+
+    def test_result_of_requeued_job_is_not_recorded(self):
+        requeued.delay()
+        job = jobs.claim('test')
+        jobs.execute(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('running', 'autre'))
+
+
+@mock.patch.object(db_router, 'replica_alias', return_value='replica')
+@mock.patch.object(db_router, 'replica_lag', return_value=0)
+class ReplicaRouterTests(TestCase):
+    router = db_router.ReplicaRouter()
+
+    def setUp(self):
+        self.user = mock.Mock(pk=42, is_authenticated=True)
+        cache.delete(db_router._pin_key(self.user.pk))
+
+    def test_reads_use_replica_only_inside_block(self, *mocks):
+        self.assertIsNone(self.router.db_for_read(Patient))
+        with db_router.replica_reads(self.user):
+            self.assertEqual(self.router.db_for_read(Patient), 'replica')
+            self.assertEqual(self.router.db_for_write(Patient), 'default')
+        self.assertIsNone(self.router.db_for_read(Patient))
+
+    def test_recent_writer_reads_from_default(self, *mocks):
+        db_router.pin_user(self.user.pk)
+        with db_router.replica_reads(self.user):
+            self.assertIsNone(self.router.db_for_read(Patient))
+        with db_router.replica_reads(mock.Mock(pk=7, is_authenticated=True)):
+            self.assertEqual(self.router.db_for_read(Patient), 'replica')
+
+    def test_lagging_replica_falls_back_to_default(self, lag, alias):
+        lag.return_value = 60
+        with db_router.replica_reads(self.user):
+            self.assertIsNone(self.router.db_for_read(Patient))
+
+    def test_replica_is_not_migrated(self, *mocks):
+        self.assertFalse(self.router.allow_migrate('replica', 'patients'))
+        self.assertIsNone(self.router.allow_migrate('default', 'patients'))
+
+
+class JSONFastPathTests(TestCase):
+
+    def test_orjson_output_matches_drf(self):
+        data = {
+            'montant': Decimal('1500.50'),
+            'date': datetime.date(2024, 1, 31),
+            'le': datetime.datetime(2024, 1, 31, 8, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            'heure': datetime.time(8, 30, 15, 123456),
+            'patient': 'Aïssatou',
+            1: [None, True, 2.5],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_parser_reports_invalid_json(self):
+        self.assertEqual(ORJSONParser().parse(io.BytesIO('{"nom": "Diop"}'.encode())), {'nom': 'Diop'})
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{bad'))
+
+    def test_values_rows_match_serializer(self):
+        Patient.objects.create(first_name='Awa', last_name='Ndiaye', age=30, gender='F', phone_number='770000001')
+        Patient.objects.create(first_name='Moussa', last_name='Fall', age=45, gender='M', phone_number='770000002')
+        queryset = Patient.objects.order_by('pk')
+        rows = PatientSerializer(many=True).values_queryset(queryset)
+        with self.assertNumQueries(1):
+            fast = PatientSerializer(rows, many=True).data
+        self.assertEqual(fast, PatientSerializer(queryset, many=True).data)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.test import APIClient
+
+        self.user = get_user_model().objects.create_user(username='cond', password='x', role='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.patient = Patient.objects.create(first_name='Awa', last_name='Diop', gender='F', phone_number='770000003')
+
+    def test_unchanged_list_returns_304_without_serializing(self):
+        response = self.client.get('/api/patients/')
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/patients/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Une suppression change le nombre de lignes, donc l'ETag
+        Patient.objects.create(first_name='Moussa', last_name='Fall', gender='M', phone_number='770000004').delete()
+        self.assertEqual(self.client.get('/api/patients/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.patient.delete()
+        self.assertEqual(self.client.get('/api/patients/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_follows_related_updates(self):
+        from patients.views import PatientAccessViewSet
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        access = PatientAccess.objects.create(patient=self.patient, created_by=self.user)
+        view = PatientAccessViewSet.as_view({'get': 'retrieve'})
+
+        def get(**headers):
+            request = APIRequestFactory().get(f'/api/patients/access/{access.pk}/', **headers)
+            force_authenticate(request, self.user)
+            return view(request, pk=access.pk)
+
+        response = get()
+        self.assertEqual(get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        Patient.objects.filter(pk=self.patient.pk).update(updated_at=timezone.now() + datetime.timedelta(seconds=1))
+        self.assertEqual(get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_invoice_etag_follows_exam_catalog(self):
+        invoice = Invoice.objects.create(
+            patient=self.patient, created_by=self.user, invoice_number='FAC-000900',
+            invoice_date=datetime.date(2026, 1, 5), due_date=datetime.date(2026, 2, 5),
+        )
+        for url in ('/api/invoices/', f'/api/invoices/{invoice.pk}/'):
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            # Type d'examen modifié : `exam_type_details` des lignes change
+            cache_layer.invalidate_tags('exams')
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class SyntheticDataTests(TestCase):
+
+    def test_generated_rows_are_consistent(self):
+        end = timezone.make_aware(datetime.datetime(2026, 1, 31, 23, 59))
+        plan = synthetic.make_plan(seed=5, patients=50, invoices=120, payments=150, reports=20, days=90, end=end)
+        totals = synthetic.run(plan)
+        self.assertEqual(totals['patients'], 50)
+        self.assertEqual(Invoice.objects.count(), 120)
+        self.assertEqual(PatientAccess.objects.values('access_key').distinct().count(), 50)
+        self.assertFalse(Invoice.objects.filter(created_at__gt=end).exists())
+        paid = Invoice.objects.filter(status='paid').annotate(
+            paid=Sum('payments__amount', filter=Q(payments__status='completed')),
+        )
+        for invoice in paid:
+            self.assertEqual(invoice.paid, invoice.total_amount)
+        self.assertFalse(Invoice.objects.filter(status='sent', patient_access__isnull=True).exists())
+
+
+class CacheTagTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_evicted_tag_never_reuses_a_version(self):
+        first = cache_layer.tag_version('tests')
+        cache_layer.invalidate_tags('tests')
+        second = cache_layer.tag_version('tests')
+        self.assertGreater(second, first)
+
+        # Expulsion du tag : la nouvelle version n'a jamais servi
+        cache.delete(cache_layer._tag_key('tests'))
+        self.assertGreater(cache_layer.tag_version('tests'), second)
+        cache.delete(cache_layer._tag_key('tests'))
+        cache_layer.invalidate_tags('tests')
+        self.assertGreater(cache_layer.tag_version('tests'), second)
+
+    def test_exam_catalog_checks_version_once_per_interval(self):
+        from exams import catalog
+
+        catalog.exam_catalog.expire()
+        with mock.patch.object(catalog, 'get_version', wraps=catalog.get_version) as get_version:
+            for _ in range(100):
+                catalog.exam_catalog.serialized(1)
+            self.assertEqual(get_version.call_count, 1)
+            catalog.exam_catalog.expire()
+            catalog.exam_catalog.serialized(1)
+            self.assertEqual(get_version.call_count, 2)
+
+
+class ExportKeysetTests(TestCase):
+
+    def setUp(self):
+        for i, (last_name, age) in enumerate([
+            ('Diop', 30), ('Fall', None), ('Ba', 30), ('Sow', 52), ('Ndiaye', None), ('Diallo', 30), ('Kane', 18),
+        ]):
+            Patient.objects.create(first_name='P', last_name=last_name, age=age, gender='F', phone_number=f'77100000{i}')
+
+    def test_requested_ordering_kept_across_batches(self):
+        for ordering in (['age', '-last_name'], ['-age', 'last_name'], ['-created_at'], []):
+            queryset = Patient.objects.order_by(*ordering) if ordering else Patient.objects.all()
+            expected = list(queryset.values_list('last_name', 'age'))
+            self.assertEqual(list(export._iter_keyset(queryset, ['last_name', 'age'], chunk_size=2)), expected)
+
+
+class IdentifierGeneratorTests(TestCase):
+
+    def test_batch_reserved_with_one_query(self):
+        generator = IdentifierGenerator('patients.Patient', 'patient_id', length=6, pool_size=8)
+        with self.assertNumQueries(1):
+            identifiers = {generator.generate() for _ in range(8)}
+        self.assertEqual(len(identifiers), 8)
+        metrics = generator.metrics()
+        self.assertEqual((metrics['queries'], metrics['pool_hits'], metrics['pool_size']), (1, 7, 0))
+
+    def test_taken_candidates_skipped(self):
+        Patient.objects.create(first_name='Awa', last_name='Diop', gender='F', phone_number='770000020')
+        taken = Patient.objects.get().patient_id
+        generator = IdentifierGenerator('patients.Patient', 'patient_id', length=6, pool_size=2)
+        with mock.patch.object(generator, '_draw', return_value={taken, 'FREE01', 'FREE02'}):
+            self.assertIn(generator.generate(), {'FREE01', 'FREE02'})
+        self.assertEqual(generator.metrics()['collisions'], 1)
+
+    def test_pooled_identifier_inserted_by_another_process(self):
+        patient_id_generator._pool.clear()
+        patient_id_generator.generate()  # Remplit le pool
+        stale = patient_id_generator._pool[-1]
+        # Un autre processus insère l'identifiant que ce pool s'apprête à servir
+        Patient.objects.bulk_create([Patient(first_name='A', last_name='B', gender='F', patient_id=stale)])
+
+        conflicts = patient_id_generator.metrics()['insert_conflicts']
+        patient = Patient.objects.create(first_name='Awa', last_name='Diop', gender='F', phone_number='770000021')
+        self.assertNotEqual(patient.patient_id, stale)
+        self.assertEqual(Patient.objects.filter(patient_id=stale).count(), 1)
+        self.assertEqual(patient_id_generator.metrics()['insert_conflicts'], conflicts + 1)
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.db',
+    SESSION_SAVE_EVERY_REQUEST=False,
+    SESSION_REFRESH_INTERVAL=300,
+)
+class SlidingSessionTests(TestCase):
+
+    def setUp(self):
+        session = SessionStore()
+        session['user'] = 1
+        session[sessions.REFRESHED_AT_KEY] = 1000
+        session.save()
+        self.key = session.session_key
+
+    def request(self, now, modify=False):
+        """Retourne True si la session a été réenregistrée (cookie renvoyé)"""
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = self.key
+        middleware = sessions.SlidingSessionMiddleware(lambda request: HttpResponse())
+        middleware.process_request(request)
+        request.session.get('user')
+        if modify:
+            request.session['panier'] = 1
+        with mock.patch.object(sessions.time, 'time', return_value=now):
+            response = middleware.process_response(request, HttpResponse())
+        return settings.SESSION_COOKIE_NAME in response.cookies
+
+    def refreshed_at(self):
+        return SessionStore(self.key)[sessions.REFRESHED_AT_KEY]
+
+    def test_unmodified_session_not_saved_within_interval(self):
+        with self.assertNumQueries(1):  # Lecture de la session seulement
+            self.assertFalse(self.request(now=1000 + 299))
+        self.assertEqual(self.refreshed_at(), 1000)
+
+    def test_unmodified_session_saved_after_interval(self):
+        self.assertTrue(self.request(now=1000 + 300))
+        self.assertEqual(self.refreshed_at(), 1300)
+
+    def test_modified_session_always_saved(self):
+        self.assertTrue(self.request(now=1001, modify=True))
+        self.assertEqual(SessionStore(self.key)['panier'], 1)
+        self.assertEqual(self.refreshed_at(), 1001)
+
+
+@override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1)
+class EstimatedCountPaginatorTests(TestCase):
+
+    def setUp(self):
+        for i in range(5):
+            Patient.objects.create(first_name='Awa', last_name=f'Diop {i}', gender='F', phone_number=f'77000003{i}')
+
+    def paginate(self, estimate, number):
+        with mock.patch.object(admin_search, 'cached_row_estimate', return_value=estimate):
+            paginator = admin_search.EstimatedCountPaginator(Patient.objects.order_by('pk'), 2)
+            self.assertEqual(paginator.count, estimate)
+            return paginator, paginator.page(number)
+
+    def test_overestimated_last_page_falls_back_to_real_last_page(self):
+        paginator, page = self.paginate(50, 25)
+        self.assertEqual((page.number, len(page)), (3, 1))
+        self.assertEqual((paginator.count, paginator.num_pages), (5, 3))
+
+    def test_underestimated_count_serves_pages_beyond_estimate(self):
+        paginator, page = self.paginate(2, 3)
+        self.assertEqual((page.number, len(page)), (3, 1))
+        self.assertEqual(paginator.num_pages, 3)
+
+    def test_accurate_estimate_avoids_count(self):
+        with self.assertNumQueries(1):  # Lignes de la page seulement
+            paginator, page = self.paginate(5, 2)
+        self.assertEqual(len(page), 2)
+
+    def test_admin_changelist_with_stale_estimate(self):
+        from django.contrib.auth import get_user_model
+        from patients.admin import PatientAdmin
+
+        admin_user = get_user_model().objects.create_superuser(username='root', password='x', role='admin')
+        self.client.force_login(admin_user)
+        with mock.patch.object(admin_search, 'cached_row_estimate', return_value=50), \
+                mock.patch.object(PatientAdmin, 'list_per_page', 2):
+            response = self.client.get('/admin/patients/patient/', {'p': 25})
+        self.assertEqual(response.status_code, 200)
+        cl = response.context['cl']
+        self.assertEqual((cl.page_num, cl.result_count, len(cl.result_list)), (3, 5, 1))
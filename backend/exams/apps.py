@@ -3,4 +3,10 @@ from django.apps import AppConfig
 class ExamsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'exams'
-    verbose_name = 'Examens'
\ No newline at end of file
+    verbose_name = 'Examens'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from .catalog import expire_catalog
+        post_save.connect(expire_catalog, sender='exams.ExamType', dispatch_uid='exams.expire_catalog_save')
+        post_delete.connect(expire_catalog, sender='exams.ExamType', dispatch_uid='exams.expire_catalog_delete')
@@ -0,0 +1,110 @@
+"""
+Cache local (par processus) du catalogue des types d'examens.
+
+Le catalogue est petit et rarement modifié : il est chargé en une requête
+puis conservé en mémoire. Sa version est celle du tag de cache `exams`,
+incrémentée à chaque sauvegarde/suppression d'un `ExamType` (voir
+`core.signals`) ; chaque processus recharge son catalogue dès qu'il constate
+un changement de version.
+
+La version n'est relue dans le cache partagé qu'au plus une fois par
+CHECK_INTERVAL (une page de 100 lignes de facture ne fait donc qu'une
+lecture) ; une modification faite par un autre processus est vue au plus
+tard une seconde après, une modification locale immédiatement (`expire`).
+"""
+import hashlib
+import threading
+import time
+
+from django.db import transaction
+
+from core import cache as cache_layer
+
+CATALOG_TAG = 'exams'
+
+# Délai (secondes) entre deux lectures de la version dans le cache partagé
+CHECK_INTERVAL = 1.0
+
+
+def get_version():
+    return cache_layer.tag_version(CATALOG_TAG)
+
+
+class ExamCatalog:
+    """Catalogue des types d'examens indexé par ID"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = None
+        self._instances = {}
+        self._serialized = {}
+        self._ordered_ids = []
+
+    def expire(self):
+        """Force la relecture de la version au prochain accès (modification locale)"""
+        self._checked_at = None
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < CHECK_INTERVAL:
+            return
+        version = get_version()
+        self._checked_at = now
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            from .models import ExamType
+            from .serializers import ExamTypeSerializer
+
+            exam_types = list(ExamType.objects.order_by('name'))
+            self._instances = {exam_type.id: exam_type for exam_type in exam_types}
+            self._serialized = {
+                exam_type.id: ExamTypeSerializer(exam_type).data for exam_type in exam_types
+            }
+            self._ordered_ids = [exam_type.id for exam_type in exam_types]
+            self._version = version
+
+    @property
+    def version(self):
+        self._refresh()
+        return self._version
+
+    def get(self, pk):
+        """Retourne l'instance `ExamType` (lève `ExamType.DoesNotExist` si inconnue)"""
+        from .models import ExamType
+
+        self._refresh()
+        try:
+            return self._instances[int(pk)]
+        except (KeyError, TypeError, ValueError):
+            raise ExamType.DoesNotExist(f"Type d'examen {pk} introuvable")
+
+    def serialized(self, pk):
+        """Représentation API d'un type d'examen, ou None"""
+        if pk is None:
+            return None
+        self._refresh()
+        return self._serialized.get(pk)
+
+    def list(self, active_only=False):
+        """Liste sérialisée du catalogue, triée par nom"""
+        self._refresh()
+        entries = [self._serialized[pk] for pk in self._ordered_ids]
+        if active_only:
+            entries = [entry for entry in entries if entry['is_active']]
+        return entries
+
+    def etag(self, *parts):
+        """ETag faible dérivé de la version du catalogue et de la représentation demandée"""
+        raw = '|'.join(str(part) for part in (self.version, *parts))
+        return 'W/"exams-%s"' % hashlib.md5(raw.encode()).hexdigest()[:16]
+
+
+exam_catalog = ExamCatalog()
+
+
+def expire_catalog(sender, **kwargs):
+    transaction.on_commit(exam_catalog.expire)
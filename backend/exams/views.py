@@ -1,11 +1,14 @@
-from rest_framework import viewsets, filters
+from rest_framework import viewsets, filters, status
 from rest_framework.permissions import IsAuthenticated, BasePermission, DjangoModelPermissions
 from django.contrib.auth import get_user_model
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django.utils.http import parse_etags
 from .models import ExamType
+from .catalog import exam_catalog
 from .serializers import ExamTypeSerializer
+from core.conditional import ConditionalGetMixin
 from core.pagination import StandardResultsSetPagination
 from core.filters import ExamTypeFilter
 
@@ -29,7 +32,7 @@ class IsExamPermission(BasePermission):
         return False
 
 
-class ExamTypeViewSet(viewsets.ModelViewSet):
+class ExamTypeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = ExamType.objects.all()
     serializer_class = ExamTypeSerializer
     permission_classes = [IsAuthenticated]
@@ -53,6 +56,36 @@ class ExamTypeViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'price', 'created_at', 'duration_minutes']
     ordering = ['name']
     
+    # Paramètres compatibles avec une lecture directe du catalogue en mémoire
+    CATALOG_QUERY_PARAMS = {'page', 'page_size', 'format'}
+    
+    def _can_use_catalog(self, request):
+        return set(request.query_params) <= self.CATALOG_QUERY_PARAMS
+    
+    def _catalog_response(self, request, active_only=False):
+        """Sert le catalogue depuis le cache avec support de If-None-Match"""
+        etag = exam_catalog.etag(
+            'active' if active_only else 'all',
+            request.query_params.get('page', 1),
+            request.query_params.get('page_size', ''),
+        )
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        
+        entries = exam_catalog.list(active_only=active_only)
+        page = self.paginate_queryset(entries)
+        if page is not None:
+            response = self.get_paginated_response(page)
+        else:
+            response = Response(entries)
+        response['ETag'] = etag
+        return response
+    
+    def list(self, request, *args, **kwargs):
+        if self._can_use_catalog(request):
+            return self._catalog_response(request)
+        return super().list(request, *args, **kwargs)
+    
     @action(detail=False, methods=['get'])
     def search_by_price_range(self, request):
         """Recherche par plage de prix"""
@@ -76,6 +109,9 @@ class ExamTypeViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def active_only(self, request):
         """Retourne seulement les examens actifs"""
+        if self._can_use_catalog(request):
+            return self._catalog_response(request, active_only=True)
+        
         queryset = self.get_queryset().filter(is_active=True)
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -1,18 +1,38 @@
 from django.contrib import admin
 from .models import Invoice, InvoiceItem
+from core.admin_search import AdvancedSearchMixin, EstimatedCountAdmin, ExportActionsMixin
 
 class InvoiceItemInline(admin.TabularInline):
     model = InvoiceItem
     extra = 1
 
 @admin.register(Invoice)
-class InvoiceAdmin(admin.ModelAdmin):
+class InvoiceAdmin(AdvancedSearchMixin, ExportActionsMixin, EstimatedCountAdmin, admin.ModelAdmin):
     list_display = ['invoice_number', 'patient', 'status', 'total_amount', 'created_at']
     list_filter = ['status', 'created_at']
     search_fields = ['invoice_number', 'patient__first_name', 'patient__last_name']
+    list_select_related = ['patient']
     readonly_fields = ['invoice_number', 'total_amount', 'created_at', 'updated_at']
     inlines = [InvoiceItemInline]
     ordering = ['-created_at']
+    search_operators = {
+        'numero': 'invoice_number',
+        'statut': 'status',
+        'date': 'invoice_date',
+        'montant': 'total_amount',
+        'cree': 'created_at',
+    }
+    search_default_date = 'invoice_date'
+    search_default_amount = 'total_amount'
+    export_fields = [
+        ('Numéro', 'invoice_number'),
+        ('Date', 'invoice_date'),
+        ('Patient', 'patient__last_name'),
+        ('Prénom', 'patient__first_name'),
+        ('Statut', 'status'),
+        ('Total', 'total_amount'),
+        ('Créée le', 'created_at'),
+    ]
 
 @admin.register(InvoiceItem)
 class InvoiceItemAdmin(admin.ModelAdmin):
@@ -1,11 +1,11 @@
 from rest_framework import serializers
 from .models import Invoice, InvoiceItem
 from patients.serializers import PatientSerializer
-from exams.serializers import ExamTypeSerializer
 from exams.models import ExamType
+from exams.catalog import exam_catalog
 
 class InvoiceItemSerializer(serializers.ModelSerializer):
-    exam_type_details = ExamTypeSerializer(source='exam_type', read_only=True)
+    exam_type_details = serializers.SerializerMethodField()
     exam_type = serializers.PrimaryKeyRelatedField(queryset=ExamType.objects.all(), required=False, allow_null=True)
     
     class Meta:
@@ -15,6 +15,10 @@ class InvoiceItemSerializer(serializers.ModelSerializer):
             'quantity', 'unit_price', 'total_price'
         ]
         read_only_fields = ['total_price']
+    
+    def get_exam_type_details(self, obj):
+        # Lu depuis le catalogue en mémoire plutôt qu'une requête par ligne
+        return exam_catalog.serialized(obj.exam_type_id)
 
 class InvoiceSerializer(serializers.ModelSerializer):
     items = InvoiceItemSerializer(many=True, read_only=True)
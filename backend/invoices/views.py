@@ -11,6 +11,10 @@ from .serializers import InvoiceSerializer, InvoiceItemSerializer
 from .utils import generate_pdf_invoice
 from patients.models import PatientAccess
 from exams.models import ExamType
+from exams.catalog import exam_catalog
+from core.conditional import ConditionalGetMixin
+from core.db_router import ReplicaReadMixin
+from core.export import ExportMixin
 from core.pagination import StandardResultsSetPagination
 from core.filters import InvoiceFilter
 
@@ -42,9 +46,13 @@ class IsInvoicePermission(BasePermission):
         return False
 
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(ReplicaReadMixin, ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Invoice.objects.select_related('patient', 'created_by').prefetch_related('items', 'payments').all()
     serializer_class = InvoiceSerializer
+    # Lignes et paiements mettent à jour updated_at de la facture (core.conditional)
+    conditional_fields = ('updated_at', 'patient__updated_at')
+    # `exam_type_details` des lignes vient du catalogue des examens (exams.catalog)
+    conditional_tags = ('exams',)
     permission_classes = [IsAuthenticated, IsInvoicePermission]
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -52,6 +60,25 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     search_fields = ['invoice_number', 'patient__first_name', 'patient__last_name', 'patient__phone_number']
     ordering_fields = ['created_at', 'invoice_date', 'total_amount', 'due_date']
     ordering = ['-created_at']
+    # Listes et export lus sur la réplique (core.db_router)
+    replica_actions = ('list', 'unpaid', 'search_by_amount', 'search_by_date_range')
+    # Export ?format=csv / ?format=xlsx (core.export)
+    export_filename = 'factures'
+    export_columns = [
+        ('Numéro', 'invoice_number'),
+        ('Date', 'invoice_date'),
+        ('Échéance', 'due_date'),
+        ('ID Patient', 'patient__patient_id'),
+        ('Prénom', 'patient__first_name'),
+        ('Nom', 'patient__last_name'),
+        ('Téléphone', 'patient__phone_number'),
+        ('Statut', 'status'),
+        ('Sous-total', 'subtotal'),
+        ('TVA', 'tax_amount'),
+        ('Total', 'total_amount'),
+        ('Créée par', 'created_by__username'),
+        ('Créée le', 'created_at'),
+    ]
     
     @action(detail=False, methods=['get'])
     def search_by_amount(self, request):
@@ -119,7 +146,7 @@ class InvoiceViewSet(viewsets.ModelViewSet):
                         # Si exam_type est fourni, l'utiliser
                         exam_type = None
                         if item_data.get('exam_type'):
-                            exam_type = ExamType.objects.get(id=item_data['exam_type'])
+                            exam_type = exam_catalog.get(item_data['exam_type'])
                             if not description:
                                 description = exam_type.name
                         
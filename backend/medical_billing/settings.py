@@ -40,13 +40,15 @@ AUTH_USER_MODEL = "authentication.User"
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.query_log.SlowQueryMiddleware',  # Capture des requêtes SQL lentes (manage.py advise_indexes)
+    'core.sessions.SlidingSessionMiddleware',  # Sessions : prolongation regroupée (SESSION_REFRESH_INTERVAL)
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'core.middleware.RoleBasedAccessMiddleware',  # Middleware de contrôle d'accès basé sur les rôles
+    'core.db_router.ReplicaPinMiddleware',  # Lectures sur default juste après une écriture (réplique)
 ]
 
 ROOT_URLCONF = 'medical_billing.urls'
@@ -68,6 +70,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'medical_billing.wsgi.application'
+# Portail patient (vues asynchrones) servi en ASGI : voir deployment/supervisor-cimef.conf
+ASGI_APPLICATION = 'medical_billing.asgi.application'
 
 # Database
 DATABASES = {
@@ -88,6 +92,61 @@ if 'ondigitalocean.com' in DATABASES['default']['HOST']:
         'ssl': {'mode': 'REQUIRED'}
     }
 
+# Réplique en lecture (facultative) : tableaux de bord, statistiques et listes (core.db_router)
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+DB_REPLICA_ALIAS = 'replica'
+if DB_REPLICA_HOST:
+    DATABASES[DB_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': config('DB_REPLICA_PORT', default='') or DATABASES['default']['PORT'],
+        'USER': config('DB_REPLICA_USERNAME', default='') or DATABASES['default']['USER'],
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default='') or DATABASES['default']['PASSWORD'],
+        # Tests : mêmes données que default
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Retard de réplication toléré, fréquence de sa vérification et durée de lecture sur default après une écriture (secondes)
+DB_REPLICA_MAX_LAG = config('DB_REPLICA_MAX_LAG', default=5, cast=int)
+DB_REPLICA_CHECK_INTERVAL = config('DB_REPLICA_CHECK_INTERVAL', default=5, cast=int)
+DB_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=10, cast=int)
+
+
+# Cache partagé entre les workers Gunicorn
+# Redis si REDIS_URL est défini, sinon cache fichier local (partagé entre processus)
+REDIS_URL = config('REDIS_URL', default='')
+CACHE_DEFAULT_TIMEOUT = config('CACHE_DEFAULT_TIMEOUT', default=300, cast=int)
+
+# Admin : statistiques des listes en cache (secondes) et total estimé au-delà de N lignes (listes non filtrées)
+ADMIN_STATS_CACHE_TIMEOUT = config('ADMIN_STATS_CACHE_TIMEOUT', default=300, cast=int)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=100000, cast=int)
+
+# Capture des requêtes SQL plus lentes que N ms, analysées par `manage.py advise_indexes`
+SLOW_QUERY_CAPTURE = config('SLOW_QUERY_CAPTURE', default=True, cast=bool)
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=200, cast=int)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'cimef',
+            'TIMEOUT': CACHE_DEFAULT_TIMEOUT,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_DIR', default=os.path.join(BASE_DIR, 'cache')),
+            'KEY_PREFIX': 'cimef',
+            'TIMEOUT': CACHE_DEFAULT_TIMEOUT,
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000,
+            },
+        }
+    }
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -121,6 +180,30 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Patient Portal Configuration
 PATIENT_PORTAL_URL = config('PATIENT_PORTAL_URL', default='http://localhost:5173/patient')
+PATIENT_PORTAL_SESSION_AGE = config('PATIENT_PORTAL_SESSION_AGE', default=1800, cast=int)  # 30 minutes
+
+# Liens de téléchargement signés des comptes rendus
+REPORT_DOWNLOAD_URL_TTL = config('REPORT_DOWNLOAD_URL_TTL', default=900, cast=int)  # 15 minutes
+# Préfixe de la location nginx `internal` servant MEDIA_ROOT (vide = fichier servi par Django)
+REPORTS_X_ACCEL_REDIRECT = config('REPORTS_X_ACCEL_REDIRECT', default='')
+
+# Upload des comptes rendus en plusieurs morceaux (reports.uploads)
+REPORT_UPLOAD_CHUNK_SIZE = config('REPORT_UPLOAD_CHUNK_SIZE', default=5 * 1024 * 1024, cast=int)  # 5 Mo
+REPORT_UPLOAD_MAX_SIZE = config('REPORT_UPLOAD_MAX_SIZE', default=2 * 1024 * 1024 * 1024, cast=int)  # 2 Go
+REPORT_UPLOAD_TEMP_DIR = config('REPORT_UPLOAD_TEMP_DIR', default='')  # vide = MEDIA_ROOT/uploads/partial
+
+# Ingestion DICOM (reports.ingestion) : processus de `ingest_reports` pour les aperçus ;
+# 0 = pas d'aperçu à l'upload (tâche reports.render_preview), commande ingest_reports uniquement
+REPORT_PREVIEW_WORKERS = config('REPORT_PREVIEW_WORKERS', default=2, cast=int)
+REPORT_PREVIEW_FORMAT = config('REPORT_PREVIEW_FORMAT', default='png')  # png ou jpeg
+
+# Compression des comptes rendus non téléchargés (commande compress_cold_reports) ; zstd nécessite `zstandard`
+REPORT_COLD_AFTER_DAYS = config('REPORT_COLD_AFTER_DAYS', default=180, cast=int)
+REPORT_COLD_CODEC = config('REPORT_COLD_CODEC', default='gzip')  # gzip ou zstd
+
+# Import groupé (archive ZIP ou commande import_reports) : nombre de fichiers et taille décompressée maximum
+REPORT_BULK_MAX_FILES = config('REPORT_BULK_MAX_FILES', default=500, cast=int)
+REPORT_BULK_MAX_SIZE = config('REPORT_BULK_MAX_SIZE', default=2 * 1024 * 1024 * 1024, cast=int)  # 2 Go
 
 # Tax Configuration (TVA)
 DEFAULT_TAX_RATE = config('DEFAULT_TAX_RATE', default=18.00, cast=float)  # TVA 18% au Sénégal
@@ -150,18 +233,50 @@ LOGIN_REDIRECT_URL = '/admin/'
 LOGOUT_REDIRECT_URL = '/admin/login/'
 
 # Configuration des sessions
-SESSION_COOKIE_AGE = 86400  # 24 heures en secondes
-SESSION_SAVE_EVERY_REQUEST = True
+# Stockage : db, cache (partagé, Redis recommandé), cached_db ou signed_cookies
+SESSION_MODE = config('SESSION_MODE', default='') or ('cache' if REDIS_URL else 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+SESSION_COOKIE_AGE = 86400  # 24 heures en secondes, glissantes
+# Expiration prolongée au plus une fois par intervalle (secondes) au lieu d'une écriture par requête
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_INTERVAL = config('SESSION_REFRESH_INTERVAL', default=300, cast=int)
+
+# Notifications de connexion : écriture groupée toutes les N secondes ou par lots de N (0 = immédiate).
+# Tampon en mémoire : un worker tué brutalement perd au plus les N dernières secondes
+LOGIN_NOTIFICATION_FLUSH_INTERVAL = config('LOGIN_NOTIFICATION_FLUSH_INTERVAL', default=2, cast=int)
+LOGIN_NOTIFICATION_BATCH_SIZE = config('LOGIN_NOTIFICATION_BATCH_SIZE', default=100, cast=int)
+
+# Tâches d'arrière-plan (core.jobs, `manage.py run_jobs`) : sans worker (JOBS_EAGER),
+# exécutées après la validation de la transaction ; verrou rafraîchi toutes les N/3 secondes
+# pendant l'exécution, considéré abandonné après N secondes sans rafraîchissement
+JOBS_EAGER = config('JOBS_EAGER', default=DEBUG, cast=bool)
+JOBS_CONCURRENCY = config('JOBS_CONCURRENCY', default=2, cast=int)
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', default=600, cast=int)
 
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.RoleClaimsJWTAuthentication',  # Rôle lu dans le jeton, sans requête
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # JSON encodé / décodé par orjson (repli sur le module json sans orjson)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
@@ -183,6 +298,7 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
     'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.CustomTokenRefreshSerializer',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     'JTI_CLAIM': 'jti',
@@ -263,6 +379,7 @@ CORS_ALLOW_HEADERS = [
     'x-csrftoken',
     'x-requested-with',
     'x-xsrf-token',
+    'upload-offset',
 ]
 
 # CSRF settings
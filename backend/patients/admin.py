@@ -1,14 +1,23 @@
 from django.contrib import admin
 from .models import Patient, PatientAccess
-from core.admin_search import AdvancedSearchMixin, BulkActionsMixin, SearchStatsAdmin
+from core.admin_search import AdvancedSearchMixin, BulkActionsMixin, EstimatedCountAdmin, SearchStatsAdmin
 
 @admin.register(Patient)
-class PatientAdmin(AdvancedSearchMixin, BulkActionsMixin, SearchStatsAdmin, admin.ModelAdmin):
+class PatientAdmin(AdvancedSearchMixin, BulkActionsMixin, SearchStatsAdmin, EstimatedCountAdmin, admin.ModelAdmin):
     list_display = ['full_name', 'phone_number', 'gender', 'age', 'created_at']
     list_filter = ['gender', 'created_at']
     search_fields = ['first_name', 'last_name', 'phone_number', 'email', 'address']
     readonly_fields = ['created_at', 'updated_at']
     ordering = ['-created_at']
+    search_operators = {
+        'id': 'patient_id',
+        'prenom': 'first_name',
+        'tel': 'phone_number',
+        'email': 'email',
+        'age': 'age',
+        'cree': 'created_at',
+    }
+    search_default_date = 'created_at'
 
 
 @admin.register(PatientAccess)
@@ -18,6 +27,14 @@ class PatientAccessAdmin(AdvancedSearchMixin, BulkActionsMixin, SearchStatsAdmin
     search_fields = ['patient__first_name', 'patient__last_name', 'access_key', 'patient__phone_number']
     readonly_fields = ['access_key', 'password', 'access_count', 'last_accessed', 'created_at']
     ordering = ['-created_at']
+    search_operators = {
+        'cle': 'access_key',
+        'actif': 'is_active',
+        'acces': 'access_count',
+        'dernier': 'last_accessed',
+        'cree': 'created_at',
+    }
+    search_default_date = 'created_at'
     
     fieldsets = (
         ('Informations Patient', {
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0009_alter_patient_phone_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientaccess',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
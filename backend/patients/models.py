@@ -5,6 +5,11 @@ import secrets
 import string
 from datetime import datetime, timedelta
 from django.utils import timezone
+from core.identifiers import IdentifierGenerator
+
+patient_id_generator = IdentifierGenerator('patients.Patient', 'patient_id', length=6)
+access_key_generator = IdentifierGenerator('patients.PatientAccess', 'access_key', length=12)
+
 
 class Patient(models.Model):
     GENDER_CHOICES = [
@@ -53,19 +58,14 @@ class Patient(models.Model):
     @staticmethod
     def generate_patient_id():
         """Génère un ID patient alphanumérique unique de 6 caractères"""
-        while True:
-            # Génère 6 caractères alphanumériques (lettres majuscules + chiffres)
-            chars = string.ascii_uppercase + string.digits
-            patient_id = ''.join(secrets.choice(chars) for _ in range(6))
-            
-            # Vérifie que l'ID n'existe pas déjà
-            if not Patient.objects.filter(patient_id=patient_id).exists():
-                return patient_id
+        return patient_id_generator.generate()
     
     def save(self, *args, **kwargs):
         """Génère automatiquement un patient_id si non défini"""
         if not self.patient_id:
-            self.patient_id = Patient.generate_patient_id()
+            # Nouvel identifiant tiré si un autre processus l'a inséré entre-temps
+            patient_id_generator.save_new(self, lambda: super(Patient, self).save(*args, **kwargs))
+            return
         super().save(*args, **kwargs)
 
 
@@ -84,6 +84,7 @@ class PatientAccess(models.Model):
     # Métadonnées
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name="Créé par")
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     # Notifications
     sent_via_sms = models.BooleanField(default=False, verbose_name="Envoyé par SMS")
@@ -105,19 +106,18 @@ class PatientAccess(models.Model):
         return f"Accès {self.access_key} - {self.patient.full_name}"
     
     def save(self, *args, **kwargs):
-        if not self.access_key:
-            self.access_key = self.generate_access_key()
         if not self.password:
             self.password = self.generate_password()
+        if not self.access_key:
+            # Nouvelle clé tirée si un autre processus l'a insérée entre-temps
+            access_key_generator.save_new(self, lambda: super(PatientAccess, self).save(*args, **kwargs))
+            return
         super().save(*args, **kwargs)
     
     @staticmethod
     def generate_access_key():
         """Génère une clé d'accès unique de 12 caractères"""
-        while True:
-            key = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(12))
-            if not PatientAccess.objects.filter(access_key=key).exists():
-                return key
+        return access_key_generator.generate()
     
     @staticmethod
     def generate_password():
@@ -133,6 +133,6 @@ class PatientAccess(models.Model):
         """Enregistre un accès"""
         self.access_count += 1
         self.last_accessed = timezone.now()
-        self.save(update_fields=['access_count', 'last_accessed'])
+        self.save(update_fields=['access_count', 'last_accessed', 'updated_at'])
 
 
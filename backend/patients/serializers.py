@@ -1,4 +1,7 @@
+from django.db.models import CharField, Value
+from django.db.models.functions import Concat
 from rest_framework import serializers
+from core.serializers import ValuesListSerializer
 from .models import Patient, PatientAccess
 
 class PatientSerializer(serializers.ModelSerializer):
@@ -12,6 +15,11 @@ class PatientSerializer(serializers.ModelSerializer):
             'address', 'email', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
+        # Liste des patients servie par values() (core.serializers)
+        list_serializer_class = ValuesListSerializer
+        values_expressions = {
+            'full_name': Concat('first_name', Value(' '), 'last_name', output_field=CharField()),
+        }
 
 
 class PatientAccessSerializer(serializers.ModelSerializer):
@@ -0,0 +1,50 @@
+"""Tâches d'arrière-plan des accès patients (voir core.jobs)"""
+from django.conf import settings
+from django.core.mail import send_mail
+
+from core.jobs import task
+
+from .models import PatientAccess
+
+
+@task('patients.send_access_credentials', priority=10)
+def send_access_credentials(access_id):
+    """Envoie les identifiants d'accès au patient ; relancé si l'envoi échoue"""
+    patient_access = PatientAccess.objects.select_related('patient').filter(pk=access_id).first()
+    if patient_access is None:
+        return
+    patient = patient_access.patient
+
+    # Message pour SMS/Email
+    message = f"""
+Bonjour {patient.full_name},
+
+Vos résultats d'examen sont disponibles.
+
+Accédez à vos résultats sur : {settings.PATIENT_PORTAL_URL}
+
+Clé d'accès : {patient_access.access_key}
+Mot de passe : {patient_access.password}
+
+⚠️ IMPORTANT : Ces identifiants sont permanents et réutilisables.
+Conservez-les précieusement pour vos futurs accès.
+
+CIMEF - Rufisque
+    """
+
+    # Envoi par email si disponible
+    if patient.email:
+        send_mail(
+            subject='Vos résultats d\'examen - CIMEF',
+            message=message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[patient.email],
+            fail_silently=False,
+        )
+        patient_access.sent_via_email = True
+        patient_access.save(update_fields=['sent_via_email', 'updated_at'])
+
+    # TODO: Intégration SMS (Twilio, etc.)
+    # if patient.phone_number:
+    #     send_sms(patient.phone_number, message)
+    #     patient_access.sent_via_sms = True
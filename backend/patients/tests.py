@@ -0,0 +1,95 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from invoices.models import Invoice
+from payments.models import Payment
+from reports.models import PatientReport
+
+from .models import Patient, PatientAccess
+
+
+class PatientTimelineTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='accueil', password='x', role='admin')
+        self.patient = Patient.objects.create(first_name='Awa', last_name='Diop', gender='F', phone_number='770000020')
+        self.access = PatientAccess.objects.create(patient=self.patient, created_by=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/patients/{self.patient.pk}/timeline/'
+        self.now = timezone.now().replace(microsecond=0)
+
+    def at(self, hours):
+        return self.now - datetime.timedelta(hours=hours)
+
+    def invoice(self, hours):
+        number = f'FAC-{Invoice.objects.count() + 1:06d}'
+        invoice = Invoice.objects.bulk_create([Invoice(
+            invoice_number=number, patient=self.patient, created_by=self.user,
+            invoice_date=self.now.date(), due_date=self.now.date(),
+        )])[0]
+        Invoice.objects.filter(pk=invoice.pk).update(created_at=self.at(hours))
+        return ('invoice', invoice.pk)
+
+    def payment(self, hours, invoice_id):
+        payment = Payment.objects.bulk_create([Payment(
+            invoice_id=invoice_id, amount=1000, payment_method='cash', payment_date=self.at(hours),
+            recorded_by=self.user, receipt_number=f'REC-{Payment.objects.count() + 1}',
+        )])[0]
+        return ('payment', payment.pk)
+
+    def report(self, hours):
+        report = PatientReport(patient_access=self.access, original_filename='cr.pdf')
+        report.report_file.name = 'reports/cr.pdf'
+        report.save()
+        PatientReport.objects.filter(pk=report.pk).update(created_at=self.at(hours))
+        return ('report', report.pk)
+
+    def get(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def entries(self, page):
+        return [(entry['type'], entry['id']) for entry in page['results']]
+
+    def test_sources_merged_newest_first(self):
+        old_invoice = self.invoice(3)
+        invoice = self.invoice(2)
+        payment = self.payment(2, invoice[1])
+        report = self.report(1)
+        same_time_report = self.report(2)
+
+        # Même horodatage : facture, puis paiement, puis compte rendu
+        self.assertEqual(
+            self.entries(self.get()),
+            [report, invoice, payment, same_time_report, old_invoice],
+        )
+
+    def test_cursor_pages_cover_timeline_once(self):
+        invoice = self.invoice(4)
+        expected = [
+            self.report(1), self.report(1), self.payment(2, invoice[1]), self.report(3), invoice,
+        ]
+        # Même horodatage et même source : identifiant décroissant
+        expected[0], expected[1] = expected[1], expected[0]
+
+        seen, cursor = [], None
+        while True:
+            page = self.get(limit=2, **({'cursor': cursor} if cursor else {}))
+            self.assertLessEqual(len(page['results']), 2)
+            seen += self.entries(page)
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor_rejected(self):
+        # Base64 invalide, puis « 2026|facture|1 » (date et type d'événement inconnus)
+        for cursor in ('pas-un-curseur', 'MjAyNnxmYWN0dXJlfDE='):
+            response = self.client.get(self.url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400)
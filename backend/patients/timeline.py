@@ -0,0 +1,161 @@
+"""
+Historique chronologique d'un patient (factures, paiements, comptes rendus).
+
+Chaque source est lue avec une requête bornée par le curseur, puis les flux
+déjà triés sont fusionnés avec `heapq.merge`. Le nombre de requêtes reste
+constant quel que soit le volume d'historique du patient.
+"""
+import base64
+import heapq
+from itertools import islice
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# Rang utilisé pour départager les événements ayant le même horodatage
+KIND_RANKS = {'invoice': 2, 'payment': 1, 'report': 0}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(entry):
+    raw = f"{entry['timestamp'].isoformat()}|{entry['type']}|{entry['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(value):
+    """Retourne (horodatage, rang, id) à partir d'un curseur opaque"""
+    try:
+        raw = base64.urlsafe_b64decode(value.encode()).decode()
+        timestamp, kind, pk = raw.split('|')
+        parsed = parse_datetime(timestamp)
+        if parsed is None or kind not in KIND_RANKS:
+            raise ValueError
+        return parsed, KIND_RANKS[kind], int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Curseur invalide")
+
+
+def _before_cursor(kind, field, cursor):
+    """Filtre ne gardant que les événements strictement après le curseur (ordre décroissant)"""
+    if cursor is None:
+        return Q()
+    timestamp, rank, pk = cursor
+    if KIND_RANKS[kind] < rank:
+        return Q(**{f'{field}__lte': timestamp})
+    if KIND_RANKS[kind] == rank:
+        return Q(**{f'{field}__lt': timestamp}) | Q(**{field: timestamp, 'id__lt': pk})
+    return Q(**{f'{field}__lt': timestamp})
+
+
+def _sort_key(entry):
+    return entry['timestamp'], KIND_RANKS[entry['type']], entry['id']
+
+
+def _invoices(patient, cursor, limit):
+    from invoices.models import Invoice, InvoiceItem
+
+    invoices = list(
+        Invoice.objects.filter(patient=patient)
+        .filter(_before_cursor('invoice', 'created_at', cursor))
+        .order_by('-created_at', '-id')
+        .values('id', 'created_at', 'invoice_number', 'invoice_date', 'due_date',
+                'status', 'subtotal', 'tax_amount', 'total_amount')[:limit]
+    )
+    items_by_invoice = {invoice['id']: [] for invoice in invoices}
+    if invoices:
+        items = InvoiceItem.objects.filter(invoice_id__in=items_by_invoice).order_by('id').values(
+            'id', 'invoice_id', 'exam_type_id', 'exam_type__name', 'description',
+            'quantity', 'unit_price', 'total_price'
+        )
+        for item in items:
+            items_by_invoice[item['invoice_id']].append({
+                'id': item['id'],
+                'exam_type': item['exam_type_id'],
+                'description': item['description'] or item['exam_type__name'] or '',
+                'quantity': item['quantity'],
+                'unit_price': item['unit_price'],
+                'total_price': item['total_price'],
+            })
+
+    for invoice in invoices:
+        yield {
+            'type': 'invoice',
+            'id': invoice['id'],
+            'timestamp': invoice['created_at'],
+            'invoice_number': invoice['invoice_number'],
+            'invoice_date': invoice['invoice_date'],
+            'due_date': invoice['due_date'],
+            'status': invoice['status'],
+            'subtotal': invoice['subtotal'],
+            'tax_amount': invoice['tax_amount'],
+            'total_amount': invoice['total_amount'],
+            'items': items_by_invoice[invoice['id']],
+        }
+
+
+def _payments(patient, cursor, limit):
+    from payments.models import Payment
+
+    payments = (
+        Payment.objects.filter(invoice__patient=patient)
+        .filter(_before_cursor('payment', 'payment_date', cursor))
+        .order_by('-payment_date', '-id')
+        .values('id', 'payment_date', 'invoice_id', 'invoice__invoice_number', 'amount',
+                'discount', 'payment_method', 'status', 'receipt_number')[:limit]
+    )
+    for payment in payments:
+        yield {
+            'type': 'payment',
+            'id': payment['id'],
+            'timestamp': payment['payment_date'],
+            'invoice': payment['invoice_id'],
+            'invoice_number': payment['invoice__invoice_number'],
+            'amount': payment['amount'],
+            'discount': payment['discount'],
+            'payment_method': payment['payment_method'],
+            'status': payment['status'],
+            'receipt_number': payment['receipt_number'],
+        }
+
+
+def _reports(patient, cursor, limit):
+    from reports.models import PatientReport
+
+    reports = (
+        PatientReport.objects.filter(patient_access__patient=patient)
+        .filter(_before_cursor('report', 'created_at', cursor))
+        .order_by('-created_at', '-id')
+        .values('id', 'created_at', 'report_file', 'original_filename', 'is_active', 'download_count')[:limit]
+    )
+    for report in reports:
+        yield {
+            'type': 'report',
+            'id': report['id'],
+            'timestamp': report['created_at'],
+            'filename': report['original_filename'] or (report['report_file'].split('/')[-1] if report['report_file'] else None),
+            'is_active': report['is_active'],
+            'download_count': report['download_count'],
+        }
+
+
+def build_timeline(patient, cursor=None, limit=20):
+    """
+    Retourne (événements, curseur_suivant) pour une page de l'historique.
+
+    Chaque source est limitée à `limit + 1` lignes : c'est suffisant pour
+    remplir la page et savoir s'il reste des événements après elle.
+    """
+    decoded = decode_cursor(cursor) if cursor else None
+    streams = [
+        _invoices(patient, decoded, limit + 1),
+        _payments(patient, decoded, limit + 1),
+        _reports(patient, decoded, limit + 1),
+    ]
+    merged = list(islice(heapq.merge(*streams, key=_sort_key, reverse=True), limit + 1))
+
+    entries = merged[:limit]
+    next_cursor = encode_cursor(entries[-1]) if len(merged) > limit else None
+    return entries, next_cursor
@@ -1,17 +1,16 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import PatientViewSet, PatientAccessViewSet
-from .views_patient_portal import (
-    PatientPortalViewSet, 
-    PatientAccessManagementViewSet
-)
+from .views_patient_portal import patient_portal_login, patient_portal_session
 
 # Router principal pour les patients
 router = DefaultRouter()
 router.register(r'', PatientViewSet, basename='patients')
 router.register(r'access', PatientAccessViewSet, basename='patient-access')
-router.register(r'portal', PatientPortalViewSet, basename='patient-portal')
 
 urlpatterns = [
+    # Portail patient (vues asynchrones)
+    path('portal/login/', patient_portal_login, name='patient-portal-login'),
+    path('portal/session/', patient_portal_session, name='patient-portal-session'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -34,10 +34,15 @@ class IsSecretaryOrAccountant(BasePermission):
         return False
 from .models import Patient, PatientAccess
 from .serializers import PatientSerializer, PatientAccessSerializer
+from core.conditional import ConditionalGetMixin
+from core.db_router import ReplicaReadMixin
+from core.export import ExportMixin
+from core.serializers import ValuesListMixin
 from core.pagination import StandardResultsSetPagination
 from core.filters import PatientFilter, PatientAccessFilter
+from .timeline import build_timeline, InvalidCursor
 
-class PatientViewSet(viewsets.ModelViewSet):
+class PatientViewSet(ReplicaReadMixin, ConditionalGetMixin, ExportMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Patient.objects.all()
     serializer_class = PatientSerializer
     permission_classes = [IsAuthenticated, IsSecretaryOrAccountant]
@@ -53,6 +58,19 @@ class PatientViewSet(viewsets.ModelViewSet):
     search_fields = ['first_name', 'last_name', 'phone_number', 'email']
     ordering_fields = ['created_at', 'last_name', 'first_name', 'date_of_birth']
     ordering = ['-created_at']
+    # Export ?format=csv / ?format=xlsx (core.export)
+    export_filename = 'patients'
+    export_columns = [
+        ('ID Patient', 'patient_id'),
+        ('Prénom', 'first_name'),
+        ('Nom', 'last_name'),
+        ('Âge', 'age'),
+        ('Sexe', 'gender'),
+        ('Téléphone', 'phone_number'),
+        ('Email', 'email'),
+        ('Adresse', 'address'),
+        ('Créé le', 'created_at'),
+    ]
     
     @action(detail=False, methods=['get'])
     def search_advanced(self, request):
@@ -64,6 +82,40 @@ class PatientViewSet(viewsets.ModelViewSet):
             return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def timeline(self, request, pk=None):
+        """Historique fusionné (factures, paiements, comptes rendus) paginé par curseur"""
+        patient = self.get_object()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            limit = 20
+        
+        try:
+            entries, next_cursor = build_timeline(
+                patient,
+                cursor=request.query_params.get('cursor'),
+                limit=limit,
+            )
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        next_url = None
+        if next_cursor:
+            next_url = request.build_absolute_uri(
+                f"{request.path}?cursor={next_cursor}&limit={limit}"
+            )
+        return Response({
+            'patient': {
+                'id': patient.id,
+                'patient_id': patient.patient_id,
+                'full_name': patient.full_name,
+            },
+            'next_cursor': next_cursor,
+            'next': next_url,
+            'results': entries,
+        })
         
     def destroy(self, request, *args, **kwargs):
         """
@@ -77,9 +129,10 @@ class PatientViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class PatientAccessViewSet(viewsets.ModelViewSet):
+class PatientAccessViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = PatientAccess.objects.select_related('patient', 'created_by').all()
     serializer_class = PatientAccessSerializer
+    conditional_fields = ('updated_at', 'patient__updated_at')
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
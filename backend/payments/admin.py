@@ -3,10 +3,11 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.http import HttpResponse
 from .models import Payment
+from core.admin_search import AdvancedSearchMixin, EstimatedCountAdmin, ExportActionsMixin
 from .utils import generate_payment_receipt_pdf
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(AdvancedSearchMixin, ExportActionsMixin, EstimatedCountAdmin, admin.ModelAdmin):
     list_display = [
         'receipt_number', 'invoice_link', 'patient_name', 'amount_display', 
         'payment_method', 'payment_date', 'status_display', 'recorded_by'
@@ -18,6 +19,26 @@ class PaymentAdmin(admin.ModelAdmin):
     ]
     readonly_fields = ['receipt_number', 'created_at', 'updated_at', 'remaining_amount', 'is_partial_payment']
     date_hierarchy = 'payment_date'
+    search_operators = {
+        'recu': 'receipt_number',
+        'ref': ('reference_number', 'transaction_id', 'receipt_number'),
+        'mode': 'payment_method',
+        'statut': 'status',
+        'date': 'payment_date',
+        'montant': 'amount',
+    }
+    search_default_date = 'payment_date'
+    search_default_amount = 'amount'
+    list_select_related = ['invoice__patient', 'recorded_by']
+    export_fields = [
+        ('Reçu', 'receipt_number'),
+        ('Date', 'payment_date'),
+        ('Facture', 'invoice__invoice_number'),
+        ('Patient', 'invoice__patient__last_name'),
+        ('Montant', 'amount'),
+        ('Mode de paiement', 'payment_method'),
+        ('Statut', 'status'),
+    ]
     
     fieldsets = (
         ('Informations principales', {
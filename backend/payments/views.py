@@ -9,6 +9,9 @@ from datetime import datetime, timedelta
 from django.http import HttpResponse
 from .models import Payment
 from .serializers import PaymentSerializer, PaymentSummarySerializer
+from core.conditional import ConditionalGetMixin
+from core.db_router import ReplicaReadMixin
+from core.export import ExportMixin
 from core.pagination import StandardResultsSetPagination
 from core.filters import PaymentFilter
 
@@ -40,9 +43,11 @@ class IsPaymentPermission(BasePermission):
         return False
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(ReplicaReadMixin, ConditionalGetMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Payment.objects.select_related('invoice', 'invoice__patient', 'recorded_by').all()
     serializer_class = PaymentSerializer
+    # 304 si ni le paiement, ni sa facture, ni le patient n'ont changé (core.conditional)
+    conditional_fields = ('updated_at', 'invoice__updated_at', 'invoice__patient__updated_at')
     permission_classes = [IsAuthenticated, IsPaymentPermission]
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -50,6 +55,26 @@ class PaymentViewSet(viewsets.ModelViewSet):
     search_fields = ['reference_number', 'transaction_id', 'invoice__invoice_number', 'invoice__patient__first_name', 'invoice__patient__last_name']
     ordering_fields = ['payment_date', 'amount', 'created_at']
     ordering = ['-payment_date']
+    # Liste, export et statistiques lus sur la réplique (core.db_router)
+    replica_actions = ('list', 'summary')
+    # Export ?format=csv / ?format=xlsx (core.export)
+    export_filename = 'paiements'
+    export_columns = [
+        ('Reçu', 'receipt_number'),
+        ('Date', 'payment_date'),
+        ('Facture', 'invoice__invoice_number'),
+        ('Prénom', 'invoice__patient__first_name'),
+        ('Nom', 'invoice__patient__last_name'),
+        ('Montant', 'amount'),
+        ('Remise', 'discount'),
+        ('Prise en charge (%)', 'coverage_percentage'),
+        ('Prise en charge', 'coverage_name'),
+        ('Mode de paiement', 'payment_method'),
+        ('Statut', 'status'),
+        ('Référence', 'reference_number'),
+        ('ID de transaction', 'transaction_id'),
+        ('Enregistré par', 'recorded_by__username'),
+    ]
     
     def perform_create(self, serializer):
         try:
@@ -1,15 +1,18 @@
 from django.contrib import admin
 from django.contrib import messages
+from django.db.models import Exists, OuterRef, Subquery
 from django.utils.html import format_html
-from .models import PatientReport, PatientAccess
+from .models import DicomMetadata, PatientReport, PatientAccess, ReportBlob, ReportUpload
+from core.admin_search import EstimatedCountAdmin
+from core.signals import invalidate_queryset
 
 
 @admin.register(PatientReport)
-class PatientReportAdmin(admin.ModelAdmin):
+class PatientReportAdmin(EstimatedCountAdmin, admin.ModelAdmin):
     list_display = [
         'patient_name', 
         'access_key', 
-        'report_file', 
+        'original_filename', 
         'created_at', 
         'get_expires_at',
         'is_active', 
@@ -18,6 +21,8 @@ class PatientReportAdmin(admin.ModelAdmin):
     
     list_filter = [
         'is_active', 
+        'ingestion_status',
+        'compression',
         'created_at'
     ]
     
@@ -27,10 +32,13 @@ class PatientReportAdmin(admin.ModelAdmin):
     ]
     
     readonly_fields = [
+        'original_filename',
         'patient_name',
         'access_key', 
         'created_at', 
         'download_count',
+        'last_downloaded_at',
+        'compression',
         'get_expires_at'
     ]
     
@@ -43,13 +51,13 @@ class PatientReportAdmin(admin.ModelAdmin):
             'fields': ('patient_access', 'patient_name', 'access_key')
         }),
         ('Fichier', {
-            'fields': ('report_file',)
+            'fields': ('report_file', 'original_filename', 'compression')
         }),
         ('Paramètres', {
             'fields': ('is_active',)
         }),
         ('Statistiques', {
-            'fields': ('created_at', 'download_count'),
+            'fields': ('created_at', 'download_count', 'last_downloaded_at'),
             'classes': ('collapse',)
         }),
     )
@@ -63,11 +71,13 @@ class PatientReportAdmin(admin.ModelAdmin):
     
     def make_active(self, request, queryset):
         queryset.update(is_active=True)
+        invalidate_queryset(queryset)
         self.message_user(request, f'{queryset.count()} comptes rendus activés.')
     make_active.short_description = 'Activer les comptes rendus sélectionnés'
     
     def make_inactive(self, request, queryset):
         queryset.update(is_active=False)
+        invalidate_queryset(queryset)
         self.message_user(request, f'{queryset.count()} comptes rendus désactivés.')
     make_inactive.short_description = 'Désactiver les comptes rendus sélectionnés'
     
@@ -75,6 +85,7 @@ class PatientReportAdmin(admin.ModelAdmin):
         from datetime import datetime, timedelta
         new_expiry = datetime.now() + timedelta(days=90)
         queryset.update(expires_at=new_expiry)
+        invalidate_queryset(queryset)
         self.message_user(request, f'Expiration prolongée de 3 mois pour {queryset.count()} comptes rendus.')
     extend_expiry.short_description = 'Prolonger l\'expiration de 3 mois'
     
@@ -120,37 +131,80 @@ class PatientReportAdmin(admin.ModelAdmin):
     
     check_invoice_match.short_description = 'Vérifier la correspondance avec les factures'
     
+    def get_queryset(self, request):
+        """
+        Facture liée et validation des clés calculées par sous-requêtes :
+        nombre de requêtes constant quel que soit le nombre de lignes affichées.
+        """
+        from invoices.models import Invoice
+
+        linked = Invoice.objects.filter(patient_access=OuterRef('patient_access')).order_by('-created_at')
+        matching = Invoice.objects.filter(
+            patient=OuterRef('patient_access__patient'),
+            patient_access=OuterRef('patient_access'),
+        )
+        return super().get_queryset(request).select_related('patient_access__patient').annotate(
+            linked_invoice_number=Subquery(linked.values('invoice_number')[:1]),
+            linked_invoice_status=Subquery(linked.values('status')[:1]),
+            has_matching_invoice=Exists(matching),
+        )
+
     def get_list_display(self, request):
         """Ajoute des colonnes dynamiques pour afficher le statut de validation"""
         return self.list_display + ['invoice_status', 'key_validation_status']
     
     def invoice_status(self, obj):
-        """Affiche le statut de la facture associée"""
+        """Affiche le statut de la facture associée (annotations de get_queryset)"""
         from invoices.models import Invoice
-        invoice = Invoice.objects.filter(patient_access=obj.patient_access).first()
-        if invoice:
-            color = 'green' if invoice.status == 'paid' else 'orange' if invoice.status == 'partially_paid' else 'red'
+        if obj.linked_invoice_number:
+            status = obj.linked_invoice_status
+            color = 'green' if status == 'paid' else 'orange' if status == 'partially_paid' else 'red'
             return format_html(
                 '<span style="color: {};">\u2022 {} ({})</span>',
                 color,
-                invoice.invoice_number,
-                invoice.get_status_display()
+                obj.linked_invoice_number,
+                dict(Invoice.STATUS_CHOICES).get(status, status)
             )
         return format_html('<span style="color: red;">\u2717 Aucune facture</span>')
     
     invoice_status.short_description = 'Statut Facture'
+    invoice_status.admin_order_field = 'linked_invoice_status'
     invoice_status.allow_tags = True
     
     def key_validation_status(self, obj):
-        """Affiche le statut de validation des clés"""
-        try:
-            is_valid, message = obj.validate_invoice_key_match()
-            if is_valid:
-                return format_html('<span style="color: green;">\u2713 Validé</span>')
-            else:
-                return format_html('<span style="color: red;">\u2717 Invalide</span>')
-        except Exception:
-            return format_html('<span style="color: orange;">\u26A0 Erreur</span>')
+        """Affiche le statut de validation des clés (même règle que validate_invoice_key_match)"""
+        if obj.has_matching_invoice:
+            return format_html('<span style="color: green;">\u2713 Validé</span>')
+        return format_html('<span style="color: red;">\u2717 Invalide</span>')
     
     key_validation_status.short_description = 'Validation Clés'
+    key_validation_status.admin_order_field = 'has_matching_invoice'
     key_validation_status.allow_tags = True
+
+
+@admin.register(ReportUpload)
+class ReportUploadAdmin(admin.ModelAdmin):
+    list_display = ['filename', 'patient_access', 'status', 'received_size', 'total_size', 'created_by', 'updated_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['filename', 'patient_access__access_key']
+    list_select_related = ['patient_access', 'created_by']
+    readonly_fields = [
+        'id', 'patient_access', 'filename', 'total_size', 'received_size',
+        'report', 'created_by', 'created_at', 'updated_at'
+    ]
+
+
+@admin.register(DicomMetadata)
+class DicomMetadataAdmin(admin.ModelAdmin):
+    list_display = ['study_instance_uid', 'modality', 'study_date', 'study_description', 'series_number', 'instance_number', 'report']
+    list_filter = ['modality', 'study_date']
+    search_fields = ['study_instance_uid', 'series_instance_uid', 'study_description']
+    list_select_related = ['report']
+    raw_id_fields = ['report']
+
+
+@admin.register(ReportBlob)
+class ReportBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'name', 'size', 'stored_size', 'ref_count', 'created_at']
+    search_fields = ['sha256', 'name']
+    readonly_fields = ['sha256', 'name', 'size', 'stored_size', 'ref_count', 'created_at']
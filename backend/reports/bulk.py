@@ -0,0 +1,269 @@
+"""
+Import groupé de comptes rendus (archive ZIP ou dossier).
+
+Chaque fichier est rattaché à un accès patient par la clé d'accès ou le
+numéro de facture présent dans son nom (`FAC-000123_scanner.pdf`,
+`K7P2M9XQ4RTA.dcm`), ou par un fichier `manifest.csv` placé à la racine
+(colonnes `fichier` et `reference`).
+
+Toutes les références sont résolues en une seule requête, les comptes
+rendus sont créés par `bulk_create` (clés primaires relues ensuite sur MySQL,
+qui ne les renvoie pas) et, après validation de la transaction,
+l'ingestion DICOM et les SMS (un par patient) sont traités en un seul lot
+par une tâche d'arrière-plan (`manage.py run_jobs`).
+"""
+import csv
+import io
+import logging
+import os
+import re
+import zipfile
+from collections import defaultdict, deque, namedtuple
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils.text import get_valid_filename
+
+from .models import PatientReport
+from .storage import report_storage
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.csv'
+MANIFEST_FILE_COLUMNS = ('fichier', 'filename', 'file')
+MANIFEST_REFERENCE_COLUMNS = ('reference', 'cle', 'access_key', 'facture', 'invoice_number')
+
+INVOICE_NUMBER_RE = re.compile(r'FAC-\d{6,}')
+ACCESS_KEY_RE = re.compile(r'(?<![A-Z0-9])[A-Z0-9]{12}(?![A-Z0-9])')
+
+BulkEntry = namedtuple('BulkEntry', ['path', 'size', 'open'])
+
+
+class BulkImportError(Exception):
+    pass
+
+
+def max_files():
+    return getattr(settings, 'REPORT_BULK_MAX_FILES', 500)
+
+
+def max_total_size():
+    return getattr(settings, 'REPORT_BULK_MAX_SIZE', 2 * 1024 ** 3)
+
+
+def _is_ignored(path):
+    parts = path.replace('\\', '/').split('/')
+    return '__MACOSX' in parts or any(part.startswith('.') for part in parts if part)
+
+
+def _check_limits(entries):
+    if len(entries) > max_files():
+        raise BulkImportError(f"Trop de fichiers ({len(entries)}, maximum {max_files()}).")
+    total = sum(entry.size for entry in entries)
+    if total > max_total_size():
+        raise BulkImportError(f"Archive trop volumineuse une fois décompressée (maximum {max_total_size()} octets).")
+    return entries
+
+
+def zip_entries(archive):
+    """Fichiers d'une archive ZIP (chemin ou fichier ouvert), sans extraction sur disque"""
+    try:
+        zf = zipfile.ZipFile(archive)
+    except zipfile.BadZipFile:
+        raise BulkImportError("Le fichier envoyé n'est pas une archive ZIP valide.")
+    entries = [
+        BulkEntry(info.filename, info.file_size, lambda info=info: zf.open(info))
+        for info in zf.infolist()
+        if not info.is_dir() and not _is_ignored(info.filename)
+    ]
+    return _check_limits(entries)
+
+
+def directory_entries(root):
+    """Fichiers d'un dossier local (commande import_reports)"""
+    entries = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not _is_ignored(d))
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            if not _is_ignored(relative):
+                entries.append(BulkEntry(relative, os.path.getsize(path), lambda path=path: open(path, 'rb')))
+    return _check_limits(entries)
+
+
+def read_manifest(entries):
+    """{nom de fichier: référence} depuis manifest.csv (séparateur , ou ;)"""
+    manifest = next((entry for entry in entries if os.path.basename(entry.path).lower() == MANIFEST_NAME), None)
+    if manifest is None:
+        return None, {}
+    with manifest.open() as f:
+        text = f.read().decode('utf-8-sig', errors='replace')
+    delimiter = ';' if text.split('\n', 1)[0].count(';') > text.split('\n', 1)[0].count(',') else ','
+    reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+    columns = {(name or '').strip().lower(): name for name in reader.fieldnames or []}
+    file_column = next((columns[c] for c in MANIFEST_FILE_COLUMNS if c in columns), None)
+    reference_column = next((columns[c] for c in MANIFEST_REFERENCE_COLUMNS if c in columns), None)
+    if not file_column or not reference_column:
+        raise BulkImportError("manifest.csv doit contenir les colonnes 'fichier' et 'reference'.")
+    references = {}
+    for row in reader:
+        filename = os.path.basename((row.get(file_column) or '').strip())
+        reference = (row.get(reference_column) or '').strip().upper()
+        if filename and reference:
+            references[filename] = reference
+    return manifest, references
+
+
+def filename_references(path):
+    """Numéros de facture et clés d'accès candidats présents dans un nom de fichier"""
+    stem = os.path.splitext(os.path.basename(path))[0].upper()
+    numbers = INVOICE_NUMBER_RE.findall(stem)
+    keys = ACCESS_KEY_RE.findall(INVOICE_NUMBER_RE.sub(' ', stem))
+    return numbers + keys
+
+
+def resolve_references(references):
+    """
+    {référence: (id de l'accès, actif)} pour les clés d'accès et numéros de
+    facture connus, en une seule requête.
+    """
+    from patients.models import PatientAccess
+
+    if not references:
+        return {}
+    numbers = {ref for ref in references if INVOICE_NUMBER_RE.fullmatch(ref)}
+    keys = set(references) - numbers
+
+    rows = PatientAccess.objects.filter(
+        Q(access_key__in=keys) | Q(invoice__invoice_number__in=numbers)
+    ).values_list('pk', 'is_active', 'access_key', 'invoice__invoice_number')
+
+    resolved = {}
+    for pk, is_active, access_key, invoice_number in rows:
+        if access_key in keys:
+            resolved[access_key] = (pk, is_active)
+        if invoice_number in numbers:
+            resolved[invoice_number] = (pk, is_active)
+    return resolved
+
+
+def plan_import(entries):
+    """
+    Associe chaque fichier à un accès patient.
+    Retourne (fichiers à importer [(entrée, id d'accès)], non rattachés, erreurs).
+    """
+    manifest, manifest_refs = read_manifest(entries)
+    files = [entry for entry in entries if entry is not manifest]
+
+    candidates = {}
+    for entry in files:
+        name = os.path.basename(entry.path)
+        candidates[entry.path] = [manifest_refs[name]] if name in manifest_refs else filename_references(entry.path)
+    resolved = resolve_references({ref for refs in candidates.values() for ref in refs})
+
+    planned, unmatched, errors = [], [], []
+    for entry in files:
+        matches = {resolved[ref] for ref in candidates[entry.path] if ref in resolved}
+        if not matches:
+            unmatched.append(entry.path)
+        elif len(matches) > 1:
+            errors.append({'file': entry.path, 'detail': "Plusieurs patients correspondent à ce fichier"})
+        else:
+            access_id, is_active = matches.pop()
+            if not is_active:
+                errors.append({'file': entry.path, 'detail': "L'accès patient n'est pas actif"})
+            else:
+                planned.append((entry, access_id))
+    return planned, unmatched, errors
+
+
+def import_entries(entries, dry_run=False, background=True):
+    """
+    Importe les fichiers rattachés à un patient. Sans `background`, ingestion
+    et SMS sont traités avant de rendre la main (commande de gestion).
+    Retourne {'created': [comptes rendus], 'planned': n, 'unmatched': [...], 'errors': [...]}.
+    """
+    from core.signals import invalidate_queryset
+
+    planned, unmatched, errors = plan_import(entries)
+    result = {'created': [], 'planned': len(planned), 'unmatched': unmatched, 'errors': errors}
+    if dry_run or not planned:
+        return result
+
+    storage = report_storage()
+    with transaction.atomic():
+        reports = []
+        for entry, access_id in planned:
+            filename = get_valid_filename(os.path.basename(entry.path)) or 'compte_rendu'
+            with entry.open() as f:
+                # Stockage par contenu : un fichier déjà connu n'est pas réécrit ;
+                # la référence du compte rendu est prise à l'enregistrement
+                name = storage.save(filename, File(f, name=filename))
+            report = PatientReport(patient_access_id=access_id, original_filename=filename, is_active=True)
+            report.report_file.name = name
+            reports.append(report)
+
+        # bulk_create ne déclenche pas post_save : cache invalidé ici
+        last_pk = PatientReport.objects.aggregate(last=Max('pk'))['last'] or 0
+        created = PatientReport.objects.bulk_create(reports, batch_size=500)
+        if any(report.pk is None for report in created):
+            _reload_pks(created, last_pk)
+        invalidate_queryset(PatientReport.objects.filter(pk__in=[report.pk for report in created]))
+
+        report_ids = [report.pk for report in created]
+        if background:
+            from .tasks import process_import_batch
+            process_import_batch.delay(report_ids=report_ids)
+        else:
+            transaction.on_commit(lambda: process_batch(report_ids))
+
+    result['created'] = created
+    return result
+
+
+def _reload_pks(reports, last_pk):
+    """
+    MySQL : `bulk_create` ne renseigne pas les clés primaires. Elles sont relues
+    parmi les lignes insérées après `last_pk`, appariées par accès et fichier
+    (dans l'ordre d'insertion).
+    """
+    inserted = (
+        PatientReport.objects
+        .filter(
+            pk__gt=last_pk,
+            patient_access_id__in={report.patient_access_id for report in reports},
+            report_file__in={report.report_file.name for report in reports},
+        )
+        .order_by('pk')
+        .values_list('pk', 'patient_access_id', 'report_file')
+    )
+    pks = defaultdict(deque)
+    for pk, access_id, name in inserted:
+        pks[(access_id, name)].append(pk)
+    for report in reports:
+        report.pk = pks[(report.patient_access_id, report.report_file.name)].popleft()
+
+
+def process_batch(report_ids):
+    """Ingestion DICOM puis notification des patients (un SMS par patient)"""
+    from .ingestion import ingest_uploaded_report
+    from .sms_service import sms_service
+
+    reports = list(
+        PatientReport.objects.filter(pk__in=report_ids).select_related('patient_access__patient')
+    )
+    for report in reports:
+        try:
+            ingest_uploaded_report(report)
+        except Exception as e:
+            logger.warning("Ingestion impossible pour le compte rendu %s: %s", report.pk, e)
+    try:
+        sent, failed = sms_service.send_report_notifications(reports)
+        logger.info("Import groupé: %s SMS envoyé(s), %s non envoyé(s)", sent, failed)
+    except Exception as e:
+        # Ne pas bloquer l'import si les SMS échouent
+        logger.warning("Erreur envoi SMS groupé: %s", e)
+
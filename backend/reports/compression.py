@@ -0,0 +1,118 @@
+"""
+Compression des comptes rendus peu consultés (tier « froid »).
+
+Un fichier compressé garde son nom suivi de l'extension du codec
+(`<sha256>.pdf.gz`) : le codec se déduit donc du nom, ce qui permet au lien
+de téléchargement signé de servir le fichier sans lecture en base.
+
+À la livraison, le fichier est envoyé tel quel avec `Content-Encoding` si le
+client accepte le codec, sinon décompressé à la volée par blocs.
+zstd nécessite le paquet `zstandard` (facultatif) ; gzip est toujours disponible.
+"""
+import gzip
+import os
+import shutil
+
+from django.db import transaction
+
+try:
+    import zstandard
+except ImportError:  # zstd facultatif
+    zstandard = None
+
+CODEC_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+BLOCK_SIZE = 1024 * 1024
+
+# Un fichier qui gagne moins de 5 % n'est pas conservé compressé
+MIN_SAVING_RATIO = 0.05
+
+
+def available_codecs():
+    return ['gzip'] + (['zstd'] if zstandard is not None else [])
+
+
+def codec_for_name(name):
+    for codec, extension in CODEC_EXTENSIONS.items():
+        if name.endswith(extension):
+            return codec
+    return ''
+
+
+def original_name(name):
+    """Nom du fichier sans l'extension du codec"""
+    codec = codec_for_name(name)
+    return name[:-len(CODEC_EXTENSIONS[codec])] if codec else name
+
+
+def accepts(accept_encoding, codec):
+    """Le client accepte-t-il ce codec en Content-Encoding ?"""
+    accepted = [part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')]
+    return codec in accepted
+
+
+def compress_file(source, destination, codec):
+    """Compresse `source` vers `destination` en flux, retourne la taille obtenue"""
+    temporary = destination + '.tmp'
+    with open(source, 'rb') as src, open(temporary, 'wb') as raw:
+        if codec == 'zstd':
+            zstandard.ZstdCompressor(level=10).copy_stream(src, raw, read_size=BLOCK_SIZE)
+        else:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as out:
+                shutil.copyfileobj(src, out, BLOCK_SIZE)
+    os.replace(temporary, destination)
+    return os.path.getsize(destination)
+
+
+def iter_file(file_obj, block_size=BLOCK_SIZE):
+    """Générateur de blocs d'un fichier, fermé en fin de lecture"""
+    with file_obj:
+        while block := file_obj.read(block_size):
+            yield block
+
+
+def iter_decompressed(file_obj, codec, block_size=BLOCK_SIZE):
+    """Générateur de blocs décompressés (mémoire bornée quelle que soit la taille du fichier)"""
+    with file_obj:
+        if codec == 'zstd':
+            stream = zstandard.ZstdDecompressor().stream_reader(file_obj)
+        else:
+            stream = gzip.GzipFile(fileobj=file_obj, mode='rb')
+        with stream:
+            while True:
+                block = stream.read(block_size)
+                if not block:
+                    break
+                yield block
+
+
+def compress_report_file(name, codec):
+    """
+    Compresse un fichier de compte rendu et met à jour tous les comptes rendus
+    qui le référencent. Retourne le nombre d'octets récupérés (0 si inutile).
+    """
+    from core.signals import invalidate_queryset
+    from .models import PatientReport, ReportBlob
+    from .storage import delete_if_orphan, report_storage
+
+    storage = report_storage()
+    new_name = name + CODEC_EXTENSIONS[codec]
+    original_size = storage.size(name)
+    stored_size = compress_file(storage.path(name), storage.path(new_name), codec)
+    if stored_size > original_size * (1 - MIN_SAVING_RATIO):
+        os.remove(storage.path(new_name))
+        return 0
+
+    with transaction.atomic():
+        # Verrou sur le blob : aucun upload du même contenu ne s'y rattache pendant le renommage
+        blob = ReportBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None or blob.ref_count == 0:
+            # Déjà compressé ou en cours de suppression
+            os.remove(storage.path(new_name))
+            return 0
+        PatientReport.objects.filter(report_file=name).update(report_file=new_name, compression=codec)
+        ReportBlob.objects.filter(pk=blob.pk).update(name=new_name, stored_size=stored_size)
+        # Les listes du portail en cache contiennent l'ancien nom
+        invalidate_queryset(PatientReport.objects.filter(report_file=new_name))
+        # L'original a pu être redéposé entre-temps (nouvelle ligne ReportBlob) : re-vérifié sous verrou
+        transaction.on_commit(lambda: delete_if_orphan(name))
+    return original_size - stored_size
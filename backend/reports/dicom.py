@@ -0,0 +1,149 @@
+"""
+Lecture des fichiers DICOM : en-têtes et aperçus.
+
+Ce module ne dépend pas de l'ORM : `render_preview` est exécuté par le
+worker de tâches ou dans les processus d'un pool (voir `reports.ingestion`)
+et ne reçoit que des chemins.
+pydicom et numpy sont facultatifs ; sans eux les fichiers DICOM sont
+simplement conservés tels quels.
+"""
+import os
+from collections.abc import Sequence
+from datetime import datetime
+
+try:
+    import numpy as np
+    import pydicom
+except ImportError:  # dépendances d'imagerie non installées
+    np = None
+    pydicom = None
+
+# Taille maximale (en pixels) du plus grand côté de l'aperçu
+PREVIEW_MAX_SIZE = 512
+
+
+def is_available():
+    return pydicom is not None and np is not None
+
+
+def looks_like_dicom(path):
+    """Fichier DICOM Part 10 : préambule de 128 octets suivi de `DICM`"""
+    try:
+        with open(path, 'rb') as f:
+            f.seek(128)
+            return f.read(4) == b'DICM'
+    except OSError:
+        return False
+
+
+def _first(value):
+    """Première valeur d'un élément multi-valué (WindowCenter, WindowWidth...)"""
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes)):
+        value = value[0] if len(value) else None
+    return value
+
+
+def _number(value, cast=float):
+    try:
+        return cast(_first(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(dataset, keyword, max_length):
+    return str(dataset.get(keyword, '') or '')[:max_length]
+
+
+def _date(value):
+    try:
+        return datetime.strptime(str(value)[:8], '%Y%m%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def read_metadata(path):
+    """En-têtes utiles à l'indexation, lus sans charger les pixels"""
+    dataset = pydicom.dcmread(path, stop_before_pixels=True)
+    return {
+        'study_instance_uid': _text(dataset, 'StudyInstanceUID', 64),
+        'series_instance_uid': _text(dataset, 'SeriesInstanceUID', 64),
+        'sop_instance_uid': _text(dataset, 'SOPInstanceUID', 64),
+        'modality': _text(dataset, 'Modality', 16),
+        'study_date': _date(dataset.get('StudyDate')),
+        'study_description': _text(dataset, 'StudyDescription', 255),
+        'series_description': _text(dataset, 'SeriesDescription', 255),
+        'series_number': _number(dataset.get('SeriesNumber'), int),
+        'instance_number': _number(dataset.get('InstanceNumber'), int),
+        'body_part': _text(dataset, 'BodyPartExamined', 64),
+        'rows': _number(dataset.get('Rows'), int),
+        'columns': _number(dataset.get('Columns'), int),
+        'number_of_frames': _number(dataset.get('NumberOfFrames'), int) or 1,
+    }
+
+
+def apply_window(pixels, dataset):
+    """
+    Convertit une image monochrome en niveaux de gris 8 bits :
+    rescale (pente/ordonnée) puis fenêtrage WindowCenter/WindowWidth,
+    ou à défaut entre les percentiles 0,5 % et 99,5 %.
+    """
+    data = pixels.astype(np.float32)
+    slope = _number(dataset.get('RescaleSlope')) or 1.0
+    intercept = _number(dataset.get('RescaleIntercept')) or 0.0
+    data = data * slope + intercept
+
+    center = _number(dataset.get('WindowCenter'))
+    width = _number(dataset.get('WindowWidth'))
+    if center is None or not width:
+        low, high = np.percentile(data, (0.5, 99.5))
+    else:
+        low, high = center - width / 2, center + width / 2
+    if high <= low:
+        high = low + 1
+
+    data = np.clip((data - low) / (high - low), 0.0, 1.0) * 255.0
+    if dataset.get('PhotometricInterpretation') == 'MONOCHROME1':
+        data = 255.0 - data
+    return data.astype(np.uint8)
+
+
+def _normalize_color(pixels):
+    data = pixels.astype(np.float32)
+    low, high = float(data.min()), float(data.max())
+    if high <= low:
+        high = low + 1
+    return ((data - low) / (high - low) * 255.0).astype(np.uint8)
+
+
+def render_preview(source, destination, max_size=PREVIEW_MAX_SIZE, image_format='png'):
+    """
+    Génère l'aperçu réduit d'un fichier DICOM (image centrale si multi-frame).
+    Exécuté hors des workers web : n'accède pas à la base de données.
+    """
+    from PIL import Image
+
+    dataset = pydicom.dcmread(source)
+    pixels = dataset.pixel_array
+    frames = _number(dataset.get('NumberOfFrames'), int) or 1
+    if frames > 1:
+        pixels = pixels[frames // 2]
+
+    # Sous-échantillonnage NumPy avant fenêtrage : on ne traite que les pixels utiles
+    step = max(1, max(pixels.shape[:2]) // (2 * max_size))
+    pixels = pixels[::step, ::step]
+
+    if (_number(dataset.get('SamplesPerPixel'), int) or 1) == 1:
+        image = Image.fromarray(apply_window(pixels, dataset))
+    else:
+        if str(dataset.get('PhotometricInterpretation', '')).startswith('YBR'):
+            from pydicom.pixel_data_handlers.util import convert_color_space
+            pixels = convert_color_space(pixels, dataset.PhotometricInterpretation, 'RGB')
+        image = Image.fromarray(_normalize_color(pixels))
+
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    if image_format == 'jpeg':
+        image.convert('RGB' if image.mode == 'RGB' else 'L').save(destination, 'JPEG', quality=85)
+    else:
+        image.save(destination, 'PNG', optimize=True)
+    return destination
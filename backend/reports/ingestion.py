@@ -0,0 +1,159 @@
+"""
+Ingestion des comptes rendus : indexation DICOM et génération des aperçus.
+
+1. `index_report` lit uniquement les en-têtes (`stop_before_pixels`), ce qui
+   est assez rapide pour être fait juste après l'upload, et renseigne
+   `DicomMetadata` (colonnes indexées étude/série/modalité).
+2. `generate_previews` décode les pixels et écrit les aperçus dans un pool de
+   processus (commande `ingest_reports`, qui traite l'arriéré). Après un
+   upload, le fenêtrage NumPy, coûteux en CPU, ne doit pas bloquer les
+   workers web : l'aperçu est confié à la file de tâches
+   (`reports.render_preview`, `manage.py run_jobs`) si REPORT_PREVIEW_WORKERS > 0.
+
+Les aperçus sont des données patient : leur nom est aléatoire (non
+énumérable) et ils ne sont servis que par la vue authentifiée
+`admin/<id>/preview/`, jamais en accès direct à MEDIA_ROOT.
+"""
+import logging
+import secrets
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from . import dicom
+from .models import DicomMetadata, PatientReport
+
+logger = logging.getLogger(__name__)
+
+
+def preview_workers():
+    return getattr(settings, 'REPORT_PREVIEW_WORKERS', 2)
+
+
+def preview_format():
+    return getattr(settings, 'REPORT_PREVIEW_FORMAT', 'png')
+
+
+def preview_name():
+    """Nom aléatoire : un aperçu ne se devine pas à partir de l'ID du compte rendu"""
+    extension = 'jpg' if preview_format() == 'jpeg' else 'png'
+    return f'reports/previews/{secrets.token_urlsafe(24)}.{extension}'
+
+
+def _set_status(report_ids, status):
+    if report_ids:
+        PatientReport.objects.filter(pk__in=report_ids).update(ingestion_status=status)
+
+
+def index_report(report):
+    """Indexe les en-têtes DICOM d'un compte rendu et retourne son nouveau statut"""
+    if not report.report_file or not dicom.looks_like_dicom(report.report_file.path):
+        status = 'not_dicom'
+    elif not dicom.is_available():
+        logger.warning("pydicom/numpy non installés : compte rendu %s laissé en attente", report.pk)
+        return report.ingestion_status
+    else:
+        try:
+            DicomMetadata.objects.update_or_create(
+                report=report, defaults=dicom.read_metadata(report.report_file.path)
+            )
+            status = 'indexed'
+        except Exception as e:
+            logger.warning("En-têtes DICOM illisibles pour le compte rendu %s: %s", report.pk, e)
+            status = 'failed'
+
+    _set_status([report.pk], status)
+    report.ingestion_status = status
+    return status
+
+
+def _preview_task(meta):
+    # Nom retenu avant le rendu, enregistré par `_store_previews`
+    meta.new_preview_name = preview_name()
+    return (
+        meta.report.report_file.path,
+        default_storage.path(meta.new_preview_name),
+        dicom.PREVIEW_MAX_SIZE,
+        preview_format(),
+    )
+
+
+def _delete_previews(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def _store_previews(ready, failed):
+    replaced = [meta.preview.name for meta in ready if meta.preview]
+    for meta in ready:
+        meta.preview.name = meta.new_preview_name
+    with transaction.atomic():
+        DicomMetadata.objects.bulk_update(ready, ['preview'])
+        _set_status([meta.report_id for meta in ready], 'ready')
+        _set_status([meta.report_id for meta in failed], 'failed')
+        # Aperçus régénérés : les anciens fichiers ne sont plus référencés
+        transaction.on_commit(lambda: _delete_previews(replaced))
+
+
+def generate_previews(report_ids, workers=None):
+    """Génère les aperçus des comptes rendus indexés dans un pool de processus"""
+    metas = list(
+        DicomMetadata.objects.filter(report_id__in=report_ids).select_related('report')
+    )
+    if not metas:
+        return 0, 0
+
+    ready, failed = [], []
+    with ProcessPoolExecutor(max_workers=workers or preview_workers() or None) as pool:
+        futures = {pool.submit(dicom.render_preview, *_preview_task(meta)): meta for meta in metas}
+        for future in as_completed(futures):
+            meta = futures[future]
+            try:
+                future.result()
+                ready.append(meta)
+            except Exception as e:
+                logger.warning("Aperçu impossible pour le compte rendu %s: %s", meta.report_id, e)
+                failed.append(meta)
+
+    _store_previews(ready, failed)
+    return len(ready), len(failed)
+
+
+def render_report_preview(report_id):
+    """Génère l'aperçu d'un compte rendu indexé (tâche `reports.render_preview`)"""
+    meta = DicomMetadata.objects.select_related('report').filter(report_id=report_id).first()
+    if meta is None:
+        return
+    try:
+        dicom.render_preview(*_preview_task(meta))
+    except Exception as e:
+        logger.warning("Aperçu impossible pour le compte rendu %s: %s", report_id, e)
+        _store_previews([], [meta])
+        return
+    _store_previews([meta], [])
+
+
+def ingest_uploaded_report(report):
+    """
+    Ingestion d'un compte rendu qui vient d'être créé (à appeler après commit) :
+    en-têtes indexés immédiatement, aperçu confié à la file de tâches.
+    """
+    from .tasks import render_preview
+
+    if index_report(report) != 'indexed' or not preview_workers():
+        return
+    render_preview.delay(report_id=report.pk)
+
+
+def schedule_ingestion(report):
+    """Planifie l'ingestion après validation de la transaction courante"""
+    def run():
+        try:
+            ingest_uploaded_report(report)
+        except Exception as e:
+            # L'ingestion ne doit jamais faire échouer la création du compte rendu
+            logger.warning("Ingestion impossible pour le compte rendu %s: %s", report.pk, e)
+
+    transaction.on_commit(run)
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from reports import compression
+from reports.models import PatientReport
+from reports.storage import report_storage
+
+
+class Command(BaseCommand):
+    help = 'Compresse les comptes rendus non téléchargés depuis N jours (tier froid)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'REPORT_COLD_AFTER_DAYS', 180),
+                            help='Ancienneté du dernier téléchargement (défaut: REPORT_COLD_AFTER_DAYS)')
+        parser.add_argument('--codec', default=getattr(settings, 'REPORT_COLD_CODEC', 'gzip'),
+                            help='Codec: gzip ou zstd (défaut: REPORT_COLD_CODEC)')
+        parser.add_argument('--limit', type=int, default=None, help='Nombre maximum de fichiers à traiter')
+        parser.add_argument('--dry-run', action='store_true', help='Liste les fichiers concernés sans les compresser')
+
+    def handle(self, *args, **options):
+        codec = options['codec']
+        if codec not in compression.available_codecs():
+            raise CommandError(
+                f"Codec indisponible: {codec} (disponibles: {', '.join(compression.available_codecs())})"
+            )
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # Un fichier partagé (dédoublonné) est froid si aucun de ses comptes rendus n'a été téléchargé récemment
+        names = (
+            PatientReport.objects.filter(compression='')
+            .exclude(report_file='')
+            .exclude(ingestion_status__in=['pending', 'indexed'])  # DICOM encore à analyser
+            .values('report_file')
+            .annotate(last_used=Max(Coalesce('last_downloaded_at', 'created_at')))
+            .filter(last_used__lt=cutoff)
+            .order_by('last_used')
+            .values_list('report_file', flat=True)
+        )
+        if options['limit']:
+            names = names[:options['limit']]
+        names = list(names)
+
+        storage = report_storage()
+        if options['dry_run']:
+            total = sum(storage.size(name) for name in names if storage.exists(name))
+            self.stdout.write(f"{len(names)} fichier(s) froid(s), {total / 1024 / 1024:.1f} Mo avant compression")
+            return
+
+        compressed = skipped = missing = 0
+        reclaimed = 0
+        for name in names:
+            if not storage.exists(name):
+                missing += 1
+                continue
+            saved = compression.compress_report_file(name, codec)
+            if saved:
+                compressed += 1
+                reclaimed += saved
+            else:
+                skipped += 1
+
+        self.stdout.write(
+            f"✓ {compressed} fichier(s) compressé(s) en {codec}, {skipped} peu compressible(s) ignoré(s), "
+            f"{missing} introuvable(s) : {reclaimed / 1024 / 1024:.1f} Mo récupérés"
+        )
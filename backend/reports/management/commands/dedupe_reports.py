@@ -0,0 +1,127 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from core.signals import invalidate_queryset
+from reports.models import PatientReport, ReportBlob
+from reports.storage import CAS_PREFIX, blob_name, hash_file, is_blob_name, report_storage, sha256_of_name
+
+# Les fichiers orphelins plus récents peuvent appartenir à un upload en cours
+ORPHAN_MIN_AGE = 3600
+
+
+class Command(BaseCommand):
+    help = 'Migre les comptes rendus vers le stockage par contenu, supprime les doublons et recalcule les références'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Affiche l'espace récupérable sans rien modifier")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = report_storage()
+
+        migrated = duplicates = missing = 0
+        reclaimed = 0
+        seen = set()
+
+        legacy_names = (
+            PatientReport.objects.exclude(report_file='')
+            .exclude(report_file__startswith=CAS_PREFIX)
+            .values_list('report_file', flat=True)
+            .distinct()
+        )
+        for old_name in list(legacy_names):
+            path = storage.path(old_name)
+            if not os.path.exists(path):
+                missing += 1
+                self.stdout.write(f"⚠ Fichier introuvable: {old_name}")
+                continue
+
+            size = os.path.getsize(path)
+            new_name = blob_name(hash_file(path), os.path.splitext(old_name)[1])
+            duplicate = new_name in seen or storage.exists(new_name)
+            seen.add(new_name)
+            if duplicate:
+                duplicates += 1
+                reclaimed += size
+            migrated += 1
+            if dry_run:
+                continue
+
+            if not duplicate:
+                os.makedirs(os.path.dirname(storage.path(new_name)), exist_ok=True)
+                os.replace(path, storage.path(new_name))
+            try:
+                with transaction.atomic():
+                    reports = PatientReport.objects.filter(report_file=old_name)
+                    reports.filter(original_filename='').update(original_filename=os.path.basename(old_name))
+                    reports.update(report_file=new_name)
+                    # Les listes du portail en cache contiennent l'ancien chemin
+                    invalidate_queryset(PatientReport.objects.filter(report_file=new_name))
+            except Exception:
+                if not duplicate:
+                    os.replace(storage.path(new_name), path)
+                raise
+            if duplicate:
+                os.remove(path)
+
+        if dry_run:
+            self.stdout.write(
+                f"{migrated} fichier(s) à migrer dont {duplicates} doublon(s) : "
+                f"{reclaimed / 1024 / 1024:.1f} Mo récupérables"
+            )
+            return
+
+        refs, orphans, orphan_bytes = self._rebuild_references(storage)
+        reclaimed += orphan_bytes
+        self.stdout.write(
+            f"✓ {migrated} fichier(s) migré(s), {duplicates} doublon(s) supprimé(s), "
+            f"{orphans} fichier(s) orphelin(s) supprimé(s), {missing} introuvable(s)"
+        )
+        self.stdout.write(f"✓ {refs} fichier(s) référencé(s), {reclaimed / 1024 / 1024:.1f} Mo récupérés")
+
+    def _rebuild_references(self, storage):
+        """Recalcule ReportBlob depuis les comptes rendus et supprime les fichiers non référencés"""
+        counts = dict(
+            PatientReport.objects.filter(report_file__startswith=CAS_PREFIX)
+            .values_list('report_file')
+            .annotate(n=Count('id'))
+        )
+        blobs = {blob.name: blob for blob in ReportBlob.objects.all()}
+
+        to_create, to_update = [], []
+        for name, count in counts.items():
+            blob = blobs.pop(name, None)
+            if blob is None:
+                try:
+                    size = storage.size(name)
+                except OSError:
+                    size = 0
+                to_create.append(ReportBlob(
+                    name=name, sha256=sha256_of_name(name), size=size, stored_size=size, ref_count=count
+                ))
+            elif blob.ref_count != count:
+                blob.ref_count = count
+                to_update.append(blob)
+
+        with transaction.atomic():
+            ReportBlob.objects.bulk_create(to_create, batch_size=500)
+            ReportBlob.objects.bulk_update(to_update, ['ref_count'], batch_size=500)
+            ReportBlob.objects.filter(pk__in=[blob.pk for blob in blobs.values()]).delete()
+
+        orphans = orphan_bytes = 0
+        root = storage.path(CAS_PREFIX)
+        now = time.time()
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, storage.path('')).replace(os.sep, '/')
+                if name in counts or not is_blob_name(name) or now - os.path.getmtime(path) < ORPHAN_MIN_AGE:
+                    continue
+                orphan_bytes += os.path.getsize(path)
+                os.remove(path)
+                orphans += 1
+        return len(counts), orphans, orphan_bytes
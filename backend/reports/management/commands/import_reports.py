@@ -0,0 +1,37 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reports.bulk import BulkImportError, directory_entries, import_entries, zip_entries
+
+
+class Command(BaseCommand):
+    help = "Importe un dossier ou une archive ZIP de comptes rendus rattachés par clé d'accès ou numéro de facture"
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Dossier ou archive ZIP à importer')
+        parser.add_argument('--dry-run', action='store_true', help='Affiche le rattachement sans rien importer')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        try:
+            if os.path.isdir(source):
+                entries = directory_entries(source)
+            elif os.path.isfile(source):
+                entries = zip_entries(source)
+            else:
+                raise CommandError(f"Source introuvable: {source}")
+            result = import_entries(entries, dry_run=options['dry_run'], background=False)
+        except BulkImportError as e:
+            raise CommandError(str(e))
+
+        for path in result['unmatched']:
+            self.stdout.write(f"⚠ Aucun patient trouvé pour: {path}")
+        for error in result['errors']:
+            self.stdout.write(f"✗ {error['file']}: {error['detail']}")
+
+        if options['dry_run']:
+            self.stdout.write(f"{result['planned']} fichier(s) à importer")
+        else:
+            self.stdout.write(f"✓ {len(result['created'])} compte(s) rendu(s) importé(s)")
+        self.stdout.write(f"{len(result['unmatched'])} non rattaché(s), {len(result['errors'])} erreur(s)")
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from reports import dicom
+from reports.ingestion import generate_previews, index_report
+from reports.models import PatientReport
+
+
+class Command(BaseCommand):
+    help = 'Indexe les en-têtes DICOM des comptes rendus et génère leurs aperçus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Nombre de processus pour les aperçus (défaut: REPORT_PREVIEW_WORKERS)')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Nombre de comptes rendus traités par lot')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Retraiter les comptes rendus en échec')
+
+    def handle(self, *args, **options):
+        if not dicom.is_available():
+            self.stdout.write("⚠ pydicom/numpy non installés : ingestion impossible")
+            return
+
+        statuses = ['pending', 'indexed'] + (['failed'] if options['retry_failed'] else [])
+        pending_ids = list(
+            PatientReport.objects.filter(ingestion_status__in=statuses).order_by('pk').values_list('pk', flat=True)
+        )
+        self.stdout.write(f"{len(pending_ids)} compte(s) rendu(s) à traiter")
+
+        totals = {'indexed': 0, 'not_dicom': 0, 'ready': 0, 'failed': 0}
+        batch_size = options['batch_size']
+        for start in range(0, len(pending_ids), batch_size):
+            reports = PatientReport.objects.filter(pk__in=pending_ids[start:start + batch_size])
+
+            # 1. En-têtes (lecture rapide, sans les pixels)
+            to_preview = []
+            for report in reports:
+                status = report.ingestion_status
+                if status != 'indexed':
+                    status = index_report(report)
+                    if status in totals:
+                        totals[status] += 1
+                if status == 'indexed':
+                    to_preview.append(report.pk)
+
+            # 2. Aperçus dans le pool de processus
+            ready, failed = generate_previews(to_preview, workers=options['workers'])
+            totals['ready'] += ready
+            totals['failed'] += failed
+            self.stdout.write(f"  lot {start // batch_size + 1}: {ready} aperçu(s), {failed} échec(s)")
+
+        self.stdout.write(
+            f"✓ {totals['indexed']} DICOM indexé(s), {totals['not_dicom']} non DICOM, "
+            f"{totals['ready']} aperçu(s) généré(s), {totals['failed']} échec(s)"
+        )
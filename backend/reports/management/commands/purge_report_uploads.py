@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from reports.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Abandonne les uploads de comptes rendus inactifs et supprime leurs fichiers partiels'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=int, default=24,
+            help="Ancienneté (en heures) du dernier morceau reçu au-delà de laquelle l'upload est abandonné"
+        )
+
+    def handle(self, *args, **options):
+        count = purge_stale_uploads(options['hours'])
+        self.stdout.write(f"✓ {count} upload(s) abandonné(s)")
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:28
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0009_alter_patient_phone_number'),
+        ('reports', '0002_alter_patientreport_expires_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Nom du fichier')),
+                ('total_size', models.BigIntegerField(verbose_name='Taille totale (octets)')),
+                ('received_size', models.BigIntegerField(default=0, verbose_name='Octets reçus')),
+                ('status', models.CharField(choices=[('pending', 'En cours'), ('completed', 'Terminé'), ('aborted', 'Abandonné')], default='pending', max_length=20, verbose_name='Statut')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernier morceau reçu')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Créé par')),
+                ('patient_access', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_uploads', to='patients.patientaccess', verbose_name='Accès patient')),
+                ('report', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload', to='reports.patientreport', verbose_name='Compte rendu créé')),
+            ],
+            options={
+                'verbose_name': 'Upload de compte rendu',
+                'verbose_name_plural': 'Uploads de comptes rendus',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='reports_rep_status_8b2854_idx')],
+            },
+        ),
+    ]
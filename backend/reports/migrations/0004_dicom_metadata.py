@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_report_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientreport',
+            name='ingestion_status',
+            field=models.CharField(choices=[('pending', 'À analyser'), ('indexed', 'DICOM indexé (aperçu en attente)'), ('ready', 'DICOM avec aperçu'), ('not_dicom', 'Non DICOM'), ('failed', 'Échec')], db_index=True, default='pending', max_length=20, verbose_name="Statut d'ingestion"),
+        ),
+        migrations.CreateModel(
+            name='DicomMetadata',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('study_instance_uid', models.CharField(db_index=True, max_length=64, verbose_name='Study Instance UID')),
+                ('series_instance_uid', models.CharField(blank=True, max_length=64, verbose_name='Series Instance UID')),
+                ('sop_instance_uid', models.CharField(blank=True, max_length=64, verbose_name='SOP Instance UID')),
+                ('modality', models.CharField(blank=True, max_length=16, verbose_name='Modalité')),
+                ('study_date', models.DateField(blank=True, null=True, verbose_name="Date de l'étude")),
+                ('study_description', models.CharField(blank=True, max_length=255, verbose_name="Description de l'étude")),
+                ('series_description', models.CharField(blank=True, max_length=255, verbose_name='Description de la série')),
+                ('series_number', models.IntegerField(blank=True, null=True, verbose_name='Numéro de série')),
+                ('instance_number', models.IntegerField(blank=True, null=True, verbose_name="Numéro d'instance")),
+                ('body_part', models.CharField(blank=True, max_length=64, verbose_name='Région anatomique')),
+                ('rows', models.IntegerField(blank=True, null=True, verbose_name='Lignes')),
+                ('columns', models.IntegerField(blank=True, null=True, verbose_name='Colonnes')),
+                ('number_of_frames', models.IntegerField(default=1, verbose_name="Nombre d'images")),
+                ('preview', models.FileField(blank=True, upload_to='reports/previews/', verbose_name='Aperçu')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name="Date d'indexation")),
+                ('report', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='dicom', to='reports.patientreport', verbose_name='Compte rendu')),
+            ],
+            options={
+                'verbose_name': 'Métadonnées DICOM',
+                'verbose_name_plural': 'Métadonnées DICOM',
+                'ordering': ['-study_date', 'study_instance_uid', 'series_number', 'instance_number'],
+                'indexes': [models.Index(fields=['study_instance_uid', 'series_instance_uid'], name='reports_dic_study_i_e8e32a_idx'), models.Index(fields=['modality', 'study_date'], name='reports_dic_modalit_cf7d68_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:35
+
+import reports.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_dicom_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Chemin')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Taille (octets)')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Références')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+            ],
+            options={
+                'verbose_name': 'Fichier stocké',
+                'verbose_name_plural': 'Fichiers stockés',
+            },
+        ),
+        migrations.AddField(
+            model_name='patientreport',
+            name='original_filename',
+            field=models.CharField(blank=True, max_length=255, verbose_name="Nom du fichier d'origine"),
+        ),
+        migrations.AlterField(
+            model_name='patientreport',
+            name='report_file',
+            field=models.FileField(max_length=255, storage=reports.storage.report_storage, upload_to='reports/', verbose_name='Fichier du compte rendu'),
+        ),
+    ]
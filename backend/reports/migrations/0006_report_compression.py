@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:37
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def init_stored_size(apps, schema_editor):
+    ReportBlob = apps.get_model('reports', 'ReportBlob')
+    ReportBlob.objects.update(stored_size=F('size'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_content_addressed_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientreport',
+            name='compression',
+            field=models.CharField(blank=True, choices=[('', 'Aucune'), ('gzip', 'gzip'), ('zstd', 'zstd')], default='', max_length=10, verbose_name='Compression'),
+        ),
+        migrations.AddField(
+            model_name='patientreport',
+            name='last_downloaded_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Dernier téléchargement'),
+        ),
+        migrations.AddField(
+            model_name='reportblob',
+            name='stored_size',
+            field=models.BigIntegerField(default=0, verbose_name='Taille sur disque (octets)'),
+        ),
+        migrations.RunPython(init_stored_size, migrations.RunPython.noop),
+    ]
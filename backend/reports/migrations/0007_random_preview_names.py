@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 16:05
+
+import os
+import secrets
+
+from django.core.files.storage import default_storage
+from django.db import migrations
+
+
+def rename_previews(apps, schema_editor):
+    """Aperçus existants `reports/previews/<id>.png` : renommés avec un nom aléatoire"""
+    DicomMetadata = apps.get_model('reports', 'DicomMetadata')
+    for meta in DicomMetadata.objects.exclude(preview='').only('pk', 'preview').iterator():
+        old_name = meta.preview.name
+        extension = os.path.splitext(old_name)[1]
+        new_name = f'reports/previews/{secrets.token_urlsafe(24)}{extension}'
+        try:
+            os.replace(default_storage.path(old_name), default_storage.path(new_name))
+        except FileNotFoundError:
+            new_name = ''
+        DicomMetadata.objects.filter(pk=meta.pk).update(preview=new_name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0006_report_compression'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_previews, migrations.RunPython.noop),
+    ]
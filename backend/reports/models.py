@@ -1,10 +1,13 @@
+import os
 import uuid
 import secrets
+from django.conf import settings
 from django.db import models
 from django.core.files.storage import default_storage
 from django.core.exceptions import ValidationError
 from datetime import datetime, timedelta
 from patients.models import PatientAccess
+from .storage import report_storage
 
 
 class PatientReport(models.Model):
@@ -22,14 +25,52 @@ class PatientReport(models.Model):
     # Fichier du compte rendu
     report_file = models.FileField(
         upload_to='reports/', 
+        storage=report_storage,
+        max_length=255,
         verbose_name="Fichier du compte rendu"
     )
+    original_filename = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Nom du fichier d'origine"
+    )
     
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
     expires_at = models.DateTimeField(null=True, blank=True, verbose_name="Date d'expiration")
     is_active = models.BooleanField(default=True, verbose_name="Actif")
     download_count = models.IntegerField(default=0, verbose_name="Nombre de téléchargements")
+    last_downloaded_at = models.DateTimeField(null=True, blank=True, verbose_name="Dernier téléchargement")
+    
+    # Compression des fichiers peu consultés (reports.compression)
+    COMPRESSION_CHOICES = [
+        ('', 'Aucune'),
+        ('gzip', 'gzip'),
+        ('zstd', 'zstd'),
+    ]
+    compression = models.CharField(
+        max_length=10,
+        choices=COMPRESSION_CHOICES,
+        default='',
+        blank=True,
+        verbose_name="Compression"
+    )
+    
+    # Ingestion (indexation DICOM et aperçus, voir reports.dicom)
+    INGESTION_STATUS_CHOICES = [
+        ('pending', 'À analyser'),
+        ('indexed', 'DICOM indexé (aperçu en attente)'),
+        ('ready', 'DICOM avec aperçu'),
+        ('not_dicom', 'Non DICOM'),
+        ('failed', 'Échec'),
+    ]
+    ingestion_status = models.CharField(
+        max_length=20,
+        choices=INGESTION_STATUS_CHOICES,
+        default='pending',
+        db_index=True,
+        verbose_name="Statut d'ingestion"
+    )
     
     class Meta:
         verbose_name = "Compte rendu patient"
@@ -42,8 +83,21 @@ class PatientReport(models.Model):
     def save(self, *args, **kwargs):
         # Validation des clés et activation automatique
         self.validate_and_activate()
+        # Nouveau fichier : le nom d'origine est conservé, le stockage le renomme par son SHA-256
+        if self.report_file and not self.report_file._committed:
+            self.original_filename = os.path.basename(self.report_file.name)
         super().save(*args, **kwargs)
     
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        # Suivi des références (reports.signals) : le nom en base a pu changer
+        self._stored_file_name = self.report_file.name if self.report_file else ''
+    
+    @property
+    def download_filename(self):
+        """Nom proposé au téléchargement"""
+        return self.original_filename or os.path.basename(self.report_file.name)
+    
     @property
     def is_expired(self):
         """Vérifie si l'accès a expiré"""
@@ -108,5 +162,116 @@ class PatientReport(models.Model):
     
     def increment_download_count(self):
         """Incrémente le compteur de téléchargements"""
+        from django.utils import timezone
         self.download_count += 1
-        self.save(update_fields=['download_count'])
+        self.last_downloaded_at = timezone.now()
+        self.save(update_fields=['download_count', 'last_downloaded_at'])
+
+
+class DicomMetadata(models.Model):
+    """En-têtes DICOM indexés d'un compte rendu et son aperçu"""
+    report = models.OneToOneField(
+        PatientReport,
+        on_delete=models.CASCADE,
+        related_name='dicom',
+        verbose_name="Compte rendu"
+    )
+    study_instance_uid = models.CharField(max_length=64, db_index=True, verbose_name="Study Instance UID")
+    series_instance_uid = models.CharField(max_length=64, blank=True, verbose_name="Series Instance UID")
+    sop_instance_uid = models.CharField(max_length=64, blank=True, verbose_name="SOP Instance UID")
+    modality = models.CharField(max_length=16, blank=True, verbose_name="Modalité")
+    study_date = models.DateField(null=True, blank=True, verbose_name="Date de l'étude")
+    study_description = models.CharField(max_length=255, blank=True, verbose_name="Description de l'étude")
+    series_description = models.CharField(max_length=255, blank=True, verbose_name="Description de la série")
+    series_number = models.IntegerField(null=True, blank=True, verbose_name="Numéro de série")
+    instance_number = models.IntegerField(null=True, blank=True, verbose_name="Numéro d'instance")
+    body_part = models.CharField(max_length=64, blank=True, verbose_name="Région anatomique")
+    rows = models.IntegerField(null=True, blank=True, verbose_name="Lignes")
+    columns = models.IntegerField(null=True, blank=True, verbose_name="Colonnes")
+    number_of_frames = models.IntegerField(default=1, verbose_name="Nombre d'images")
+    preview = models.FileField(upload_to='reports/previews/', blank=True, verbose_name="Aperçu")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date d'indexation")
+
+    class Meta:
+        verbose_name = "Métadonnées DICOM"
+        verbose_name_plural = "Métadonnées DICOM"
+        ordering = ['-study_date', 'study_instance_uid', 'series_number', 'instance_number']
+        indexes = [
+            models.Index(fields=['study_instance_uid', 'series_instance_uid']),
+            models.Index(fields=['modality', 'study_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.modality or 'DICOM'} {self.study_date or ''} - {self.study_description or self.study_instance_uid}"
+
+
+class ReportBlob(models.Model):
+    """Fichier stocké par contenu (reports.storage) et nombre de comptes rendus qui le référencent"""
+    sha256 = models.CharField(max_length=64, db_index=True, verbose_name="SHA-256")
+    name = models.CharField(max_length=255, unique=True, verbose_name="Chemin")
+    size = models.BigIntegerField(default=0, verbose_name="Taille (octets)")
+    stored_size = models.BigIntegerField(default=0, verbose_name="Taille sur disque (octets)")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="Références")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+
+    class Meta:
+        verbose_name = "Fichier stocké"
+        verbose_name_plural = "Fichiers stockés"
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} réf.)"
+
+
+class ReportUpload(models.Model):
+    """
+    Upload en plusieurs morceaux d'un compte rendu volumineux.
+    Le fichier est assemblé sur disque (`partial_path`) au fil des morceaux,
+    puis déplacé dans `reports/` à la création du `PatientReport`.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'En cours'),
+        ('completed', 'Terminé'),
+        ('aborted', 'Abandonné'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    patient_access = models.ForeignKey(
+        PatientAccess,
+        on_delete=models.CASCADE,
+        related_name='report_uploads',
+        verbose_name="Accès patient"
+    )
+    filename = models.CharField(max_length=255, verbose_name="Nom du fichier")
+    total_size = models.BigIntegerField(verbose_name="Taille totale (octets)")
+    received_size = models.BigIntegerField(default=0, verbose_name="Octets reçus")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
+    report = models.OneToOneField(
+        PatientReport,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='upload',
+        verbose_name="Compte rendu créé"
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        verbose_name="Créé par"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernier morceau reçu")
+
+    class Meta:
+        verbose_name = "Upload de compte rendu"
+        verbose_name_plural = "Uploads de comptes rendus"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.total_size})"
+
+    @property
+    def is_complete(self):
+        return self.received_size >= self.total_size
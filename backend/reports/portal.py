@@ -0,0 +1,299 @@
+"""
+Session du portail patient et liste des comptes rendus mise en cache.
+
+Après authentification par clé d'accès, le patient reçoit un jeton signé
+de courte durée (`django.core.signing`) : il suffit à recharger le portail
+sans renvoyer le mot de passe ni interroger la table `PatientAccess`.
+
+La liste des comptes rendus d'un accès est mise en cache (`core.cache`) et
+invalidée via les tags `patient_access:<id>` / `patient:<id>` dès qu'un
+compte rendu, l'accès ou le patient est modifié.
+
+Les liens de téléchargement sont signés (HMAC sur l'ID du compte rendu, la
+version du fichier, l'accès et l'expiration) : leur vérification ne demande
+aucune lecture en base. Un compte rendu désactivé reste téléchargeable via
+un lien déjà émis jusqu'à son expiration (REPORT_DOWNLOAD_URL_TTL).
+
+En déploiement ASGI, `afile_response` sert le fichier par blocs lus dans
+des fils de travail : un téléchargement lent n'occupe plus un worker.
+"""
+import asyncio
+import mimetypes
+import os
+import time
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import content_disposition_header
+
+from core import cache as cache_layer
+
+from . import compression
+from .storage import report_storage
+
+SESSION_SALT = 'reports.portal.session'
+DOWNLOAD_SALT = 'reports.portal.download'
+LISTING_NAMESPACE = 'portal:reports'
+# À incrémenter quand le format de la liste mise en cache change
+LISTING_FORMAT = 2
+
+
+class PortalSessionError(Exception):
+    pass
+
+
+class DownloadLinkError(Exception):
+    pass
+
+
+def session_max_age():
+    return getattr(settings, 'PATIENT_PORTAL_SESSION_AGE', 1800)
+
+
+def issue_session_token(access_id, patient_id):
+    """Jeton signé identifiant l'accès patient pour la durée de la session"""
+    return signing.dumps({'a': access_id, 'p': patient_id}, salt=SESSION_SALT)
+
+
+def read_session_token(token):
+    """Retourne (access_id, patient_id) ou lève PortalSessionError"""
+    if not token:
+        raise PortalSessionError("Session manquante")
+    try:
+        payload = signing.loads(token, salt=SESSION_SALT, max_age=session_max_age())
+    except signing.SignatureExpired:
+        raise PortalSessionError("Session expirée")
+    except signing.BadSignature:
+        raise PortalSessionError("Session invalide")
+    return payload['a'], payload['p']
+
+
+def _build_listing(access_id):
+    from patients.models import PatientAccess
+    from .models import PatientReport
+    from .serializers import PatientReportListSerializer
+
+    patient_access = PatientAccess.objects.select_related('patient').filter(pk=access_id).first()
+    if patient_access is None:
+        return None
+
+    reports = (
+        PatientReport.objects.filter(patient_access_id=access_id, is_active=True)
+        .select_related('patient_access__patient')
+        .order_by('-created_at')
+    )
+    patient = patient_access.patient
+    serialized = PatientReportListSerializer(reports, many=True).data
+    return {
+        'access_id': patient_access.id,
+        'access_key': patient_access.access_key,
+        'is_active': patient_access.is_active,
+        'access_count': patient_access.access_count,
+        'last_accessed': patient_access.last_accessed,
+        'patient': {
+            'id': patient.id,
+            'full_name': patient.full_name,
+            'phone_number': patient.phone_number,
+        },
+        'reports': [
+            # `file` : version du fichier, nécessaire à la signature des liens
+            {**data, 'file': report.report_file.name}
+            for report, data in zip(reports, serialized)
+        ],
+    }
+
+
+def get_report_listing(access_id, patient_id):
+    """Liste des comptes rendus actifs d'un accès (None si l'accès n'existe plus)"""
+    return cache_layer.get_or_set(
+        LISTING_NAMESPACE,
+        [LISTING_FORMAT, access_id],
+        lambda: _build_listing(access_id),
+        tags=[f'patient_access:{access_id}', f'patient:{patient_id}'],
+    )
+
+
+def download_url_ttl():
+    return getattr(settings, 'REPORT_DOWNLOAD_URL_TTL', 900)
+
+
+def _download_signature(report_id, file_name, download_name, access_id, expires):
+    message = f'{report_id}:{file_name}:{download_name}:{access_id}:{expires}'
+    return salted_hmac(DOWNLOAD_SALT, message, algorithm='sha256').hexdigest()
+
+
+def sign_download_url(report_id, file_name, access_id, download_name=''):
+    """URL de téléchargement signée, valable REPORT_DOWNLOAD_URL_TTL secondes"""
+    expires = int(time.time()) + download_url_ttl()
+    query = urlencode({
+        'f': file_name,
+        'n': download_name,
+        'a': access_id,
+        'e': expires,
+        's': _download_signature(report_id, file_name, download_name, access_id, expires),
+    })
+    return f"{reverse('patient-download-report', args=[report_id])}?{query}"
+
+
+def verify_download(report_id, params):
+    """Vérifie un lien signé et retourne (fichier à servir, nom proposé au téléchargement)"""
+    try:
+        file_name = params['f']
+        download_name = params.get('n', '')
+        access_id = params['a']
+        expires = int(params['e'])
+        signature = params['s']
+    except (KeyError, ValueError):
+        raise DownloadLinkError("Lien de téléchargement invalide")
+
+    expected = _download_signature(report_id, file_name, download_name, access_id, expires)
+    if not constant_time_compare(signature, expected):
+        raise DownloadLinkError("Lien de téléchargement invalide")
+    if expires < time.time():
+        raise DownloadLinkError("Lien de téléchargement expiré")
+    return file_name, download_name
+
+
+def _download_headers(file_name, download_name):
+    """(codec, nom proposé, type MIME, Content-Disposition) d'un fichier du stockage"""
+    codec = compression.codec_for_name(file_name)
+    plain_name = compression.original_name(file_name)
+    filename = download_name or os.path.basename(plain_name)
+    content_type = (
+        mimetypes.guess_type(filename)[0] or mimetypes.guess_type(plain_name)[0] or 'application/octet-stream'
+    )
+    return codec, filename, content_type, content_disposition_header(True, filename)
+
+
+def _accel_prefix():
+    return getattr(settings, 'REPORTS_X_ACCEL_REDIRECT', '')
+
+
+def _accel_response(file_name, content_type, disposition):
+    """Envoi délégué à nginx (X-Accel-Redirect)"""
+    response = HttpResponse(content_type=content_type)
+    response['X-Accel-Redirect'] = _accel_prefix().rstrip('/') + '/' + quote(file_name)
+    response['Content-Disposition'] = disposition
+    return response
+
+
+def file_response(file_name, download_name='', accept_encoding=''):
+    """
+    Réponse de téléchargement pour un fichier du stockage des comptes rendus.
+    Si REPORTS_X_ACCEL_REDIRECT est défini, l'envoi est délégué à nginx.
+    Les fichiers compressés (tier froid) sont envoyés avec Content-Encoding si
+    le client l'accepte, sinon décompressés à la volée.
+    """
+    codec, filename, content_type, disposition = _download_headers(file_name, download_name)
+    if _accel_prefix() and not codec:
+        return _accel_response(file_name, content_type, disposition)
+
+    # Lève FileNotFoundError si le fichier a disparu du stockage
+    stored = report_storage().open(file_name, 'rb')
+    if not codec:
+        return FileResponse(stored, as_attachment=True, filename=filename, content_type=content_type)
+
+    if compression.accepts(accept_encoding, codec):
+        response = FileResponse(stored, as_attachment=True, filename=filename, content_type=content_type)
+        response['Content-Encoding'] = codec
+    else:
+        response = StreamingHttpResponse(compression.iter_decompressed(stored, codec), content_type=content_type)
+        response['Content-Disposition'] = disposition
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def preview_response(file_name):
+    """Aperçu DICOM (stockage par défaut), délégué à nginx si REPORTS_X_ACCEL_REDIRECT est défini"""
+    content_type = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+    if _accel_prefix():
+        return _accel_response(file_name, content_type, 'inline')
+    return FileResponse(default_storage.open(file_name, 'rb'), content_type=content_type)
+
+
+async def aiter_in_thread(iterator):
+    """Parcourt un itérateur bloquant (lectures disque) sans bloquer la boucle d'événements"""
+    done = object()
+    try:
+        while (block := await asyncio.to_thread(next, iterator, done)) is not done:
+            yield block
+    finally:
+        # Client déconnecté : fermeture du fichier
+        await asyncio.to_thread(iterator.close)
+
+
+async def afile_response(file_name, download_name='', accept_encoding=''):
+    """Variante de `file_response` pour les vues asynchrones (réponse en flux asynchrone)"""
+    codec, filename, content_type, disposition = _download_headers(file_name, download_name)
+    if _accel_prefix() and not codec:
+        return _accel_response(file_name, content_type, disposition)
+
+    # Lève FileNotFoundError si le fichier a disparu du stockage
+    stored = await asyncio.to_thread(report_storage().open, file_name, 'rb')
+    send_as_is = not codec or compression.accepts(accept_encoding, codec)
+    if send_as_is:
+        size = await asyncio.to_thread(lambda: stored.size)
+        blocks = compression.iter_file(stored)
+    else:
+        blocks = compression.iter_decompressed(stored, codec)
+
+    response = StreamingHttpResponse(aiter_in_thread(blocks), content_type=content_type)
+    response['Content-Disposition'] = disposition
+    if send_as_is:
+        response['Content-Length'] = size
+    if codec:
+        if send_as_is:
+            response['Content-Encoding'] = codec
+        response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def signed_reports(listing):
+    """Comptes rendus de la liste avec leurs liens signés (sans modifier le cache)"""
+    signed = []
+    for report in listing['reports']:
+        report = dict(report)
+        file_name = report.pop('file')
+        report['download_url'] = sign_download_url(
+            report['id'], file_name, listing['access_id'], report['file_name'] or ''
+        )
+        signed.append(report)
+    return signed
+
+
+def portal_files(listing):
+    """Format `files` historique du portail (/api/patients/portal/)"""
+    return [
+        {
+            'id': report['id'],
+            'filename': report['file_name'] or 'N/A',
+            'created_at': report['created_at'],
+            'download_url': report['download_url'],
+            'is_active': True,
+        }
+        for report in signed_reports(listing)
+    ]
+
+
+def portal_payload(listing):
+    """Réponse du portail patient (connexion et rechargement de session)"""
+    patient = listing['patient']
+    return {
+        'success': True,
+        'patient': patient,
+        'access_info': {
+            'access_key': listing['access_key'],
+            'is_permanent': True,
+            'access_count': listing['access_count'],
+            'last_accessed': listing['last_accessed'],
+        },
+        'files': portal_files(listing),
+        # Jeton renouvelé à chaque visite (session glissante)
+        'session_token': issue_session_token(listing['access_id'], patient['id']),
+        'session_expires_in': session_max_age(),
+    }
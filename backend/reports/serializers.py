@@ -1,12 +1,32 @@
 from rest_framework import serializers
-from .models import PatientReport
+from django.urls import reverse
+from .models import DicomMetadata, PatientReport, ReportUpload
 from patients.models import PatientAccess
 
 
+class DicomMetadataSerializer(serializers.ModelSerializer):
+    """Métadonnées DICOM indexées d'un compte rendu"""
+    preview_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = DicomMetadata
+        fields = [
+            'study_instance_uid', 'series_instance_uid', 'sop_instance_uid', 'modality',
+            'study_date', 'study_description', 'series_description', 'series_number',
+            'instance_number', 'body_part', 'rows', 'columns', 'number_of_frames', 'preview_url'
+        ]
+    
+    def get_preview_url(self, obj):
+        if not obj.preview:
+            return None
+        return reverse('admin-report-preview', args=[obj.report_id])
+
+
 class PatientReportSerializer(serializers.ModelSerializer):
     """Serializer pour les comptes rendus patients"""
     patient_name = serializers.SerializerMethodField()
     access_key = serializers.SerializerMethodField()
+    dicom = serializers.SerializerMethodField()
     patient_access = serializers.PrimaryKeyRelatedField(
         queryset=PatientAccess.objects.all(),
         error_messages={
@@ -18,10 +38,12 @@ class PatientReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = PatientReport
         fields = [
-            'id', 'patient_access', 'patient_name', 'access_key', 'report_file',
-            'created_at', 'expires_at', 'is_active', 'download_count'
+            'id', 'patient_access', 'patient_name', 'access_key', 'report_file', 'original_filename',
+            'created_at', 'expires_at', 'is_active', 'download_count', 'ingestion_status', 'dicom'
+        ]
+        read_only_fields = [
+            'id', 'patient_name', 'access_key', 'original_filename', 'created_at', 'download_count', 'ingestion_status'
         ]
-        read_only_fields = ['id', 'patient_name', 'access_key', 'created_at', 'download_count']
     
     def get_patient_name(self, obj):
         return obj.patient_access.patient.full_name if obj.patient_access and hasattr(obj.patient_access, 'patient') else 'Inconnu'
@@ -29,6 +51,10 @@ class PatientReportSerializer(serializers.ModelSerializer):
     def get_access_key(self, obj):
         return obj.patient_access.access_key if obj.patient_access else None
     
+    def get_dicom(self, obj):
+        meta = getattr(obj, 'dicom', None)
+        return DicomMetadataSerializer(meta).data if meta else None
+    
     def validate(self, attrs):
         # Vérifier que le fichier est présent
         if 'report_file' not in self.context['request'].FILES:
@@ -92,7 +118,7 @@ class PatientReportListSerializer(serializers.ModelSerializer):
     def get_file_name(self, obj):
         """Retourne le nom du fichier"""
         if obj.report_file:
-            return obj.report_file.name.split('/')[-1]
+            return obj.download_filename
         return None
     
     def get_file_size(self, obj):
@@ -128,3 +154,22 @@ class KeyValidationSerializer(serializers.Serializer):
             raise serializers.ValidationError({
                 'access_key': 'Clé d\'accès invalide'
             })
+
+
+class ReportUploadSerializer(serializers.ModelSerializer):
+    """Serializer pour les uploads de comptes rendus en plusieurs morceaux"""
+    patient_access = serializers.PrimaryKeyRelatedField(
+        queryset=PatientAccess.objects.all(),
+        error_messages={
+            'does_not_exist': 'Aucun accès patient trouvé avec cet ID',
+            'required': 'Le champ patient_access est obligatoire.'
+        }
+    )
+    
+    class Meta:
+        model = ReportUpload
+        fields = [
+            'id', 'patient_access', 'filename', 'total_size', 'received_size',
+            'status', 'report', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'received_size', 'status', 'report', 'created_at', 'updated_at']
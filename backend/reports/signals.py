@@ -0,0 +1,43 @@
+"""
+Compteurs de références des fichiers de comptes rendus (voir `reports.storage`).
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+
+from . import storage
+from .models import PatientReport
+
+
+def _remember_file(sender, instance, **kwargs):
+    instance._stored_file_name = instance.report_file.name if instance.report_file else ''
+
+
+def _note_new_file(sender, instance, **kwargs):
+    # Fichier déposé pendant cette sauvegarde : le stockage en a déjà pris la référence
+    instance._file_reserved = bool(instance.report_file) and not instance.report_file._committed
+
+
+def _track_file_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_stored_file_name', '')
+    current = instance.report_file.name if instance.report_file else ''
+    reserved, instance._file_reserved = getattr(instance, '_file_reserved', False), False
+    if current == previous:
+        return
+    if not reserved:
+        storage.acquire(current)
+    if previous:
+        transaction.on_commit(lambda: storage.release(previous))
+    instance._stored_file_name = current
+
+
+def _release_file(sender, instance, **kwargs):
+    name = getattr(instance, '_stored_file_name', '')
+    if name:
+        transaction.on_commit(lambda: storage.release(name))
+
+
+def connect_signals():
+    post_init.connect(_remember_file, sender=PatientReport, dispatch_uid='reports.remember_file')
+    pre_save.connect(_note_new_file, sender=PatientReport, dispatch_uid='reports.note_new_file')
+    post_save.connect(_track_file_change, sender=PatientReport, dispatch_uid='reports.track_file_change')
+    post_delete.connect(_release_file, sender=PatientReport, dispatch_uid='reports.release_file')
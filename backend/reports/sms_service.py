@@ -86,13 +86,14 @@ class OrangeSMSService:
         
         return phone
     
-    def send_sms(self, phone_number, message):
+    def send_sms(self, phone_number, message, token=None):
         """
         Envoyer un SMS via l'API Orange
         
         Args:
             phone_number: Numéro du destinataire
             message: Contenu du SMS (max 160 caractères pour 1 SMS)
+            token: Token OAuth déjà obtenu (envoi par lot), sinon demandé
         
         Returns:
             (success: bool, detail: str)
@@ -107,7 +108,8 @@ class OrangeSMSService:
             return False, "Configuration Orange SMS incomplète"
         
         # Obtenir le token
-        token = self.get_access_token()
+        if token is None:
+            token = self.get_access_token()
         if not token:
             return False, "Impossible d'obtenir le token Orange SMS"
         
@@ -150,12 +152,34 @@ class OrangeSMSService:
                 pass
             return False, f"Erreur envoi SMS: {error_detail}"
     
-    def send_report_notification(self, patient_report):
+    def report_notification_message(self, access):
+        """Message SMS annonçant un compte rendu disponible"""
+        patient = access.patient
+        
+        # Construire le lien du portail patient
+        portal_url = getattr(settings, 'PATIENT_PORTAL_URL', 'http://localhost:5173/patient')
+        
+        # Message SMS
+        message = (
+            f"CIMEF - Bonjour {patient.first_name}, "
+            f"votre compte rendu est disponible. "
+            f"Connectez-vous sur {portal_url} "
+            f"avec votre cle: {access.access_key} "
+            f"et mot de passe: {access.password}"
+        )
+        
+        # Tronquer si trop long (160 chars max par SMS, mais Orange gère le multi-part)
+        if len(message) > 459:
+            message = message[:456] + "..."
+        return message
+    
+    def send_report_notification(self, patient_report, token=None):
         """
         Envoyer une notification SMS au patient quand son compte rendu est uploadé
         
         Args:
             patient_report: Instance de PatientReport
+            token: Token OAuth déjà obtenu (envoi par lot)
         
         Returns:
             (success: bool, detail: str)
@@ -168,34 +192,60 @@ class OrangeSMSService:
             if not phone_number:
                 return False, "Le patient n'a pas de numéro de téléphone"
             
-            # Construire le lien du portail patient
-            portal_url = getattr(settings, 'PATIENT_PORTAL_URL', 'http://localhost:5173/patient')
-            
-            # Message SMS
-            message = (
-                f"CIMEF - Bonjour {patient.first_name}, "
-                f"votre compte rendu est disponible. "
-                f"Connectez-vous sur {portal_url} "
-                f"avec votre cle: {access.access_key} "
-                f"et mot de passe: {access.password}"
-            )
-            
-            # Tronquer si trop long (160 chars max par SMS, mais Orange gère le multi-part)
-            if len(message) > 459:
-                message = message[:456] + "..."
-            
-            success, detail = self.send_sms(phone_number, message)
+            success, detail = self.send_sms(phone_number, self.report_notification_message(access), token=token)
             
             if success:
                 # Marquer comme envoyé par SMS
                 access.sent_via_sms = True
-                access.save(update_fields=['sent_via_sms'])
+                access.save(update_fields=['sent_via_sms', 'updated_at'])
             
             return success, detail
             
         except Exception as e:
             logger.error(f"Erreur notification SMS compte rendu: {e}")
             return False, f"Erreur: {str(e)}"
+    
+    def send_report_notifications(self, patient_reports):
+        """
+        Notifie un lot de comptes rendus (import groupé) : un seul SMS par
+        patient et un seul token OAuth pour tout le lot.
+        
+        Returns:
+            (envoyés: int, échecs: int)
+        """
+        from core.conditional import update_touching
+        from core.signals import invalidate_queryset
+        from patients.models import PatientAccess
+        
+        accesses = {}
+        for report in patient_reports:
+            accesses.setdefault(report.patient_access_id, report.patient_access)
+        if not accesses:
+            return 0, 0
+        
+        token = None
+        if self.enabled and self.client_id and self.client_secret:
+            token = self.get_access_token()
+            if not token:
+                return 0, len(accesses)
+        
+        sent_ids = []
+        for access in accesses.values():
+            phone_number = access.patient.phone_number
+            if not phone_number:
+                logger.info("Pas de numéro pour l'accès %s", access.access_key)
+                continue
+            success, detail = self.send_sms(phone_number, self.report_notification_message(access), token=token)
+            if success:
+                sent_ids.append(access.pk)
+            else:
+                logger.warning("SMS non envoyé pour l'accès %s: %s", access.access_key, detail)
+        
+        if sent_ids:
+            sent = PatientAccess.objects.filter(pk__in=sent_ids)
+            update_touching(sent, sent_via_sms=True)
+            invalidate_queryset(sent)
+        return len(sent_ids), len(accesses) - len(sent_ids)
 
 
 # Instance singleton
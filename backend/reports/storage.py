@@ -0,0 +1,188 @@
+"""
+Stockage des comptes rendus adressé par contenu.
+
+Chaque fichier est rangé sous `reports/cas/<ab>/<cd>/<sha256><ext>` : deux
+uploads identiques partagent le même fichier sur disque. Le SHA-256 est
+calculé pendant la copie (un seul passage sur les données).
+
+`ReportBlob` compte les comptes rendus qui référencent chaque fichier ; le
+fichier est supprimé quand plus aucun compte rendu ne l'utilise (voir
+`reports.signals`). La commande `dedupe_reports` migre les fichiers
+existants et recalcule les compteurs.
+
+Dédoublonnage, références et suppression d'un même contenu sont sérialisés
+par un verrou sur sa ligne `ReportBlob` (`lock_blob`) : un upload qui
+retrouve un fichier en cours de suppression attend, puis le réécrit. La
+référence du compte rendu est prise sous ce verrou, dès l'enregistrement du
+fichier : une suppression différée qui passe avant la sauvegarde du compte
+rendu (hors transaction) trouve le fichier référencé.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.functional import LazyObject
+
+CAS_PREFIX = 'reports/cas/'
+COPY_BLOCK_SIZE = 1024 * 1024
+
+
+def blob_name(sha256, extension=''):
+    """Chemin relatif (sharding sur 2 niveaux) d'un contenu"""
+    return f'{CAS_PREFIX}{sha256[:2]}/{sha256[2:4]}/{sha256}{extension.lower()[:10]}'
+
+
+def hash_file(path):
+    """SHA-256 d'un fichier local, lu par blocs"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(CAS_PREFIX)
+
+
+def sha256_of_name(name):
+    # `<sha256>.pdf` ou `<sha256>.pdf.gz` (voir reports.compression)
+    return os.path.basename(name).split('.')[0]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Stockage fichier dont les noms sont dérivés du SHA-256 du contenu"""
+
+    def get_available_name(self, name, max_length=None):
+        # Le nom définitif est calculé dans `_save` à partir du contenu
+        return name
+
+    def _temporary_file(self):
+        directory = self.path(f'{CAS_PREFIX}tmp')
+        os.makedirs(directory, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=directory, delete=False)
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        with self._temporary_file() as temporary:
+            if hasattr(content, 'seek') and content.seekable():
+                content.seek(0)
+            for chunk in content.chunks(COPY_BLOCK_SIZE):
+                digest.update(chunk)
+                temporary.write(chunk)
+        # Référence prise pour le compte rendu en cours d'enregistrement
+        # (`reports.signals` ne la reprend pas à sa sauvegarde)
+        return self._commit(temporary.name, digest.hexdigest(), os.path.splitext(name)[1], reserve=True)
+
+    def store_path(self, path, sha256, extension=''):
+        """
+        Range un fichier local déjà haché (upload par morceaux) : le fichier
+        est déplacé, ou supprimé si le contenu existe déjà. L'appelant crée le
+        compte rendu dans la même transaction, sous le verrou de `lock_blob`.
+        """
+        return self._commit(path, sha256, extension)
+
+    def _commit(self, temporary_path, sha256, extension, reserve=False):
+        from .models import ReportBlob
+
+        name = blob_name(sha256, extension)
+        destination = self.path(name)
+        with transaction.atomic():
+            blob = lock_blob(name, os.path.getsize(temporary_path))
+            if reserve:
+                ReportBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+            if os.path.exists(destination):
+                # Contenu déjà stocké : dédoublonnage
+                os.remove(temporary_path)
+            else:
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                os.replace(temporary_path, destination)
+                if self.file_permissions_mode is not None:
+                    os.chmod(destination, self.file_permissions_mode)
+        return name
+
+
+class _DefaultReportStorage(LazyObject):
+    def _setup(self):
+        self._wrapped = ContentAddressedStorage()
+
+
+report_storage_instance = _DefaultReportStorage()
+
+
+def report_storage():
+    """Stockage de `PatientReport.report_file` (callable pour les migrations)"""
+    return report_storage_instance
+
+
+# ---------------------------------------------------------------------------
+# Compteurs de références
+# ---------------------------------------------------------------------------
+
+def lock_blob(name, size=None):
+    """
+    Verrouille la ligne `ReportBlob` de `name` jusqu'à la fin de la transaction
+    courante, en la créant (0 référence) si elle n'existe pas encore.
+    """
+    from .models import ReportBlob
+
+    blob = ReportBlob.objects.select_for_update().filter(name=name).first()
+    if blob is not None:
+        return blob
+    if size is None:
+        try:
+            size = report_storage_instance.size(name)
+        except OSError:
+            size = 0
+    blob, created = ReportBlob.objects.get_or_create(
+        name=name, defaults={'sha256': sha256_of_name(name), 'size': size, 'stored_size': size, 'ref_count': 0}
+    )
+    if not created:
+        # Créée entre-temps par une autre transaction
+        blob = ReportBlob.objects.select_for_update().get(pk=blob.pk)
+    return blob
+
+
+def acquire(name, count=1):
+    """`count` compte(s) rendu(s) de plus référencent le fichier `name`"""
+    from .models import ReportBlob
+
+    if not is_blob_name(name):
+        return
+    with transaction.atomic():
+        blob = lock_blob(name)
+        ReportBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + count)
+
+
+def release(name):
+    """Un compte rendu ne référence plus `name` ; le fichier est supprimé s'il est orphelin"""
+    from .models import ReportBlob
+
+    if not is_blob_name(name):
+        return
+    with transaction.atomic():
+        blob = ReportBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return
+        if blob.ref_count > 0:
+            ReportBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+        if blob.ref_count <= 1:
+            transaction.on_commit(lambda: delete_if_orphan(name))
+
+
+def delete_if_orphan(name):
+    """
+    Supprime le fichier `name` et sa ligne `ReportBlob` si aucun compte rendu ne
+    le référence plus. Re-vérifié sous verrou : un upload du même contenu a pu
+    reprendre une référence depuis `release` (ou depuis la compression).
+    """
+    with transaction.atomic():
+        # Ligne créée au besoin : le verrou est celui que prend un upload du même contenu
+        blob = lock_blob(name, size=0)
+        if blob.ref_count > 0:
+            return
+        blob.delete()
+        report_storage_instance.delete(name)
@@ -0,0 +1,44 @@
+"""Tâches d'arrière-plan des comptes rendus (voir core.jobs)"""
+import logging
+
+from core.jobs import task
+
+from .models import PatientReport
+
+logger = logging.getLogger(__name__)
+
+
+@task('reports.notify_patient', priority=10)
+def notify_patient(report_id):
+    """SMS de notification d'un nouveau compte rendu ; relancé si l'envoi échoue"""
+    from .sms_service import sms_service
+
+    report = (
+        PatientReport.objects.select_related('patient_access__patient')
+        .filter(pk=report_id).first()
+    )
+    if report is None or not report.patient_access.patient.phone_number:
+        return
+    success, detail = sms_service.send_report_notification(report)
+    if not success and sms_service.enabled:
+        raise RuntimeError(f"SMS non envoyé: {detail}")
+    if success:
+        logger.info("SMS envoyé pour le compte rendu %s", report.pk)
+    else:
+        logger.warning("SMS non envoyé pour le compte rendu %s: %s", report.pk, detail)
+
+
+@task('reports.process_import_batch', priority=5)
+def process_import_batch(report_ids):
+    """Ingestion DICOM et SMS d'un import groupé"""
+    from .bulk import process_batch
+
+    process_batch(report_ids)
+
+
+@task('reports.render_preview')
+def render_preview(report_id):
+    """Aperçu d'un compte rendu DICOM (fenêtrage NumPy hors des workers web)"""
+    from .ingestion import render_report_preview
+
+    render_report_preview(report_id)
@@ -1,3 +1,292 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+from urllib.parse import parse_qsl, urlencode
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from core.models import Job
+from patients.models import Patient, PatientAccess
+
+from . import compression, ingestion, portal, storage, uploads
+from .bulk import BulkEntry, import_entries
+from .models import DicomMetadata, PatientReport, ReportBlob, ReportUpload
+
+
+class MediaRootMixin:
+    """MEDIA_ROOT temporaire : les fichiers des tests ne touchent pas au vrai stockage"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, JOBS_EAGER=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class ReportFixturesMixin(MediaRootMixin):
+    def setUp(self):
+        super().setUp()
+        self.user = get_user_model().objects.create_user(username='import', password='x', role='admin')
+        patient = Patient.objects.create(first_name='Awa', last_name='Diop', gender='F', phone_number='770000010')
+        self.access = PatientAccess.objects.create(patient=patient, created_by=self.user)
+
+
+class BulkImportTests(ReportFixturesMixin, TestCase):
+    def entry(self, name, content):
+        return BulkEntry(path=name, size=len(content), open=lambda: io.BytesIO(content))
+
+    def test_created_reports_have_ids_without_bulk_insert_returning(self):
+        # MySQL : bulk_create ne renvoie pas les clés primaires
+        entries = [
+            self.entry(f'{self.access.access_key}.pdf', b'%PDF-1.4 scanner'),
+            self.entry(f'{self.access.access_key}_copie.pdf', b'%PDF-1.4 scanner'),
+        ]
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            result = import_entries(entries)
+
+        ids = [report.pk for report in result['created']]
+        self.assertEqual(len(ids), 2)
+        self.assertNotIn(None, ids)
+        self.assertEqual(PatientReport.objects.filter(pk__in=ids).count(), 2)
+        # Même contenu : un seul fichier, référencé deux fois
+        blob = ReportBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        job = Job.objects.get(name='reports.process_import_batch')
+        self.assertEqual(sorted(job.payload['report_ids']), sorted(ids))
+
+
+class BlobReferenceTests(MediaRootMixin, TestCase):
+    def store(self, content):
+        return storage.report_storage().save('cr.pdf', io.BytesIO(content))
+
+    def test_pending_delete_skipped_when_content_reused(self):
+        name = self.store(b'%PDF-1.4 original')
+        self.assertEqual(ReportBlob.objects.get(name=name).ref_count, 1)
+        with self.captureOnCommitCallbacks() as callbacks:
+            storage.release(name)
+        self.assertEqual(len(callbacks), 1)
+
+        # Le même contenu est de nouveau déposé avant la suppression différée
+        self.assertEqual(self.store(b'%PDF-1.4 original'), name)
+        callbacks[0]()
+        self.assertTrue(storage.report_storage().exists(name))
+        self.assertEqual(ReportBlob.objects.get(name=name).ref_count, 1)
+
+    def test_orphan_deleted_after_release(self):
+        name = self.store(b'%PDF-1.4 orphelin')
+        with self.captureOnCommitCallbacks(execute=True):
+            storage.release(name)
+        self.assertFalse(storage.report_storage().exists(name))
+        self.assertFalse(ReportBlob.objects.filter(name=name).exists())
+
+    def test_compression_keeps_original_reuploaded_meanwhile(self):
+        content = b'%PDF-1.4 ' + b'compte rendu ' * 1000
+        name = self.store(content)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertGreater(compression.compress_report_file(name, 'gzip'), 0)
+        self.assertEqual(ReportBlob.objects.get().name, name + '.gz')
+
+        self.assertEqual(self.store(content), name)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(storage.report_storage().exists(name))
+        self.assertTrue(storage.report_storage().exists(name + '.gz'))
+
+    def test_compression_deletes_unreferenced_original(self):
+        name = self.store(b'%PDF-1.4 ' + b'archive ' * 1000)
+        with self.captureOnCommitCallbacks(execute=True):
+            compression.compress_report_file(name, 'gzip')
+        self.assertFalse(storage.report_storage().exists(name))
+        self.assertEqual(list(ReportBlob.objects.values_list('name', 'ref_count')), [(name + '.gz', 1)])
+
+
+class AutocommitDedupTests(ReportFixturesMixin, TransactionTestCase):
+    def test_release_between_dedup_and_report_save_keeps_file(self):
+        content = b'%PDF-1.4 partage'
+        # Fichier référencé par un compte rendu existant
+        name = storage.report_storage().save('cr.pdf', io.BytesIO(content))
+        commit = storage.ContentAddressedStorage._commit
+
+        def commit_then_release(self, *args, **kwargs):
+            stored = commit(self, *args, **kwargs)
+            # Le compte rendu existant est supprimé avant la sauvegarde du nouveau
+            # (hors transaction : la suppression différée s'exécute aussitôt)
+            storage.release(stored)
+            return stored
+
+        with mock.patch.object(storage.ContentAddressedStorage, '_commit', commit_then_release):
+            report = PatientReport.objects.create(
+                patient_access=self.access, report_file=SimpleUploadedFile('cr.pdf', content)
+            )
+        self.assertEqual(report.report_file.name, name)
+        self.assertTrue(storage.report_storage().exists(name))
+        self.assertEqual(ReportBlob.objects.get(name=name).ref_count, 1)
+
+
+class ChunkedUploadTests(ReportFixturesMixin, TestCase):
+    content = b'%PDF-1.4 ' + b'scanner ' * 100
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        response = self.api.post('/api/reports/uploads/', {
+            'patient_access': self.access.pk, 'filename': 'scanner.pdf', 'total_size': len(self.content),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.upload_id = response.data['id']
+
+    def put(self, offset, data):
+        return self.api.put(
+            f'/api/reports/uploads/{self.upload_id}/chunk/', data,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def complete(self, sha256):
+        return self.api.post(f'/api/reports/uploads/{self.upload_id}/complete/', {'sha256': sha256}, format='json')
+
+    def test_interrupted_chunk_resumes_at_received_offset(self):
+        # Connexion coupée au milieu du morceau : seuls 100 octets sur 300 sont reçus
+        uploads.write_chunk(self.upload_id, 0, io.BytesIO(self.content[:100]), 300)
+        response = self.api.get(f'/api/reports/uploads/{self.upload_id}/')
+        self.assertEqual(response.data['received_size'], 100)
+
+        self.assertEqual(self.put(100, self.content[100:]).data['complete'], True)
+        with open(uploads.partial_path(ReportUpload.objects.get()), 'rb') as f:
+            self.assertEqual(f.read(), self.content)
+
+    def test_offset_mismatch_returns_expected_offset(self):
+        self.assertEqual(self.put(0, self.content[:100]).status_code, 200)
+        response = self.put(50, self.content[50:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 100)
+        self.assertEqual(ReportUpload.objects.get().received_size, 100)
+
+    def test_checksum_mismatch_rejected(self):
+        self.put(0, self.content)
+        response = self.complete('0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ReportUpload.objects.get().status, 'pending')
+        self.assertFalse(PatientReport.objects.exists())
+
+    def test_complete_deduplicates_existing_content(self):
+        name = storage.report_storage().save('cr.pdf', io.BytesIO(self.content))
+        self.put(0, self.content)
+        response = self.complete(hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(response.status_code, 201)
+
+        report = PatientReport.objects.get()
+        self.assertEqual(report.report_file.name, name)
+        self.assertEqual(report.original_filename, 'scanner.pdf')
+        self.assertEqual(ReportBlob.objects.get(name=name).ref_count, 2)
+        self.assertFalse(os.path.exists(uploads.partial_path(ReportUpload.objects.get())))
+        self.assertEqual(ReportUpload.objects.get().status, 'completed')
+
+
+def fake_render(source, destination, max_size, image_format):
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    with open(destination, 'wb') as f:
+        f.write(b'PNG')
+
+
+class PreviewTests(ReportFixturesMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        result = import_entries([BulkEntry('%s.dcm' % self.access.access_key, 4, lambda: io.BytesIO(b'DICM'))])
+        self.report = result['created'][0]
+        DicomMetadata.objects.create(report=self.report, study_instance_uid='1.2.3')
+
+    def test_upload_queues_preview_job(self):
+        with mock.patch.object(ingestion, 'index_report', return_value='indexed'):
+            ingestion.ingest_uploaded_report(self.report)
+        job = Job.objects.get(name='reports.render_preview')
+        self.assertEqual(job.payload, {'report_id': self.report.pk})
+
+    def test_preview_name_is_random_and_served_to_staff_only(self):
+        with mock.patch.object(ingestion.dicom, 'render_preview', fake_render), \
+                self.captureOnCommitCallbacks(execute=True):
+            ingestion.render_report_preview(self.report.pk)
+            ingestion.render_report_preview(self.report.pk)
+        meta = DicomMetadata.objects.get(report=self.report)
+        self.assertNotEqual(meta.preview.name, f'reports/previews/{self.report.pk}.png')
+        self.assertGreaterEqual(len(os.path.basename(meta.preview.name)), 32)
+        # Aperçu régénéré : un seul fichier sur disque
+        self.assertEqual(len(os.listdir(os.path.dirname(meta.preview.path))), 1)
+
+        url = f'/api/reports/admin/{self.report.pk}/preview/'
+        self.assertEqual(APIClient().get(url).status_code, 401)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'PNG')
+
+
+class PortalSessionTests(ReportFixturesMixin, TestCase):
+    url = '/api/patients/portal/session/'
+
+    def test_session_token_only_accepted_in_authorization_header(self):
+        cache.clear()
+        token = portal.issue_session_token(self.access.pk, self.access.patient_id)
+        self.assertEqual(self.client.get(self.url, {'token': token}).status_code, 401)
+        self.assertEqual(self.client.get(self.url, HTTP_X_PORTAL_TOKEN=token).status_code, 401)
+
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f'Portal {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['session_token'])
+
+
+class SignedDownloadTests(ReportFixturesMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        entries = [
+            BulkEntry(f'{self.access.access_key}.pdf', 12, lambda: io.BytesIO(b'%PDF-1.4 cr1')),
+            BulkEntry(f'{self.access.access_key}_bis.pdf', 12, lambda: io.BytesIO(b'%PDF-1.4 cr2')),
+        ]
+        self.report, self.other = import_entries(entries)['created']
+
+    def signed(self, report):
+        url = portal.sign_download_url(report.pk, report.report_file.name, self.access.pk, 'cr.pdf')
+        path, query = url.split('?')
+        return path, dict(parse_qsl(query))
+
+    def get(self, path, params):
+        return self.client.get(f'{path}?{urlencode(params)}')
+
+    def test_valid_link_serves_file(self):
+        response = self.get(*self.signed(self.report))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 cr1')
+
+    def test_expired_link_rejected(self):
+        path, params = self.signed(self.report)
+        with mock.patch.object(portal.time, 'time', return_value=time.time() + portal.download_url_ttl() + 1):
+            response = self.get(path, params)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('expiré', response.json()['error'])
+
+    def test_tampered_link_rejected(self):
+        path, params = self.signed(self.report)
+        for field, value in (('e', str(int(params['e']) + 3600)), ('a', str(self.access.pk + 1)),
+                             ('n', 'autre.pdf'), ('s', '0' * 64)):
+            with self.subTest(field=field):
+                self.assertEqual(self.get(path, {**params, field: value}).status_code, 403)
+
+    def test_link_bound_to_its_report_and_file(self):
+        path, params = self.signed(self.report)
+        other_path, _ = self.signed(self.other)
+        # Signature d'un compte rendu réutilisée pour un autre fichier ou un autre compte rendu
+        self.assertEqual(self.get(path, {**params, 'f': self.other.report_file.name}).status_code, 403)
+        self.assertEqual(self.get(other_path, params).status_code, 403)
@@ -0,0 +1,200 @@
+"""
+Upload en plusieurs morceaux (reprenable) des comptes rendus volumineux.
+
+Protocole :
+1. `start_upload` : déclare le fichier (accès patient, nom, taille totale).
+2. `write_chunk` : chaque morceau est envoyé brut avec son offset ; il est
+   d'abord reçu dans un fichier temporaire par blocs de CHUNK_READ_SIZE,
+   sans être chargé en mémoire, puis ajouté au fichier partiel sous verrou.
+   Un offset différent des octets déjà reçus est refusé avec l'offset
+   attendu, ce qui permet au client de reprendre.
+3. `complete_upload` : vérifie la taille et la somme SHA-256 (calculée hors
+   transaction), range le fichier dans le stockage par contenu
+   (`reports.storage`) et crée le `PatientReport` dans la même transaction.
+
+Aucun verrou n'est tenu pendant la lecture du réseau ou du disque : seules
+la vérification de l'offset et l'écriture locale sont faites sous verrou.
+"""
+import hmac
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import PatientReport, ReportUpload
+from .storage import blob_name, hash_file, lock_blob, report_storage
+
+# Taille des blocs lus depuis la requête et écrits sur disque
+CHUNK_READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    """Le morceau ne commence pas à la fin des données déjà reçues"""
+
+    def __init__(self, expected):
+        super().__init__(f"Offset invalide, attendu: {expected}")
+        self.expected = expected
+
+
+def max_upload_size():
+    return getattr(settings, 'REPORT_UPLOAD_MAX_SIZE', 2 * 1024 ** 3)
+
+
+def chunk_size():
+    """Taille de morceau recommandée aux clients"""
+    return getattr(settings, 'REPORT_UPLOAD_CHUNK_SIZE', 5 * 1024 ** 2)
+
+
+def partial_dir():
+    return getattr(settings, 'REPORT_UPLOAD_TEMP_DIR', '') or os.path.join(settings.MEDIA_ROOT, 'uploads', 'partial')
+
+
+def partial_path(upload):
+    return os.path.join(partial_dir(), f'{upload.pk}.part')
+
+
+def start_upload(patient_access, filename, total_size, user=None):
+    """Déclare un nouvel upload et crée son fichier partiel vide"""
+    if not patient_access.is_active:
+        raise UploadError("L'accès patient n'est pas actif.")
+    if total_size <= 0:
+        raise UploadError("Le fichier est vide.")
+    if total_size > max_upload_size():
+        raise UploadError(f"Fichier trop volumineux (maximum {max_upload_size()} octets).")
+
+    upload = ReportUpload.objects.create(
+        patient_access=patient_access,
+        filename=get_valid_filename(os.path.basename(filename)) or 'compte_rendu',
+        total_size=total_size,
+        created_by=user,
+    )
+    os.makedirs(partial_dir(), exist_ok=True)
+    open(partial_path(upload), 'wb').close()
+    return upload
+
+
+def write_chunk(upload_id, offset, stream, length):
+    """
+    Écrit `length` octets lus depuis `stream` à la position `offset`.
+    Retourne l'upload à jour ; `received_size` indique où reprendre si la
+    connexion a été coupée au milieu du morceau.
+    """
+    upload = ReportUpload.objects.get(pk=upload_id)
+    _check_chunk(upload, offset, length)
+
+    with tempfile.TemporaryFile(dir=partial_dir()) as received:
+        # Réception hors transaction : le verrou n'attend pas le réseau
+        written = 0
+        while written < length:
+            data = stream.read(min(CHUNK_READ_SIZE, length - written))
+            if not data:
+                break
+            received.write(data)
+            written += len(data)
+        received.seek(0)
+
+        with transaction.atomic():
+            # Verrou sur l'upload : deux morceaux du même fichier ne s'écrivent pas en parallèle
+            upload = ReportUpload.objects.select_for_update().get(pk=upload_id)
+            _check_chunk(upload, offset, length)
+            with open(partial_path(upload), 'r+b') as partial:
+                partial.seek(offset)
+                # Supprime les octets d'un morceau précédent interrompu
+                partial.truncate()
+                shutil.copyfileobj(received, partial, CHUNK_READ_SIZE)
+
+            upload.received_size = offset + written
+            upload.save(update_fields=['received_size', 'updated_at'])
+    return upload
+
+
+def _check_chunk(upload, offset, length):
+    if upload.status != 'pending':
+        raise UploadError("Cet upload n'est plus en cours.")
+    if offset != upload.received_size:
+        raise OffsetMismatch(upload.received_size)
+    if length <= 0 or offset + length > upload.total_size:
+        raise UploadError("Le morceau dépasse la taille déclarée du fichier.")
+
+
+def complete_upload(upload_id, sha256=None):
+    """
+    Vérifie le fichier assemblé et crée le compte rendu.
+    Retourne (rapport, somme SHA-256 calculée).
+    """
+    upload = ReportUpload.objects.get(pk=upload_id)
+    _check_complete(upload)
+    # Fichier complet : plus aucun morceau ne peut le modifier, il est haché hors transaction
+    source = partial_path(upload)
+    checksum = hash_file(source)
+    if sha256 and not hmac.compare_digest(checksum, sha256.strip().lower()):
+        raise UploadError("La somme de contrôle SHA-256 ne correspond pas au fichier reçu.")
+
+    with transaction.atomic():
+        upload = ReportUpload.objects.select_for_update().select_related('patient_access').get(pk=upload_id)
+        # Terminé ou abandonné entre-temps
+        _check_complete(upload)
+
+        # Stockage par contenu : si le fichier existe déjà, la copie reçue est abandonnée.
+        # Le verrou sur le ReportBlob empêche sa suppression (release) avant la création du compte rendu.
+        storage = report_storage()
+        name = blob_name(checksum, os.path.splitext(upload.filename)[1])
+        lock_blob(name, os.path.getsize(source))
+        duplicate = storage.exists(name)
+        if not duplicate:
+            storage.store_path(source, checksum, os.path.splitext(upload.filename)[1])
+
+        try:
+            report = PatientReport(patient_access=upload.patient_access, original_filename=upload.filename)
+            report.report_file.name = name
+            report.save()
+
+            upload.status = 'completed'
+            upload.report = report
+            upload.save(update_fields=['status', 'report', 'updated_at'])
+        except Exception:
+            # Transaction annulée : le fichier retourne dans la zone partielle
+            if not duplicate:
+                os.replace(storage.path(name), source)
+            raise
+
+    if duplicate:
+        os.remove(source)
+    return report, checksum
+
+
+def _check_complete(upload):
+    if upload.status != 'pending':
+        raise UploadError("Cet upload n'est plus en cours.")
+    if not upload.is_complete:
+        raise OffsetMismatch(upload.received_size)
+
+
+def abort_upload(upload):
+    """Abandonne un upload et supprime son fichier partiel"""
+    upload.status = 'aborted'
+    upload.save(update_fields=['status', 'updated_at'])
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def purge_stale_uploads(max_age_hours=24):
+    """Abandonne les uploads sans nouveau morceau depuis `max_age_hours` heures"""
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+    stale = ReportUpload.objects.filter(status='pending', updated_at__lt=cutoff)
+    count = 0
+    for upload in stale.iterator():
+        abort_upload(upload)
+        count += 1
+    return count
@@ -5,6 +5,7 @@ from . import views
 # Routeur pour les vues d'administration
 admin_router = DefaultRouter()
 admin_router.register(r'admin', views.AdminReportViewSet, basename='admin-report')
+admin_router.register(r'uploads', views.ReportUploadViewSet, basename='report-upload')
 
 urlpatterns = [
     # Authentification patient
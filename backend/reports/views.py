@@ -1,28 +1,71 @@
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse, Http404, FileResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, Http404, FileResponse, JsonResponse
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
 from django.utils import timezone
+from django.views.decorators.http import require_GET
 from datetime import datetime, timedelta
 import mimetypes
 import os
 
-from rest_framework import viewsets, status, filters, serializers
+from rest_framework import mixins, viewsets, status, filters, serializers
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 
-from .models import PatientReport
-from .serializers import PatientReportSerializer, PatientLoginSerializer
+from .models import DicomMetadata, PatientReport, ReportBlob, ReportUpload
+from .serializers import (
+    DicomMetadataSerializer,
+    PatientLoginSerializer,
+    PatientReportSerializer,
+    ReportUploadSerializer,
+)
+from core.db_router import ReplicaReadMixin
+from core.pagination import StandardResultsSetPagination
 from patients.models import PatientAccess
 from .serializers import (
     PatientReportListSerializer,
     KeyValidationSerializer
 )
+from .portal import (
+    DownloadLinkError,
+    afile_response,
+    file_response,
+    get_report_listing,
+    issue_session_token,
+    preview_response,
+    session_max_age,
+    signed_reports,
+    verify_download,
+)
+from .bulk import BulkImportError, import_entries, zip_entries
+from .ingestion import schedule_ingestion
+from .uploads import (
+    OffsetMismatch,
+    UploadError,
+    abort_upload,
+    chunk_size,
+    complete_upload,
+    start_upload,
+    write_chunk,
+)
 from datetime import timedelta
 
 
-class AdminReportViewSet(viewsets.ModelViewSet):
+REPORT_UPLOAD_ROLES = ['superuser', 'admin', 'doctor', 'secretary']
+
+
+def notify_patient(report):
+    """Programme le SMS de notification d'un nouveau compte rendu (tâche d'arrière-plan)"""
+    from .tasks import notify_patient as notify_task
+    notify_task.delay(report_id=report.pk)
+
+
+class AdminReportViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     API endpoint pour l'administration des rapports.
     Permet de lister, créer, mettre à jour et supprimer des rapports.
@@ -30,6 +73,8 @@ class AdminReportViewSet(viewsets.ModelViewSet):
     queryset = PatientReport.objects.all()
     serializer_class = PatientReportSerializer
     permission_classes = [IsAuthenticated]
+    # Liste et statistiques lues sur la réplique (core.db_router)
+    replica_actions = ('list', 'studies', 'stats')
     
     def get_permissions(self):
         """
@@ -50,7 +95,7 @@ class AdminReportViewSet(viewsets.ModelViewSet):
         print(f"DEBUG: Fichiers reçus: {request.FILES}")
         
         # Vérifier que l'utilisateur a les bonnes permissions
-        if not request.user.role in ['superuser', 'admin', 'doctor', 'secretary']:
+        if not request.user.role in REPORT_UPLOAD_ROLES:
             return Response(
                 {"detail": "Vous n'avez pas la permission d'ajouter un rapport"},
                 status=status.HTTP_403_FORBIDDEN
@@ -66,7 +111,9 @@ class AdminReportViewSet(viewsets.ModelViewSet):
         
         try:
             serializer.is_valid(raise_exception=True)
-            self.perform_create(serializer)
+            # Compte rendu refusé après sa sauvegarde (accès inactif) : tout est annulé
+            with transaction.atomic():
+                self.perform_create(serializer)
             
             headers = self.get_success_headers(serializer.data)
             print(f"DEBUG: Rapport créé avec succès: {serializer.data['id']}")
@@ -113,17 +160,11 @@ class AdminReportViewSet(viewsets.ModelViewSet):
         report.is_active = True
         report.save()
         
+        # Indexation DICOM et aperçu (après commit)
+        schedule_ingestion(report)
+        
         # Envoyer un SMS de notification au patient
-        try:
-            from .sms_service import sms_service
-            success, detail = sms_service.send_report_notification(report)
-            if success:
-                print(f"SMS envoyé au patient {report.patient_name}")
-            else:
-                print(f"SMS non envoyé: {detail}")
-        except Exception as e:
-            # Ne pas bloquer la création du rapport si le SMS échoue
-            print(f"Erreur envoi SMS: {e}")
+        notify_patient(report)
     
     def get_queryset(self):
         """
@@ -132,8 +173,9 @@ class AdminReportViewSet(viewsets.ModelViewSet):
         - patient_id : Filtrer par ID de patient
         - is_active : Filtrer par statut actif/inactif
         - date_from/date_to : Filtrer par plage de dates
+        - modality / study_uid : Filtrer par métadonnées DICOM
         """
-        queryset = PatientReport.objects.all()
+        queryset = PatientReport.objects.select_related('patient_access__patient', 'dicom')
         
         # Filtrage par ID de patient
         patient_id = self.request.query_params.get('patient_id')
@@ -153,9 +195,98 @@ class AdminReportViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(created_at__gte=date_from)
         if date_to:
             queryset = queryset.filter(created_at__lte=date_to)
+        
+        # Filtrage par métadonnées DICOM (colonnes indexées)
+        modality = self.request.query_params.get('modality')
+        if modality:
+            queryset = queryset.filter(dicom__modality=modality.upper())
+        study_uid = self.request.query_params.get('study_uid')
+        if study_uid:
+            queryset = queryset.filter(dicom__study_instance_uid=study_uid)
             
         return queryset.order_by('-created_at')
     
+    @action(detail=False, methods=['get'])
+    def studies(self, request):
+        """
+        Études DICOM regroupées par Study Instance UID, avec leurs séries et aperçus.
+        Filtres : patient_id, modality, date_from/date_to (date de l'étude).
+        """
+        metas = DicomMetadata.objects.filter(report__is_active=True).select_related(
+            'report__patient_access__patient'
+        )
+        patient_id = request.query_params.get('patient_id')
+        if patient_id:
+            metas = metas.filter(report__patient_access__patient_id=patient_id)
+        modality = request.query_params.get('modality')
+        if modality:
+            metas = metas.filter(modality=modality.upper())
+        date_from = request.query_params.get('date_from')
+        if date_from:
+            metas = metas.filter(study_date__gte=date_from)
+        date_to = request.query_params.get('date_to')
+        if date_to:
+            metas = metas.filter(study_date__lte=date_to)
+        
+        # Pagination sur les études (une ligne par Study Instance UID), puis
+        # chargement des seules instances des études de la page
+        paginator = StandardResultsSetPagination()
+        study_rows = metas.values('study_instance_uid').annotate(
+            last_date=Max('study_date')
+        ).order_by(F('last_date').desc(nulls_last=True), 'study_instance_uid')
+        page = paginator.paginate_queryset(study_rows, request, view=self)
+        
+        studies = {row['study_instance_uid']: None for row in page}
+        page_metas = metas.filter(study_instance_uid__in=list(studies)).order_by(
+            'study_instance_uid', 'series_number', 'instance_number'
+        )
+        for meta in page_metas:
+            study = studies[meta.study_instance_uid]
+            if study is None:
+                study = studies[meta.study_instance_uid] = {
+                    'study_instance_uid': meta.study_instance_uid,
+                    'study_date': meta.study_date,
+                    'study_description': meta.study_description,
+                    'patient_name': meta.report.patient_access.patient.full_name,
+                    'modalities': [],
+                    'series': {},
+                }
+            if meta.modality and meta.modality not in study['modalities']:
+                study['modalities'].append(meta.modality)
+            series = study['series'].setdefault(meta.series_instance_uid, {
+                'series_instance_uid': meta.series_instance_uid,
+                'series_number': meta.series_number,
+                'series_description': meta.series_description,
+                'modality': meta.modality,
+                'instances': [],
+            })
+            series['instances'].append({
+                'report_id': meta.report_id,
+                'instance_number': meta.instance_number,
+                'number_of_frames': meta.number_of_frames,
+                'preview_url': DicomMetadataSerializer(meta).data['preview_url'],
+            })
+        
+        results = []
+        for study in studies.values():
+            study['series'] = list(study['series'].values())
+            results.append(study)
+        return paginator.get_paginated_response(results)
+    
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        """Aperçu réduit (PNG/JPEG) d'un compte rendu DICOM"""
+        report = self.get_object()
+        meta = DicomMetadata.objects.filter(report=report).only('preview').first()
+        if meta is None or not meta.preview:
+            raise Http404("Aperçu non disponible")
+        try:
+            response = preview_response(meta.preview.name)
+        except FileNotFoundError:
+            raise Http404("Aperçu non disponible")
+        response['Cache-Control'] = 'private, max-age=86400'
+        return response
+    
     @action(detail=True, methods=['post'])
     def toggle_active(self, request, pk=None):
         """Active ou désactive un rapport"""
@@ -169,6 +300,38 @@ class AdminReportViewSet(viewsets.ModelViewSet):
             'message': f'Le rapport a été {"activé" if report.is_active else "désactivé"} avec succès.'
         })
     
+    @action(detail=False, methods=['post'], url_path='bulk-upload')
+    def bulk_upload(self, request):
+        """
+        Import groupé : archive ZIP dont les noms de fichiers (ou manifest.csv)
+        contiennent la clé d'accès ou le numéro de facture du patient.
+        `dry_run=true` affiche le rattachement sans rien créer.
+        """
+        if request.user.role not in REPORT_UPLOAD_ROLES:
+            return Response(
+                {"detail": "Vous n'avez pas la permission d'ajouter un rapport"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        archive = request.FILES.get('archive')
+        if archive is None:
+            return Response({'detail': "Archive ZIP manquante (champ 'archive')"}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        
+        try:
+            result = import_entries(zip_entries(archive), dry_run=dry_run)
+        except BulkImportError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'created': [
+                {'id': report.pk, 'patient_access': report.patient_access_id, 'original_filename': report.original_filename}
+                for report in result['created']
+            ],
+            'planned': result['planned'],
+            'unmatched': result['unmatched'],
+            'errors': result['errors'],
+        }, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
+    
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Retourne des statistiques sur les rapports"""
@@ -186,13 +349,115 @@ class AdminReportViewSet(viewsets.ModelViewSet):
             is_active=True
         ).count()
         
+        # Stockage : dédoublonnage et compression des fichiers peu consultés
+        # ref_count=0 : fichier en cours de suppression (storage.delete_if_orphan)
+        storage = ReportBlob.objects.filter(ref_count__gt=0).aggregate(
+            files=Count('id'),
+            compressed_files=Count('id', filter=~Q(stored_size=F('size'))),
+            original_bytes=Sum('size'),
+            stored_bytes=Sum('stored_size'),
+        )
+        storage['original_bytes'] = storage['original_bytes'] or 0
+        storage['stored_bytes'] = storage['stored_bytes'] or 0
+        storage['compression_reclaimed_bytes'] = storage['original_bytes'] - storage['stored_bytes']
+        
         return Response({
             'total_reports': total_reports,
             'active_reports': active_reports,
             'inactive_reports': total_reports - active_reports,
             'reports_this_month': reports_this_month,
-            'expiring_soon': expiring_soon
+            'expiring_soon': expiring_soon,
+            'storage': storage,
+        })
+
+
+class ReportUploadViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Upload reprenable des comptes rendus volumineux (voir `reports.uploads`).
+
+    - POST   uploads/                 {patient_access, filename, total_size}
+    - PUT    uploads/<id>/chunk/      corps brut, en-tête Upload-Offset
+    - POST   uploads/<id>/complete/   {sha256} -> compte rendu créé
+    - GET    uploads/<id>/            offset à partir duquel reprendre
+    - DELETE uploads/<id>/            abandon
+    """
+    queryset = ReportUpload.objects.all()
+    serializer_class = ReportUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.user.role not in REPORT_UPLOAD_ROLES:
+            raise PermissionDenied("Vous n'avez pas la permission d'ajouter un rapport")
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload = start_upload(
+                serializer.validated_data['patient_access'],
+                serializer.validated_data['filename'],
+                serializer.validated_data['total_size'],
+                user=request.user,
+            )
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = self.get_serializer(upload).data
+        data['chunk_size'] = chunk_size()
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def destroy(self, request, pk=None):
+        upload = self.get_object()
+        if upload.status != 'pending':
+            return Response({'detail': "Cet upload n'est plus en cours."}, status=status.HTTP_400_BAD_REQUEST)
+        abort_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['put'])
+    def chunk(self, request, pk=None):
+        """Reçoit un morceau brut (application/octet-stream) sans passer par les parsers"""
+        try:
+            offset = int(request.headers.get('Upload-Offset', request.query_params.get('offset', '')))
+            length = int(request.headers.get('Content-Length') or 0)
+        except ValueError:
+            return Response({'detail': "En-tête Upload-Offset invalide"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upload = write_chunk(pk, offset, request.stream, length)
+        except ReportUpload.DoesNotExist:
+            raise Http404
+        except OffsetMismatch as e:
+            return Response({'detail': str(e), 'offset': e.expected}, status=status.HTTP_409_CONFLICT)
+        except UploadError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = Response({
+            'offset': upload.received_size,
+            'total_size': upload.total_size,
+            'complete': upload.is_complete,
         })
+        response['Upload-Offset'] = upload.received_size
+        return response
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Vérifie la somme SHA-256 et crée le compte rendu"""
+        try:
+            report, checksum = complete_upload(pk, request.data.get('sha256'))
+        except ReportUpload.DoesNotExist:
+            raise Http404
+        except OffsetMismatch as e:
+            return Response({'detail': "Fichier incomplet", 'offset': e.expected}, status=status.HTTP_409_CONFLICT)
+        except (UploadError, ValidationError) as e:
+            message = e.messages[0] if isinstance(e, ValidationError) else str(e)
+            return Response({'detail': message}, status=status.HTTP_400_BAD_REQUEST)
+
+        schedule_ingestion(report)
+        notify_patient(report)
+        data = PatientReportSerializer(report, context=self.get_serializer_context()).data
+        data['sha256'] = checksum
+        return Response(data, status=status.HTTP_201_CREATED)
 
 
 class PatientReportViewSet(viewsets.ModelViewSet):
@@ -226,29 +491,22 @@ def patient_login(request):
             
             # Méthode 1: Vérification par clé d'accès directe
             if access_key:
-                try:
-                    patient_access = PatientAccess.objects.get(
-                        access_key=access_key,
-                        password=password,
-                        is_active=True
-                    )
-                except PatientAccess.DoesNotExist:
-                    pass  # On continue avec la méthode 2 si échec
+                patient_access = PatientAccess.objects.only('id', 'patient_id', 'is_active').filter(
+                    access_key=access_key,
+                    password=password,
+                    is_active=True
+                ).first()
             
             # Méthode 2: Vérification par numéro de facture
             if not patient_access and invoice_number:
                 from invoices.models import Invoice
-                try:
-                    # Chercher la facture par numéro
-                    invoice = Invoice.objects.get(
-                        invoice_number=invoice_number,
-                        patient_access__isnull=False
-                    )
-                    # Vérifier le mot de passe de l'accès lié à la facture
-                    if invoice.patient_access.password == password:
-                        patient_access = invoice.patient_access
-                except Invoice.DoesNotExist:
-                    pass
+                invoice = Invoice.objects.select_related('patient_access').filter(
+                    invoice_number=invoice_number,
+                    patient_access__isnull=False
+                ).first()
+                # Vérifier le mot de passe de l'accès lié à la facture
+                if invoice and invoice.patient_access.password == password:
+                    patient_access = invoice.patient_access
             
             # Vérifier si on a trouvé un accès valide
             if not patient_access:
@@ -264,20 +522,16 @@ def patient_login(request):
                     status=status.HTTP_401_UNAUTHORIZED
                 )
             
-            # Récupérer les comptes rendus pour cet accès
-            reports = PatientReport.objects.filter(
-                patient_access=patient_access,
-                is_active=True
-            )
-            
-            # Sérialiser les rapports
-            serializer = PatientReportListSerializer(reports, many=True)
+            # Comptes rendus de cet accès (mis en cache par accès)
+            listing = get_report_listing(patient_access.id, patient_access.patient_id)
             
             return Response({
                 'success': True,
-                'patient_name': patient_access.patient.full_name,
-                'reports': serializer.data,
-                'access_key': patient_access.access_key  # Retourne la clé d'accès pour les sessions futures
+                'patient_name': listing['patient']['full_name'],
+                'reports': signed_reports(listing),
+                'access_key': listing['access_key'],  # Retourne la clé d'accès pour les sessions futures
+                'session_token': issue_session_token(patient_access.id, patient_access.patient_id),
+                'session_expires_in': session_max_age(),
             })
             
         except Exception as e:
@@ -293,69 +547,50 @@ def patient_login(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def download_report(request, access_key, report_id):
-    """Téléchargement d'un compte rendu par le patient"""
-    try:
-        # Vérifier l'accès patient
-        patient_access = get_object_or_404(
-            PatientAccess,
-            access_key=access_key,
-            is_active=True
+    """Téléchargement d'un compte rendu par le patient (legacy, préférer les liens signés)"""
+    # Une seule requête : rapport actif rattaché à un accès actif
+    report = PatientReport.objects.select_related('patient_access').only(
+        'id', 'report_file', 'original_filename', 'patient_access__is_active'
+    ).filter(
+        id=report_id,
+        is_active=True,
+        patient_access__access_key=access_key,
+        patient_access__is_active=True,
+    ).first()
+
+    if report is None:
+        return Response(
+            {'error': 'Rapport non trouvé ou accès invalide'},
+            status=status.HTTP_404_NOT_FOUND
         )
-        
-        if not patient_access.is_valid:
-            return Response(
-                {'error': 'Accès expiré'}, 
-                status=status.HTTP_403_FORBIDDEN
-            )
-        
-        # Récupérer le rapport
-        report = get_object_or_404(
-            PatientReport, 
-            id=report_id, 
-            patient_access=patient_access,
-            is_active=True
+
+    if not report.patient_access.is_valid:
+        return Response(
+            {'error': 'Accès expiré'},
+            status=status.HTTP_403_FORBIDDEN
         )
-        
-        if not report.report_file:
-            return Response(
-                {'error': 'Fichier non trouvé'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Incrémenter le compteur de téléchargements
-        report.increment_download_count()
-        
-        # Préparer la réponse de téléchargement
-        file_path = report.report_file.path
-        
-        if not os.path.exists(file_path):
-            return Response(
-                {'error': 'Fichier physique non trouvé'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Déterminer le type MIME
-        content_type, _ = mimetypes.guess_type(file_path)
-        if content_type is None:
-            content_type = 'application/octet-stream'
-        
-        # Lire le fichier et créer la réponse
-        with open(file_path, 'rb') as f:
-            response = HttpResponse(f.read(), content_type=content_type)
-            response['Content-Disposition'] = f'attachment; filename="{os.path.basename(file_path)}"'
-            return response
-            
-    except (PatientAccess.DoesNotExist, PatientReport.DoesNotExist):
+
+    if not report.report_file:
         return Response(
-            {'error': 'Rapport non trouvé ou accès invalide'}, 
+            {'error': 'Fichier non trouvé'},
             status=status.HTTP_404_NOT_FOUND
         )
-    except Exception as e:
+
+    try:
+        response = file_response(
+            report.report_file.name, report.download_filename, request.headers.get('Accept-Encoding', '')
+        )
+    except FileNotFoundError:
         return Response(
-            {'error': 'Erreur lors du téléchargement'}, 
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            {'error': 'Fichier physique non trouvé'},
+            status=status.HTTP_404_NOT_FOUND
         )
 
+    PatientReport.objects.filter(pk=report.pk).update(
+        download_count=F('download_count') + 1, last_downloaded_at=timezone.now()
+    )
+    return response
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -425,41 +660,35 @@ def validate_keys(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['GET'])
-@permission_classes([AllowAny])
-def patient_download_report(request, report_id):
-    """Téléchargement sécurisé d'un rapport patient"""
+@require_GET
+async def patient_download_report(request, report_id):
+    """
+    Téléchargement d'un rapport patient via un lien signé (voir `reports.portal`).
+    La signature suffit à autoriser l'accès : aucune lecture en base.
+    Vue asynchrone : en ASGI le fichier est envoyé par blocs sans occuper de worker.
+    """
     try:
-        report = get_object_or_404(PatientReport, id=report_id, is_active=True)
-        
-        # Vérifier que le fichier existe
-        if not report.report_file or not os.path.exists(report.report_file.path):
-            return Response({
-                'error': 'Fichier non trouvé'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        # Incrémenter le compteur de téléchargements
-        report.download_count += 1
-        report.save(update_fields=['download_count'])
-        
-        # Retourner le fichier
-        response = FileResponse(
-            open(report.report_file.path, 'rb'),
-            as_attachment=True,
-            filename=os.path.basename(report.report_file.name)
-        )
-        
-        # Définir le type MIME
-        content_type, _ = mimetypes.guess_type(report.report_file.path)
-        if content_type:
-            response['Content-Type'] = content_type
-            
-        return response
-        
-    except Exception as e:
-        return Response({
-            'error': f'Erreur lors du téléchargement: {str(e)}'
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        file_name, download_name = verify_download(report_id, request.GET)
+    except DownloadLinkError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_403_FORBIDDEN)
+
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    try:
+        if isinstance(request, ASGIRequest):
+            response = await afile_response(file_name, download_name, accept_encoding)
+        else:
+            # WSGI : un flux asynchrone serait lu entièrement en mémoire
+            response = file_response(file_name, download_name, accept_encoding)
+    except FileNotFoundError:
+        return JsonResponse({
+            'error': 'Fichier non trouvé'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    # Incrémenter le compteur de téléchargements (UPDATE direct, sans lecture)
+    await PatientReport.objects.filter(pk=report_id).aupdate(
+        download_count=F('download_count') + 1, last_downloaded_at=timezone.now()
+    )
+    return response
 
 
 @api_view(['GET'])
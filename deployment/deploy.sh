@@ -73,7 +73,7 @@ echo "[7/8] Configuration de Supervisor (Gunicorn)..."
 sudo cp $PROJECT_DIR/deployment/supervisor-cimef.conf /etc/supervisor/conf.d/cimef.conf
 sudo supervisorctl reread
 sudo supervisorctl update
-sudo supervisorctl restart cimef
+sudo supervisorctl restart cimef cimef-asgi cimef-jobs
 
 # Pare-feu
 echo "[8/8] Configuration du pare-feu..."
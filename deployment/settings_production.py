@@ -14,6 +14,9 @@ from .settings import *
 
 DEBUG = False
 
+# Tâches d'arrière-plan exécutées par le worker supervisor `cimef-jobs`
+JOBS_EAGER = config('JOBS_EAGER', default=False, cast=bool)
+
 # Mettre votre domaine et IP ici
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost').split(',')
 
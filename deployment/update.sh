@@ -35,11 +35,11 @@ npm run build
 
 # Redémarrer les services
 echo "[4/5] Redémarrage des services..."
-sudo supervisorctl restart cimef
+sudo supervisorctl restart cimef cimef-asgi cimef-jobs
 sudo systemctl restart nginx
 
 echo "[5/5] Vérification..."
-sudo supervisorctl status cimef
+sudo supervisorctl status cimef cimef-asgi cimef-jobs
 sudo systemctl status nginx --no-pager -l
 
 echo ""
@@ -14,6 +14,10 @@ import {
   PaymentSummary
 } from '@/types';
 
+// crypto.subtle ne hache qu'un buffer entier : au-delà, la somme SHA-256 n'est pas
+// envoyée (le serveur vérifie la taille, le transport est protégé par TLS)
+const UPLOAD_CHECKSUM_MAX_SIZE = 256 * 1024 * 1024;
+
 class ApiClient {
   private client: AxiosInstance;
 
@@ -29,7 +33,8 @@ class ApiClient {
     // Intercepteur pour ajouter le token JWT
     this.client.interceptors.request.use((config) => {
       const token = localStorage.getItem('access_token');
-      if (token) {
+      // En-tête déjà fourni (jeton de session du portail patient) : conservé
+      if (token && !config.headers.Authorization) {
         config.headers.Authorization = `Bearer ${token}`;
       }
       return config;
@@ -40,8 +45,8 @@ class ApiClient {
       (response) => response,
       async (error) => {
         const originalRequest = error.config;
-        // Ne pas intercepter les requêtes d'auth (login, refresh) pour éviter les boucles
-        const isAuthRequest = originalRequest?.url?.includes('/auth/token');
+        // Ne pas intercepter les requêtes d'auth (login, refresh, portail patient) pour éviter les boucles
+        const isAuthRequest = originalRequest?.url?.includes('/auth/token') || originalRequest?.url?.includes('/portal/');
         if (error.response?.status === 401 && !isAuthRequest && !originalRequest._retry) {
           originalRequest._retry = true;
           const refreshToken = localStorage.getItem('refresh_token');
@@ -277,13 +282,21 @@ class ApiClient {
     return response.data;
   }
 
+  async refreshPatientSession(sessionToken: string): Promise<PatientLoginResponse> {
+    const response = await this.client.get<PatientLoginResponse>('/patients/portal/session/', {
+      headers: { Authorization: `Portal ${sessionToken}` }
+    });
+    return response.data;
+  }
+
   async getPatientReportsForPortal(): Promise<PatientReport[]> {
     const response = await this.client.get<PatientReport[]>('/reports/patient/');
     return response.data;
   }
 
-  async downloadPatientReport(id: number): Promise<Blob> {
-    const response = await this.client.get(`/reports/patient-download/${id}/`, {
+  // `downloadUrl` : lien signé fourni par le portail (/api/reports/patient-download/<id>/?...)
+  async downloadPatientReport(downloadUrl: string): Promise<Blob> {
+    const response = await this.client.get(downloadUrl.replace(/^\/api(?=\/)/, ''), {
       responseType: 'blob'
     });
     return response.data;
@@ -304,6 +317,60 @@ class ApiClient {
     return response.data;
   }
 
+  // Upload reprenable par morceaux pour les comptes rendus volumineux
+  async uploadPatientReportChunked(
+    file: File,
+    patientAccessId: number,
+    onProgress?: (percent: number) => void
+  ): Promise<any> {
+    const { data: upload } = await this.client.post('/reports/uploads/', {
+      patient_access: patientAccessId,
+      filename: file.name,
+      total_size: file.size,
+    });
+
+    let offset = 0;
+    let retries = 0;
+    while (offset < file.size) {
+      try {
+        const { data } = await this.client.put(
+          `/reports/uploads/${upload.id}/chunk/`,
+          file.slice(offset, offset + upload.chunk_size),
+          {
+            headers: { 'Content-Type': 'application/octet-stream', 'Upload-Offset': String(offset) },
+            timeout: 120000,
+          }
+        );
+        offset = data.offset;
+        retries = 0;
+        onProgress?.(Math.round((offset / file.size) * 100));
+      } catch (error: any) {
+        if (retries >= 5) throw error;
+        retries += 1;
+        if (error.response?.status === 409) {
+          // Le serveur indique l'offset à partir duquel reprendre
+          offset = error.response.data.offset;
+        } else if (!error.response) {
+          // Connexion coupée : reprendre après les octets effectivement reçus
+          await new Promise((resolve) => setTimeout(resolve, 1000 * retries));
+          const { data } = await this.client.get(`/reports/uploads/${upload.id}/`);
+          offset = data.received_size;
+        } else {
+          throw error;
+        }
+      }
+    }
+
+    // crypto.subtle n'est disponible qu'en HTTPS (ou localhost) : la somme est alors facultative
+    let sha256: string | undefined;
+    if (window.crypto?.subtle && file.size <= UPLOAD_CHECKSUM_MAX_SIZE) {
+      const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+      sha256 = Array.from(new Uint8Array(digest)).map((b) => b.toString(16).padStart(2, '0')).join('');
+    }
+    const { data: report } = await this.client.post(`/reports/uploads/${upload.id}/complete/`, { sha256 });
+    return report;
+  }
+
   async togglePatientReportActive(id: number): Promise<any> {
     const response = await this.client.post(`/reports/admin/${id}/toggle_active/`);
     return response.data;
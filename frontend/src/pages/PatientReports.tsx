@@ -11,6 +11,7 @@ interface PatientReport {
   patient_name: string;
   access_key: string;
   report_file: string;
+  original_filename?: string;
   created_at: string;
   expires_at: string;
   is_active: boolean;
@@ -28,6 +29,9 @@ interface PatientAccess {
   is_active: boolean;
 }
 
+// Au-delà de cette taille, le fichier est envoyé par morceaux (reprise possible)
+const CHUNKED_UPLOAD_THRESHOLD = 10 * 1024 * 1024;
+
 const PatientReports: React.FC = () => {
   const { user } = useAuth();
   const toast = useToast();
@@ -133,7 +137,10 @@ const PatientReports: React.FC = () => {
       // 3. Envoyer la requête d'upload
       console.log('DEBUG: Envoi de la requête d\'upload...');
       try {
-        const response = await api.createPatientReport(formData);
+        // Fichiers volumineux : upload reprenable par morceaux
+        const response = uploadForm.file.size > CHUNKED_UPLOAD_THRESHOLD
+          ? await api.uploadPatientReportChunked(uploadForm.file, patientAccess.id)
+          : await api.createPatientReport(formData);
         console.log('DEBUG: Réponse API:', response);
 
         // Réinitialiser le formulaire et rafraîchir la liste
@@ -418,7 +425,7 @@ const PatientReports: React.FC = () => {
                         <FileText className="h-4 w-4 text-[#7a8345]" />
                       </div>
                       <span className="text-sm text-neutral-700 font-medium">
-                        {getFileName(report.report_file)}
+                        {report.original_filename || getFileName(report.report_file)}
                       </span>
                     </div>
                   </td>
@@ -27,16 +27,34 @@ export const PatientDashboard: React.FC = () => {
       return;
     }
 
+    let data: PatientLoginResponse;
     try {
-      const data: PatientLoginResponse = JSON.parse(sessionData);
-      setPatientData(data);
-      
-      // Charger les rapports (simulé pour l'instant)
-      setReports(data.files || []);
+      data = JSON.parse(sessionData);
     } catch (error) {
       console.error('Erreur lors du parsing des données patient:', error);
       navigate('/patient');
-    } finally {
+      setLoading(false);
+      return;
+    }
+
+    setPatientData(data);
+    setReports(data.files || []);
+
+    // Rafraîchir la liste des comptes rendus avec le jeton de session
+    if (data.session_token) {
+      api.refreshPatientSession(data.session_token)
+        .then((fresh) => {
+          sessionStorage.setItem('patient_session', JSON.stringify(fresh));
+          setPatientData(fresh);
+          setReports(fresh.files || []);
+        })
+        .catch(() => {
+          // Session expirée : retour à la connexion
+          sessionStorage.removeItem('patient_session');
+          navigate('/patient');
+        })
+        .finally(() => setLoading(false));
+    } else {
       setLoading(false);
     }
   }, [navigate]);
@@ -46,10 +64,10 @@ export const PatientDashboard: React.FC = () => {
     navigate('/patient');
   };
 
-  const handleDownload = async (reportId: number, filename: string) => {
+  const handleDownload = async (reportId: number, downloadUrl: string, filename: string) => {
     setDownloadingId(reportId);
     try {
-      const blob = await api.downloadPatientReport(reportId);
+      const blob = await api.downloadPatientReport(downloadUrl);
       downloadBlob(blob, filename);
     } catch (error) {
       console.error('Erreur lors du téléchargement:', error);
@@ -245,7 +263,7 @@ export const PatientDashboard: React.FC = () => {
                         {report.is_active ? (
                           <Button
                             size="sm"
-                            onClick={() => handleDownload(report.id, `rapport_${report.id}.pdf`)}
+                            onClick={() => handleDownload(report.id, report.download_url, `rapport_${report.id}.pdf`)}
                             loading={downloadingId === report.id}
                             disabled={downloadingId !== null}
                           >
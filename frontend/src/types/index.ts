@@ -322,4 +322,6 @@ export interface PatientLoginResponse {
     last_accessed?: string;
   };
   files: PatientReport[];
+  session_token: string;
+  session_expires_in: number;
 }